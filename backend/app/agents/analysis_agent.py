@@ -4,8 +4,13 @@ AI agent that analyses resume/portfolio against current hiring trends
 and returns a score, strengths, weaknesses, and actionable suggestions.
 """
 import json
-from app.services.llm_services import call_llm_for_suggestions
-from app.utils.extract_json import extract_json
+from typing import AsyncIterator
+from app.services.llm_services import (
+    call_llm_for_suggestions, acall_llm_for_suggestions, astream_llm_for_suggestions
+)
+from app.utils.extract_json import extract_json, is_json_response
+from app.utils.incremental_json import IncrementalJSONParser
+from app.utils.token_budget import fit_to_budget, truncate_to_tokens
 
 # Expected keys in the analysis response (for validation and fallbacks)
 DEFAULT_ANALYSIS = {
@@ -18,8 +23,36 @@ DEFAULT_ANALYSIS = {
 }
 
 
+def _trim_project_descriptions(data: dict, max_tokens: int) -> dict:
+    projects = data.get("projects")
+    if not isinstance(projects, list):
+        return data
+    return {
+        **data,
+        "projects": [
+            {**p, "description": truncate_to_tokens(p.get("description") or "", max_tokens)} if isinstance(p, dict) else p
+            for p in projects
+        ],
+    }
+
+
+def _trim_text_fields(data: dict, max_tokens: int) -> dict:
+    return {k: truncate_to_tokens(v, max_tokens) if isinstance(v, str) else v for k, v in data.items()}
+
+
+# Project prose is trimmed first; the skills list is kept intact as long as possible.
+_ANALYSIS_TRIM_STEPS = [
+    lambda d: _trim_project_descriptions(d, 80),
+    lambda d: {**d, "projects": d["projects"][:8]} if isinstance(d.get("projects"), list) else d,
+    lambda d: _trim_text_fields(d, 2000),
+    lambda d: _trim_project_descriptions(d, 30),
+    lambda d: _trim_text_fields(d, 800),
+]
+
+
 def _build_prompt(portfolio_data: dict, context: str = "portfolio") -> str:
     """Build the hiring-trends analysis prompt. Data is from the user's resume; goal is to help build a better portfolio."""
+    _, data_json = fit_to_budget(f"analysis.{context}", portfolio_data, _ANALYSIS_TRIM_STEPS)
     return f"""
 You are an expert Technical Recruiter and Career Coach. The following data comes from the user's resume (and merged profile). Your job is to analyze it against 2024-2025 hiring trends and give suggestions so the user can build a stronger portfolio.
 
@@ -32,7 +65,7 @@ Evaluate against these trends:
 6. Skills breadth and alignment with role types (frontend, backend, fullstack, DevOps).
 
 Data from resume/profile to analyze:
-{json.dumps(portfolio_data, indent=2)}
+{data_json}
 
 Suggestions must be actionable: what to add, rephrase, or fix so the portfolio stands out to recruiters. Return ONLY a single valid JSON object (no markdown, no code fence). Use this exact structure:
 {{
@@ -55,16 +88,8 @@ Give 2-4 suggestions. Section must be one of: Experience, Projects, Skills, Summ
 """
 
 
-def analyze_portfolio_trends(portfolio_data: dict) -> dict:
-    """
-    Analyzes portfolio data against current hiring trends and returns
-    score, hiring_trends_analysis, strengths, weaknesses, suggestions, missing_keywords.
-    """
-    if not portfolio_data:
-        return {**DEFAULT_ANALYSIS, "hiring_trends_analysis": "No portfolio data to analyze."}
-
-    prompt = _build_prompt(portfolio_data, context="portfolio")
-    raw_response = call_llm_for_suggestions(prompt)
+def _parse_analysis(raw_response: str) -> dict:
+    """Normalise the LLM's analysis JSON into the DEFAULT_ANALYSIS shape."""
     cleaned_json = extract_json(raw_response)
 
     try:
@@ -99,6 +124,55 @@ def analyze_portfolio_trends(portfolio_data: dict) -> dict:
         }
 
 
+def _resume_portfolio_data(resume_text: str) -> dict:
+    """Normalize raw resume text to a simple structure the same prompt can use."""
+    return {"raw_summary_or_resume": resume_text.strip()}
+
+
+def analyze_portfolio_trends(portfolio_data: dict) -> dict:
+    """
+    Analyzes portfolio data against current hiring trends and returns
+    score, hiring_trends_analysis, strengths, weaknesses, suggestions, missing_keywords.
+    """
+    if not portfolio_data:
+        return {**DEFAULT_ANALYSIS, "hiring_trends_analysis": "No portfolio data to analyze."}
+
+    prompt = _build_prompt(portfolio_data, context="portfolio")
+    raw = call_llm_for_suggestions(prompt, caller="analysis.portfolio", validate=is_json_response)
+    return _parse_analysis(raw)
+
+
+async def aanalyze_portfolio_trends(portfolio_data: dict) -> dict:
+    """Async version of analyze_portfolio_trends for use inside request handlers."""
+    if not portfolio_data:
+        return {**DEFAULT_ANALYSIS, "hiring_trends_analysis": "No portfolio data to analyze."}
+
+    prompt = _build_prompt(portfolio_data, context="portfolio")
+    raw = await acall_llm_for_suggestions(prompt, caller="analysis.portfolio", validate=is_json_response)
+    return _parse_analysis(raw)
+
+
+async def astream_portfolio_trends(portfolio_data: dict) -> AsyncIterator[tuple]:
+    """
+    Streaming version of analyze_portfolio_trends.
+    Yields ("field", {"path": [...], "value": ...}) as each top-level field or
+    list item of the analysis is completed, then ("done", <full analysis>).
+    """
+    if not portfolio_data:
+        yield "done", {**DEFAULT_ANALYSIS, "hiring_trends_analysis": "No portfolio data to analyze."}
+        return
+
+    prompt = _build_prompt(portfolio_data, context="portfolio")
+    parser = IncrementalJSONParser()
+    chunks = []
+    async for delta in astream_llm_for_suggestions(prompt, caller="analysis.portfolio", validate=is_json_response):
+        chunks.append(delta)
+        for path, value in parser.feed(delta):
+            yield "field", {"path": list(path), "value": value}
+
+    yield "done", _parse_analysis("".join(chunks))
+
+
 def analyze_resume_text(resume_text: str) -> dict:
     """
     Analyzes raw resume text against hiring trends (no portfolio in DB yet).
@@ -107,38 +181,16 @@ def analyze_resume_text(resume_text: str) -> dict:
     if not (resume_text or resume_text.strip()):
         return {**DEFAULT_ANALYSIS, "hiring_trends_analysis": "No resume text to analyze."}
 
-    # Normalize to a simple structure the same prompt can use
-    portfolio_data = {"raw_summary_or_resume": resume_text.strip()[:8000]}
-    prompt = _build_prompt(portfolio_data, context="resume")
-    raw_response = call_llm_for_suggestions(prompt)
-    cleaned_json = extract_json(raw_response)
+    prompt = _build_prompt(_resume_portfolio_data(resume_text), context="resume")
+    raw = call_llm_for_suggestions(prompt, caller="analysis.resume", validate=is_json_response)
+    return _parse_analysis(raw)
 
-    try:
-        data = json.loads(cleaned_json)
-        result = {**DEFAULT_ANALYSIS}
-        result["score"] = int(data.get("score", 0)) if isinstance(data.get("score"), (int, float)) else 0
-        result["score"] = max(0, min(100, result["score"]))
-        result["hiring_trends_analysis"] = str(data.get("hiring_trends_analysis", "") or "")
-        result["strengths"] = list(data.get("strengths", [])) if isinstance(data.get("strengths"), list) else []
-        result["weaknesses"] = list(data.get("weaknesses", [])) if isinstance(data.get("weaknesses"), list) else []
-        result["missing_keywords"] = list(data.get("missing_keywords", [])) if isinstance(data.get("missing_keywords"), list) else []
-        suggestions = data.get("suggestions")
-        if isinstance(suggestions, list):
-            result["suggestions"] = []
-            for s in suggestions:
-                if isinstance(s, dict):
-                    result["suggestions"].append({
-                        "section": str(s.get("section", "General")),
-                        "current": str(s.get("current", "")),
-                        "suggestion": str(s.get("suggestion", s.get("text", ""))),
-                        "reason": str(s.get("reason", "")),
-                    })
-                elif isinstance(s, str):
-                    result["suggestions"].append({"section": "General", "current": "", "suggestion": s, "reason": ""})
-        return result
-    except (json.JSONDecodeError, TypeError) as e:
-        return {
-            **DEFAULT_ANALYSIS,
-            "hiring_trends_analysis": "Analysis could not be parsed.",
-            "error": str(e),
-        }
+
+async def aanalyze_resume_text(resume_text: str) -> dict:
+    """Async version of analyze_resume_text."""
+    if not (resume_text or resume_text.strip()):
+        return {**DEFAULT_ANALYSIS, "hiring_trends_analysis": "No resume text to analyze."}
+
+    prompt = _build_prompt(_resume_portfolio_data(resume_text), context="resume")
+    raw = await acall_llm_for_suggestions(prompt, caller="analysis.resume", validate=is_json_response)
+    return _parse_analysis(raw)
@@ -1,7 +1,9 @@
+import asyncio
 from fastapi import HTTPException
 from app.agents.resume_agent import parse_resume
 from app.agents.github_agent import summarize_github_profile
-from app.agents.content_enhance_agent import enhance_profile_content
+from app.agents.content_enhance_agent import enhance_profile_content, aenhance_profile_content
+from app.utils.skill_matcher import skill_matcher
 
 
 def merge_profiles(resume_data: dict, github_data: dict) -> dict:
@@ -23,9 +25,11 @@ def merge_profiles(resume_data: dict, github_data: dict) -> dict:
         if github_data.get("summary"):
             merged["summary"] = github_data["summary"]
 
-    resume_skills = set(merged.get("technicalSkills", []))
-    github_skills = set(github_data.get("technicalSkills", []))
-    merged["technicalSkills"] = list(resume_skills.union(github_skills))
+    # Canonical names make "JS" from one side and "JavaScript" from the other collapse
+    merged["technicalSkills"] = skill_matcher.normalize(
+        list(merged.get("technicalSkills") or []) + list(github_data.get("technicalSkills") or []),
+        "technical",
+    )
 
     resume_projects = merged.get("projects", [])
     github_projects = github_data.get("projects", [])
@@ -52,11 +56,23 @@ def merge_profiles(resume_data: dict, github_data: dict) -> dict:
     return merged
 
 
+def _check_inputs(resume_text, github_username, resume_data, github_data) -> None:
+    has_resume_input = resume_text or resume_data
+    has_github_input = github_username or github_data
+
+    if not has_resume_input and not has_github_input:
+        raise HTTPException(
+            status_code=400,
+            detail="Provide either resume_text/resume_data or github_username/github_data"
+        )
+
+
 def build_profile(
     resume_text: str = None,
     github_username: str = None,
     resume_data: dict = None,
-    github_data: dict = None
+    github_data: dict = None,
+    github_token: str = None
 ) -> dict:
     """
     Orchestrates full pipeline:
@@ -67,14 +83,7 @@ def build_profile(
     5. Return enhanced profile
     """
 
-    has_resume_input = resume_text or resume_data
-    has_github_input = github_username or github_data
-
-    if not has_resume_input and not has_github_input:
-        raise HTTPException(
-            status_code=400,
-            detail="Provide either resume_text/resume_data or github_username/github_data"
-        )
+    _check_inputs(resume_text, github_username, resume_data, github_data)
 
     resume_final = None
     if resume_data:
@@ -86,7 +95,7 @@ def build_profile(
     if github_data:
         github_final = github_data
     elif github_username:
-        github_final = summarize_github_profile(github_username)
+        github_final = summarize_github_profile(github_username, github_token)
 
     merged_profile = merge_profiles(resume_final, github_final)
 
@@ -97,4 +106,42 @@ def build_profile(
     return {
         "raw_profile": merged_profile,
         "enhanced_profile": enhanced_profile
-    }
\ No newline at end of file
+    }
+
+
+async def abuild_profile(
+    resume_text: str = None,
+    github_username: str = None,
+    resume_data: dict = None,
+    github_data: dict = None,
+    github_token: str = None
+) -> dict:
+    """
+    Async version of build_profile. Enhancement is an awaited LLM call; extraction
+    that still has to happen (no resume_data/github_data) runs in worker threads.
+    """
+    _check_inputs(resume_text, github_username, resume_data, github_data)
+
+    async def _resume():
+        if resume_data:
+            return resume_data
+        if resume_text:
+            return await asyncio.to_thread(parse_resume, resume_text)
+        return None
+
+    async def _github():
+        if github_data:
+            return github_data
+        if github_username:
+            return await asyncio.to_thread(summarize_github_profile, github_username, github_token)
+        return None
+
+    resume_final, github_final = await asyncio.gather(_resume(), _github())
+    merged_profile = merge_profiles(resume_final, github_final)
+
+    enhanced_profile = await aenhance_profile_content(merged_profile)
+
+    return {
+        "raw_profile": merged_profile,
+        "enhanced_profile": enhanced_profile
+    }
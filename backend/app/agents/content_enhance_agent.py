@@ -1,15 +1,34 @@
 import json
 import re
+from typing import AsyncIterator
 from fastapi import HTTPException
-from app.services.llm_services import call_llm
-from app.utils.extract_json import extract_json
+from app.services.llm_services import call_llm, acall_llm, astream_llm
+from app.utils.extract_json import extract_json, is_json_response
+from app.utils.incremental_json import IncrementalJSONParser
+from app.utils.token_budget import fit_to_budget, truncate_to_tokens
 
 
-def enhance_profile_content(profile_data: dict) -> dict:
-    """
-    Enhances structured profile data.
-    Flexible field name handling.
-    """
+def _trim_descriptions(entries: list, max_tokens: int) -> list:
+    trimmed = []
+    for entry in entries:
+        description = entry.get("description")
+        if isinstance(description, list):
+            description = " ".join(str(d) for d in description)
+        trimmed.append({**entry, "description": truncate_to_tokens(description or "", max_tokens)})
+    return trimmed
+
+
+# Long descriptions are trimmed before whole entries are dropped; name and skills are never cut.
+_ENHANCE_TRIM_STEPS = [
+    lambda d: {**d, "experience": _trim_descriptions(d["experience"], 120), "projects": _trim_descriptions(d["projects"], 120)},
+    lambda d: {**d, "projects": d["projects"][:6], "experience": d["experience"][:5]},
+    lambda d: {**d, "summary": truncate_to_tokens(d.get("summary") or "", 250)},
+    lambda d: {**d, "experience": _trim_descriptions(d["experience"], 50), "projects": _trim_descriptions(d["projects"], 50)},
+]
+
+
+def _build_enhance_prompt(profile_data: dict) -> str:
+    """Build the enhancement prompt from a minimal, normalised view of the profile."""
 
     # Normalize field names for LLM
     experience = []
@@ -35,6 +54,8 @@ def enhance_profile_content(profile_data: dict) -> dict:
         "projects": projects
     }
 
+    _, input_json = fit_to_budget("content_enhance", minimal_input, _ENHANCE_TRIM_STEPS)
+
     prompt = f"""
 You are a professional resume and portfolio optimization expert.
 
@@ -74,15 +95,48 @@ Return structure:
 }}
 
 Profile Data:
-{json.dumps(minimal_input)}
+{input_json}
 """
+    return prompt
 
-    raw_output = call_llm(prompt)
 
+def _parse_enhanced(raw_output: str) -> dict:
     try:
         cleaned = extract_json(raw_output)
         data = json.loads(cleaned)
         return data
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail="Content enhancement failed")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Content enhancement failed")
+
+
+def enhance_profile_content(profile_data: dict) -> dict:
+    """
+    Enhances structured profile data.
+    Flexible field name handling.
+    """
+    prompt = _build_enhance_prompt(profile_data)
+    return _parse_enhanced(call_llm(prompt, caller="content_enhance", validate=is_json_response))
+
+
+async def aenhance_profile_content(profile_data: dict) -> dict:
+    """Async version of enhance_profile_content."""
+    prompt = _build_enhance_prompt(profile_data)
+    return _parse_enhanced(await acall_llm(prompt, caller="content_enhance", validate=is_json_response))
+
+
+async def astream_enhance_profile_content(profile_data: dict) -> AsyncIterator[tuple]:
+    """
+    Streaming version of enhance_profile_content.
+    Yields ("field", {"path": [...], "value": ...}) as the headline, summary and
+    each enhanced experience/project arrive, then ("done", <full result>).
+    """
+    parser = IncrementalJSONParser()
+    chunks = []
+    prompt = _build_enhance_prompt(profile_data)
+    async for delta in astream_llm(prompt, caller="content_enhance", validate=is_json_response):
+        chunks.append(delta)
+        for path, value in parser.feed(delta):
+            yield "field", {"path": list(path), "value": value}
+
+    yield "done", _parse_enhanced("".join(chunks))
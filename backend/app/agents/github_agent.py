@@ -1,20 +1,152 @@
 import json 
+import math
+import os
 import re
 from fastapi import HTTPException
 from app.services.llm_services import call_llm
-from app.utils.extract_json import extract_json
-from app.services.github_service import (
-    fetch_user_repos,
-    fetch_user_profile,
-    fetch_profile_readme
-)
+from app.utils.extract_json import extract_json, is_json_response
+from app.utils.token_budget import fit_to_budget, compact_json, truncate_to_tokens
+from app.utils.skill_matcher import skill_matcher
+from app.services.github_service import fetch_github_data, fetch_repo_languages, rank_repos
+from app.services.github_budget import INTERACTIVE, BACKGROUND, GitHubBudgetExhausted
 
+# Repos sent to the LLM after ranking (stars, recent activity, topics, description)
+GITHUB_TOP_REPOS = int(os.getenv("GITHUB_TOP_REPOS", "10"))
 
+# Languages under this share of a repo's bytes (build scripts, vendored CSS) are not
+# counted for it, unless it is the repo's primary language
+MIN_LANGUAGE_SHARE = 0.05
+# A topic counts half as much as a repo's language bytes
+TOPIC_WEIGHT = 0.5
+MAX_PROJECT_TECHNOLOGIES = 6
 
-def summarize_github_profile(username: str) -> dict:
-    profile_data = fetch_user_profile(username)
-    profile_readme = fetch_profile_readme(username)
-    repos = fetch_user_repos(username)
+
+def _serialize_github_input(data: dict) -> str:
+    return compact_json(data["profile"]) + data["readme"] + compact_json(data["repos"])
+
+
+def _without_descriptions(repos: list, keep: int) -> list:
+    return [repo if i < keep else {**repo, "description": None} for i, repo in enumerate(repos)]
+
+
+# Trimming order: least useful input first. Repo descriptions and README prose go
+# long before repo names/technologies, which the project descriptions are written from.
+_GITHUB_TRIM_STEPS = [
+    lambda d: {**d, "repos": _without_descriptions(d["repos"], keep=5)},
+    lambda d: {**d, "readme": truncate_to_tokens(d["readme"], 500)},
+    lambda d: {**d, "repos": d["repos"][:6]},
+    lambda d: {**d, "readme": truncate_to_tokens(d["readme"], 150)},
+    lambda d: {**d, "repos": _without_descriptions(d["repos"], keep=0)},
+]
+
+
+# ─────── SKILLS (no LLM) ───────
+
+def _language_shares(repo: dict) -> dict:
+    """{language: share of the repo's bytes}; the primary language alone when no
+    byte counts were fetched."""
+    languages = repo.get("languages") or {}
+    total = sum(size for size in languages.values() if isinstance(size, (int, float)))
+    if total <= 0:
+        return {repo["language"]: 1.0} if repo.get("language") else {}
+    return {
+        name: size / total
+        for name, size in languages.items()
+        if isinstance(size, (int, float)) and (size / total >= MIN_LANGUAGE_SHARE or name == repo.get("language"))
+    }
+
+
+def _weighted_skills(repos: list) -> dict:
+    """{canonical skill: weight} from language bytes and topics. Each repo weighs
+    1 + log(1 + stars), split across its languages by bytes."""
+    weights = {}
+    for repo in repos:
+        repo_weight = 1 + math.log1p(repo.get("stars") or 0)
+        for language, share in _language_shares(repo).items():
+            skill = skill_matcher.canonical(language) or language
+            weights[skill] = weights.get(skill, 0.0) + repo_weight * share
+        for skill in skill_matcher.from_topics(repo.get("topics") or []):
+            weights[skill] = weights.get(skill, 0.0) + repo_weight * TOPIC_WEIGHT
+    return weights
+
+
+def _repo_skills(repos: list) -> list:
+    """Canonical skills from repo language bytes and topics, heaviest first.
+    Deterministic: the same repos always give the same list."""
+    weights = _weighted_skills(repos)
+    ranked = sorted(weights, key=lambda skill: (-weights[skill], skill.lower()))
+    return skill_matcher.normalize(ranked, "technical")
+
+
+def _repo_technologies(repo: dict) -> list:
+    return _repo_skills([repo])[:MAX_PROJECT_TECHNOLOGIES]
+
+
+def _repo_project(repo: dict, description: str = None) -> dict:
+    return {
+        "name": repo.get("name", ""),
+        "description": description or repo.get("description") or "",
+        "url": repo.get("html_url", ""),
+        "technologies": _repo_technologies(repo),
+    }
+
+
+def _merge_projects(llm_projects, repos: list) -> list:
+    """Project prose from the LLM; url and technologies always from the repo itself."""
+    by_name = {repo["name"].lower(): repo for repo in repos if repo.get("name")}
+    projects, seen = [], set()
+    for project in llm_projects if isinstance(llm_projects, list) else []:
+        if not isinstance(project, dict) or not project.get("name"):
+            continue
+        repo = by_name.get(str(project["name"]).lower())
+        key = repo["name"].lower() if repo else str(project["name"]).lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        if repo:
+            projects.append(_repo_project(repo, project.get("description")))
+        else:
+            # Named in the README rather than a repo of the user's
+            projects.append({
+                "name": project["name"],
+                "description": project.get("description") or "",
+                "url": project.get("url") or "",
+                "technologies": skill_matcher.normalize(project.get("technologies"), "technical"),
+            })
+    return projects
+
+
+def _fetch_github_profile(username: str, token: str = None, priority: str = INTERACTIVE) -> tuple:
+    """(profile, readme, ranked repos), the top repos carrying their language bytes."""
+    profile_data, profile_readme, repos = fetch_github_data(username, priority, token)
+    repos = rank_repos(repos)
+    # Byte counts for the top repos; the rest count by their primary language
+    languages = fetch_repo_languages(username, repos[:GITHUB_TOP_REPOS], priority, token)
+    repos = [{**repo, "languages": languages.get(repo.get("name"), repo.get("languages"))} for repo in repos]
+    return profile_data, profile_readme, repos
+
+
+def refresh_github_data(usernames, token: str = None) -> dict:
+    """Re-fetch users' GitHub data at BACKGROUND priority, so the response cache
+    (and its ETags) is warm for the next interactive build. Stops when the budget
+    left for background work runs out: {"refreshed": [...], "remaining": [...]}."""
+    usernames = list(usernames)
+    for i, username in enumerate(usernames):
+        try:
+            _fetch_github_profile(username, token, BACKGROUND)
+        except GitHubBudgetExhausted as e:
+            print(f"GitHub refresh stopped at {username}: {e}")
+            return {"refreshed": usernames[:i], "remaining": usernames[i:]}
+    return {"refreshed": usernames, "remaining": []}
+
+
+def summarize_github_profile(username: str, token: str = None) -> dict:
+    """`token` is the requesting user's stored GitHub token, if any.
+    Skills and project technologies are computed from the repos themselves;
+    the LLM only writes the summary and project descriptions."""
+    profile_data, profile_readme, repos = _fetch_github_profile(username, token)
+    technical_skills = _repo_skills([repo for repo in repos if not repo.get("fork")])
+    repos = repos[:GITHUB_TOP_REPOS]
 
     if not repos:
         # No repos — return profile data without projects instead of crashing
@@ -26,17 +158,23 @@ def summarize_github_profile(username: str) -> dict:
             "projects": [],
         }
 
-    # Prepare detailed repo information for better project extraction
+    # Only what the prose is written from; urls and technologies are filled in afterwards
     repo_details = []
-    for repo in repos[:10]:
+    for repo in repos:
         repo_details.append({
             "name": repo.get("name"),
             "description": repo.get("description"),
-            "url": repo.get("html_url"),
-            "language": repo.get("language"),
-            "stars": repo.get("stargazers_count"),
+            "technologies": _repo_technologies(repo),
+            "stars": repo.get("stars"),
         })
 
+    budgeted, _ = fit_to_budget(
+        "github.summarize",
+        {"profile": profile_data, "readme": profile_readme or "", "repos": repo_details},
+        _GITHUB_TRIM_STEPS,
+        serialize=_serialize_github_input,
+    )
+
     prompt = f"""
 You are given GitHub user metadata, profile README, and repository information.
 
@@ -45,10 +183,8 @@ Extract structured personal profile information including ALL noteworthy project
 Return ONLY valid JSON with NO markdown, NO explanations, NO trailing commas.
 
 CRITICAL: Extract projects from the repositories list. Each project must have:
-- name (string)
-- description (string, 1-2 sentences)
-- url (string, GitHub repository URL)
-- technologies (array of strings, extracted from 'language' field or common tech for that repo type)
+- name (string, exactly as the repository name)
+- description (string, 1-2 sentences on what it does, using its technologies)
 
 Fields to extract:
 {{
@@ -61,45 +197,35 @@ Fields to extract:
     "twitter": "twitter_handle"
   }},
   "education": ["School/University name if mentioned"],
-  "technicalSkills": ["Python", "JavaScript", "React", ...],
   "projects": [
     {{
-      "name": "Project Name",
-      "description": "What the project does",
-      "url": "https://github.com/user/repo",
-      "technologies": ["Python", "FastAPI"]
+      "name": "repo-name",
+      "description": "What the project does"
     }}
   ]
 }}
 
 User Metadata:
-{json.dumps(profile_data)}
+{compact_json(budgeted["profile"])}
 
 Profile README:
-{profile_readme}
+{budgeted["readme"]}
 
 Top Repositories (extract as projects):
-{json.dumps(repo_details)}
+{compact_json(budgeted["repos"])}
 """
-    raw_output = call_llm(prompt)
+    raw_output = call_llm(prompt, caller="github.summarize", validate=is_json_response)
 
     try:
         cleaned = extract_json(raw_output)
         data = json.loads(cleaned)
-        
+
+        data["projects"] = _merge_projects(data.get("projects"), repos)
         # Fallback: if no projects returned from AI, create them from repos
-        if not data.get("projects") or len(data.get("projects", [])) == 0:
-            data["projects"] = [
-                {
-                    "name": repo.get("name", ""),
-                    "description": repo.get("description", ""),
-                    "url": repo.get("html_url", ""),
-                    "technologies": [repo.get("language")] if repo.get("language") else []
-                }
-                for repo in repos[:5]
-                if repo.get("name")
-            ]
-        
+        if not data["projects"]:
+            data["projects"] = [_repo_project(repo) for repo in repos[:5] if repo.get("name")]
+
+        data["technicalSkills"] = technical_skills
         return data
     
     except json.JSONDecodeError as e:
@@ -111,15 +237,6 @@ Top Repositories (extract as projects):
             "social": {
                 "github": f"https://github.com/{username}"
             },
-            "technicalSkills": [],
-            "projects": [
-                {
-                    "name": repo.get("name", ""),
-                    "description": repo.get("description", ""),
-                    "url": repo.get("html_url", ""),
-                    "technologies": [repo.get("language")] if repo.get("language") else []
-                }
-                for repo in repos[:5]
-                if repo.get("name")
-            ]
+            "technicalSkills": technical_skills,
+            "projects": [_repo_project(repo) for repo in repos[:5] if repo.get("name")],
         }
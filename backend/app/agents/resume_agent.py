@@ -1,48 +1,68 @@
 import json
-import re
+import os
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import HTTPException
 from app.services.llm_services import call_llm
 from app.schemas.resume_schema import ResumeProfile
-from app.utils.extract_json import extract_json
-
-
-
-
-def extract_social_links(text: str):
-    social = {
-        "github": None,
-        "linkedin": None,
-        "website": None,
-        "twitter": None,
-        "leetcode": None,
-    }
-
-    urls = re.findall(
-        r"(https?://[^\s]+|www\.[^\s]+|[a-zA-Z0-9./-]+\.(com|in|org)[^\s]*)",
-        text,
-    )
-
-    flat_urls = [u[0] if isinstance(u, tuple) else u for u in urls]
-
-    for url in flat_urls:
-        lower = url.lower()
-
-        if "github.com" in lower:
-            social["github"] = url
-        elif "linkedin.com" in lower:
-            social["linkedin"] = url
-        elif "twitter.com" in lower:
-            social["twitter"] = url
-        elif "leetcode.com" in lower:
-            social["leetcode"] = url
-        else:
-            if social["website"] is None:
-                social["website"] = url
-
-    return social
-
-
-def extract_basic_info(text: str):
+from app.utils.extract_json import extract_json, is_json_response
+from app.utils.token_budget import fit_text, estimate_tokens
+from app.utils.resume_rules import extract_rule_based, confident_fields, extract_social_links, split_sections
+from app.utils.skill_matcher import skill_matcher
+from app.services.metrics import metrics
+
+# "combined" asks for basic info and sections in one LLM call; "split" uses two
+RESUME_EXTRACTION_MODE = os.getenv("RESUME_EXTRACTION_MODE", "combined").lower()
+
+# Resumes at least this long (estimated tokens) with detectable section headings are
+# extracted section by section, in parallel, in chunks of at most RESUME_CHUNK_TOKENS
+RESUME_CHUNK_MIN_TOKENS = int(os.getenv("RESUME_CHUNK_MIN_TOKENS", "1200"))
+RESUME_CHUNK_TOKENS = int(os.getenv("RESUME_CHUNK_TOKENS", "1500"))
+RESUME_SECTION_WORKERS = int(os.getenv("RESUME_SECTION_WORKERS", "6"))
+
+BASIC_INFO_FIELDS = ("name", "email", "phone", "location", "summary", "social",
+                     "technicalSkills", "softSkills", "languages")
+SECTION_FIELDS = ("experience", "education", "projects", "certifications", "publications", "awards")
+
+COMBINED_BASIC_SCHEMA = {
+    "name": '"name": "Full Name"',
+    "email": '"email": "email"',
+    "phone": '"phone": "phone"',
+    "location": '"location": "City, Country"',
+    "summary": '"summary": "Short professional summary"',
+    "social": '"social": {"github": null, "linkedin": null, "website": null, "twitter": null, "leetcode": null}',
+    "technicalSkills": '"technicalSkills": ["Python", "React"]',
+    "softSkills": '"softSkills": ["Communication"]',
+    "languages": '"languages": ["English"]',
+}
+
+SECTION_SCHEMAS = {
+    "experience": '[{"title": "Job Title", "company": "Company Name", "duration": "Start - End", "description": "What you did"}]',
+    "education": '[{"school": "University Name", "degree": "Degree", "field": "Field of Study"}]',
+    "projects": '[{"name": "Project Name", "description": "What the project is about", "technologies": ["Python"], "url": "https://example.com"}]',
+    "certifications": '["Certification name"]',
+    "publications": '["Publication title"]',
+    "awards": '["Award name"]',
+}
+
+# Sections that carry basic info; for chunked resumes only these go to the basic-info prompt
+_BASIC_INFO_SECTIONS = ("header", "summary", "skills", "soft_skills", "languages")
+
+BASIC_FIELD_DESCRIPTIONS = {
+    "name": "string",
+    "email": "string",
+    "phone": "string",
+    "location": "string",
+    "summary": "string",
+    "social": "object with github, linkedin, website, twitter, leetcode (strings)",
+    "technicalSkills": "array of skill names (strings only)",
+    "softSkills": "array of soft skill names (strings only)",
+    "languages": "array of language names (strings only)",
+}
+
+
+def extract_basic_info(text: str, fields=BASIC_INFO_FIELDS, use_cache: bool = True):
+    text = fit_text("resume.basic_info", text)
+    field_lines = "\n".join(f"- {field}: {BASIC_FIELD_DESCRIPTIONS[field]}" for field in fields)
     prompt = f"""
 You are a JSON API.
 
@@ -60,21 +80,13 @@ Example - WRONG:
   "technicalSkills": [{{"category": "Languages", "skills": ["Python"]}}]
 
 Fields:
-- name: string
-- email: string
-- phone: string
-- location: string
-- summary: string
-- social: object with github, linkedin, website, twitter, leetcode (strings)
-- technicalSkills: array of skill names (strings only)
-- softSkills: array of soft skill names (strings only)
-- languages: array of language names (strings only)
+{field_lines}
 
 Resume Text:
 {text}
 """
 
-    raw = call_llm(prompt)
+    raw = call_llm(prompt, caller="resume.basic_info", use_cache=use_cache, validate=is_json_response)
     cleaned = extract_json(raw)
 
     try:
@@ -83,21 +95,13 @@ Resume Text:
         print("BASIC INFO RAW OUTPUT:\n", raw)
         print("Basic info parsing failed, returning empty fallback")
         # Return minimal valid structure
-        return {
-            "name": None,
-            "email": None,
-            "phone": None,
-            "location": None,
-            "summary": None,
-            "social": {},
-            "technicalSkills": [],
-            "softSkills": [],
-            "languages": []
-        }
+        return {field: {} if field == "social" else [] if field.endswith(("Skills", "languages")) else None
+                for field in fields}
 
 
 
-def extract_structured_sections(text: str):
+def extract_structured_sections(text: str, use_cache: bool = True):
+    text = fit_text("resume.sections", text)
     prompt = f"""
 You are a JSON API for resume extraction.
 
@@ -145,7 +149,7 @@ Resume Text:
 {text}
 """
 
-    raw = call_llm(prompt)
+    raw = call_llm(prompt, caller="resume.sections", use_cache=use_cache, validate=is_json_response)
     cleaned = extract_json(raw)
 
     try:
@@ -165,12 +169,236 @@ Resume Text:
 
 
 
-def parse_resume(text: str) -> dict:
+def extract_resume_combined(text: str, fields=BASIC_INFO_FIELDS, use_cache: bool = True):
+    """Basic info (only the given fields) and structured sections in a single LLM call.
+    Returns None when the response is not usable so the caller can fall back."""
+    text = fit_text("resume.combined", text)
+    basic_schema = "".join(f"  {COMBINED_BASIC_SCHEMA[field]},\n" for field in fields)
+    prompt = f"""
+You are a JSON API for resume extraction.
+
+Extract personal information, skills and structured sections from this resume.
+
+Return ONLY valid JSON with NO markdown, NO explanations, NO trailing commas.
+
+Constraints:
+- Skills must be FLAT ARRAYS of strings, NOT objects with categories
+- Max 3 experience entries
+- Max 3 projects
+- Max 3 awards
+- Projects MUST include: name, description, technologies (as array), url (if available)
+- Use null for unknown strings and [] for empty sections
+
+JSON Schema:
+{{
+{basic_schema}  "experience": [
+    {{"title": "Job Title", "company": "Company Name", "duration": "Start - End", "description": "What you did"}}
+  ],
+  "education": [
+    {{"school": "University Name", "degree": "Degree", "field": "Field of Study"}}
+  ],
+  "projects": [
+    {{"name": "Project Name", "description": "What the project is about", "technologies": ["Python"], "url": "https://example.com"}}
+  ],
+  "certifications": ["Certification name"],
+  "publications": ["Publication title"],
+  "awards": ["Award name"]
+}}
+
+Resume Text:
+{text}
+"""
+
+    try:
+        raw = call_llm(prompt, caller="resume.combined", use_cache=use_cache, validate=is_json_response)
+        data = json.loads(extract_json(raw))
+    except HTTPException as e:
+        print(f"Combined resume extraction returned no usable JSON: {e.detail}")
+        return None
+    except Exception as e:
+        print(f"Combined resume extraction failed: {e}")
+        return None
+
+    if not isinstance(data, dict):
+        print("Combined resume extraction returned non-object JSON")
+        return None
+    # A reply that only covers one half (e.g. the model stopped early) is not worth keeping
+    if (fields and not any(key in data for key in fields)) or not any(key in data for key in SECTION_FIELDS):
+        print(f"Combined resume extraction incomplete, keys: {list(data.keys())}")
+        return None
+    return data
+
+
+def extract_section(name: str, body: str, use_cache: bool = True) -> list:
+    """All entries of one resume section (no item cap: the chunk is small enough)."""
+    body = fit_text(f"resume.section.{name}", body, RESUME_CHUNK_TOKENS)
+    prompt = f"""
+You are a JSON API for resume extraction.
+
+Extract every entry of the resume section below. Do not skip, merge or summarize entries.
+
+Return ONLY valid JSON with NO markdown, NO explanations, NO trailing commas.
+
+Section: {name}
+
+JSON Schema:
+{{"{name}": {SECTION_SCHEMAS[name]}}}
 
-    basic = extract_basic_info(text)
-    sections = extract_structured_sections(text)
+Section Text:
+{body}
+"""
 
-    data = {**basic, **sections}
+    raw = call_llm(prompt, caller=f"resume.section.{name}", use_cache=use_cache, validate=is_json_response)
+    try:
+        data = json.loads(extract_json(raw))
+    except (HTTPException, ValueError):
+        print(f"SECTION {name.upper()} RAW OUTPUT:\n", raw)
+        print(f"Section {name} parsing failed, returning no entries")
+        return []
+    items = data.get(name) if isinstance(data, dict) else data
+    return items if isinstance(items, list) else []
+
+
+def _section_text(sections: dict, names) -> str:
+    """Only the named sections, each under its heading, so a prompt gets just what it needs."""
+    parts = []
+    for name in names:
+        body = sections.get(name)
+        if body:
+            parts.append(body if name == "header" else f"{name.replace('_', ' ').upper()}\n{body}")
+    return "\n\n".join(parts)
+
+
+def _split_body(body: str, max_tokens: int) -> list:
+    """Split a long section at blank lines (entry boundaries) into chunks under max_tokens."""
+    if estimate_tokens(body) <= max_tokens:
+        return [body]
+    chunks, current, size = [], "", 0
+    for block in body.split("\n\n"):
+        # A single oversized block still has to be cut somewhere: fall back to its lines
+        pieces = [(block, "\n\n")] if estimate_tokens(block) <= max_tokens else [(line, "\n") for line in block.splitlines()]
+        for piece, separator in pieces:
+            tokens = estimate_tokens(piece)
+            if current and size + tokens > max_tokens:
+                chunks.append(current)
+                current, size = "", 0
+            current = f"{current}{separator}{piece}" if current else piece
+            size += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def plan_section_chunks(text: str, sections: dict = None):
+    """
+    For a long resume whose section headings we can find, return (sections, jobs)
+    where jobs are (section name, chunk text) pairs. None means the resume should go
+    through a single whole-text prompt.
+    """
+    if estimate_tokens(text) < RESUME_CHUNK_MIN_TOKENS:
+        return None
+    sections = sections or split_sections(text)
+    present = [name for name in SECTION_FIELDS if sections.get(name)]
+    if len(present) < 2:
+        return None
+    return sections, [(name, chunk) for name in present for chunk in _split_body(sections[name], RESUME_CHUNK_TOKENS)]
+
+
+def extract_sections_chunked(jobs: list, use_cache: bool = True) -> dict:
+    """Run the per-section prompts concurrently and merge them into the ResumeProfile shape."""
+    merged = {name: [] for name in SECTION_FIELDS}
+    with ThreadPoolExecutor(max_workers=max(1, min(len(jobs), RESUME_SECTION_WORKERS))) as pool:
+        results = pool.map(lambda job: extract_section(*job, use_cache=use_cache), jobs)
+        for (name, _), items in zip(jobs, results):
+            merged[name].extend(items)
+    metrics.inc("resume_chunked_total")
+    metrics.observe("resume_section_chunks", len(jobs), buckets=(1, 2, 4, 6, 8, 12, 16, 24))
+    return merged
+
+
+def extract_resume_split(text: str, fields=BASIC_INFO_FIELDS, plan=None, sections=None, use_cache: bool = True) -> dict:
+    """The multi-call path; all prompts are independent so they run concurrently.
+    With no basic-info fields left to ask for, only the section prompts are sent.
+    Known `sections` (from the PDF layout) narrow each prompt to the sections it needs."""
+    if plan is not None:
+        sections, jobs = plan
+        basic_text = _section_text(sections, _BASIC_INFO_SECTIONS)
+        extract_sections = lambda: extract_sections_chunked(jobs, use_cache)
+    elif sections:
+        basic_text = _section_text(sections, _BASIC_INFO_SECTIONS)
+        section_text = _section_text(sections, SECTION_FIELDS) or text
+        extract_sections = lambda: extract_structured_sections(section_text, use_cache)
+    else:
+        basic_text = text
+        extract_sections = lambda: extract_structured_sections(text, use_cache)
+
+    if not fields:
+        return extract_sections()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        basic = pool.submit(extract_basic_info, basic_text or text, fields, use_cache)
+        sections = pool.submit(extract_sections)
+        return {**basic.result(), **sections.result()}
+
+
+def _merge_rule_fields(data: dict, extracted: dict, known: dict) -> dict:
+    """Confident rule values win; low-confidence ones only fill gaps the LLM left."""
+    merged = dict(data)
+    for field, (value, _) in extracted.items():
+        if field in known:
+            merged[field] = value
+        elif field == "social" and isinstance(merged.get("social"), dict):
+            merged["social"] = {**value, **{k: v for k, v in merged["social"].items() if v}}
+        elif not merged.get(field):
+            merged[field] = value
+    return merged
+
+
+def parse_resume(text: str, sections: dict = None, use_cache: bool = True) -> dict:
+    """`sections` are resume sections recovered from the PDF layout, if any
+    (see pdf_parser.extract_pdf); without them headings are found line by line.
+    use_cache=False (a forced re-parse) also skips cached LLM completions."""
+
+    extracted = extract_rule_based(text, sections)
+    known = confident_fields(extracted)
+    missing = [field for field in BASIC_INFO_FIELDS if field not in known]
+    for field in BASIC_INFO_FIELDS:
+        metrics.inc("resume_field_source_total", {"field": field, "source": "llm" if field in missing else "rules"})
+    if not missing:
+        print("Resume basic info fully extracted by rules, skipping the basic-info LLM prompt")
+
+    # Long resumes are extracted per section; a single prompt would be slow and capped
+    plan = plan_section_chunks(text, sections)
+    if sections:
+        metrics.inc("resume_layout_sections_total")
+
+    if RESUME_EXTRACTION_MODE == "combined" and missing and plan is None:
+        # Sections the profile has no field for (hobbies, references) are left out of the prompt
+        prompt_text = _section_text(sections, _BASIC_INFO_SECTIONS + SECTION_FIELDS) if sections else text
+        combined = extract_resume_combined(prompt_text or text, missing, use_cache)
+        if combined is not None:
+            try:
+                return normalize_resume_data(_merge_rule_fields(combined, extracted, known), text, sections)
+            except HTTPException:
+                print("Combined resume JSON failed validation, falling back to split extraction")
+
+    try:
+        data = extract_resume_split(text, missing, plan, sections, use_cache)
+    except HTTPException:
+        raise
+    except Exception as e:
+        if not known:
+            raise
+        # Provider outage: what the rules recovered is still a usable profile
+        print(f"LLM unavailable for resume extraction ({e}), returning rule-based fields only")
+        metrics.inc("resume_rules_only_total")
+        data = {}
+
+    return normalize_resume_data(_merge_rule_fields(data, extracted, known), text, sections)
+
+
+def normalize_resume_data(data: dict, text: str, sections: dict = None) -> dict:
+    """Merge regex social links, coerce LLM output shapes and validate against ResumeProfile.
+    `sections` are the layout sections, if any (see parse_resume)."""
 
     regex_socials = extract_social_links(text)
 
@@ -182,9 +410,6 @@ def parse_resume(text: str) -> dict:
             data["social"][key] = value
 
     list_fields = [
-        "technicalSkills",
-        "softSkills",
-        "languages",
         "experience",
         "education",
         "projects",
@@ -199,29 +424,22 @@ def parse_resume(text: str) -> dict:
         elif isinstance(data.get(field), str):
             data[field] = []
 
-    # Fix technicalSkills: if it's a dict or list of dicts with sub-categories, flatten it to a list
-    if isinstance(data.get("technicalSkills"), dict):
-        skills_dict = data["technicalSkills"]
-        flattened_skills = []
-        for category, skills in skills_dict.items():
-            if isinstance(skills, list):
-                flattened_skills.extend(skills)
-            elif isinstance(skills, str):
-                flattened_skills.append(skills)
-        data["technicalSkills"] = flattened_skills
-    elif isinstance(data.get("technicalSkills"), list):
-        # Handle case where technicalSkills is a list of dicts with 'category' key
-        flattened_skills = []
-        for item in data.get("technicalSkills", []):
-            if isinstance(item, dict):
-                # Extract skills from the dict (could be 'skills' key or other keys with lists)
-                for key, value in item.items():
-                    if key != 'category' and isinstance(value, list):
-                        flattened_skills.extend(value)
-            elif isinstance(item, str):
-                flattened_skills.append(item)
-        if flattened_skills:
-            data["technicalSkills"] = flattened_skills
+    # Skills come back in many shapes (flat list, {category: [...]}, list of category
+    # dicts, comma string); flatten them and map aliases to canonical names
+    data["technicalSkills"] = skill_matcher.normalize(data.get("technicalSkills"), "technical")
+    data["softSkills"] = skill_matcher.normalize(data.get("softSkills"), "soft")
+    data["languages"] = skill_matcher.normalize(data.get("languages"), "language")
+
+    # The vocabulary scan catches stack mentions the LLM dropped from the skills list.
+    # Only the skills section is scanned: in prose "Go", "Excel" or "Swift" are just words
+    skills_section = (sections or split_sections(text)).get("skills")
+    if skills_section:
+        found = skill_matcher.find(skills_section, "technical")
+    else:
+        found = skill_matcher.find(text, "technical", prose=True)
+    for skill in found:
+        if skill not in data["technicalSkills"]:
+            data["technicalSkills"].append(skill)
 
     # Fix certifications: convert strings to dict objects
     if isinstance(data.get("certifications"), list):
@@ -253,54 +471,6 @@ def parse_resume(text: str) -> dict:
                 fixed_awards.append(award)
         data["awards"] = fixed_awards
 
-    # Fix softSkills if it's a dict or list of dicts
-    if isinstance(data.get("softSkills"), dict):
-        skills_dict = data["softSkills"]
-        flattened_skills = []
-        for category, skills in skills_dict.items():
-            if isinstance(skills, list):
-                flattened_skills.extend(skills)
-            elif isinstance(skills, str):
-                flattened_skills.append(skills)
-        data["softSkills"] = flattened_skills
-    elif isinstance(data.get("softSkills"), list):
-        # Handle case where softSkills is a list of dicts with 'category' key
-        flattened_skills = []
-        for item in data.get("softSkills", []):
-            if isinstance(item, dict):
-                # Extract skills from the dict
-                for key, value in item.items():
-                    if key != 'category' and isinstance(value, list):
-                        flattened_skills.extend(value)
-            elif isinstance(item, str):
-                flattened_skills.append(item)
-        if flattened_skills:
-            data["softSkills"] = flattened_skills
-
-    # Fix languages if it's a dict or list of dicts
-    if isinstance(data.get("languages"), dict):
-        lang_dict = data["languages"]
-        flattened_langs = []
-        for category, langs in lang_dict.items():
-            if isinstance(langs, list):
-                flattened_langs.extend(langs)
-            elif isinstance(langs, str):
-                flattened_langs.append(langs)
-        data["languages"] = flattened_langs
-    elif isinstance(data.get("languages"), list):
-        # Handle case where languages is a list of dicts
-        flattened_langs = []
-        for item in data.get("languages", []):
-            if isinstance(item, dict):
-                # Extract languages from the dict
-                for key, value in item.items():
-                    if key != 'category' and isinstance(value, list):
-                        flattened_langs.extend(value)
-            elif isinstance(item, str):
-                flattened_langs.append(item)
-        if flattened_langs:
-            data["languages"] = flattened_langs
-
     try:
         validated = ResumeProfile(**data)
         return validated.model_dump()
@@ -1,14 +1,24 @@
+import json
+import asyncio
+import zipfile
 from fastapi import APIRouter, UploadFile, Depends
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.services.pdf_parser import extract_text_from_file
+from app.services.pdf_parser import spool_pdf_upload, spool_upload, remove_spooled, extract_pdf_async
+from app.services.resume_batch import BATCH_MAX_UPLOAD_MB, ingest_resumes, iter_zip
+from app.services.github_tokens import github_tokens
+from app.services.resume_cache import (
+    text_sha256, find_parsed_resume, store_parsed_resume, record_cache_result
+)
 from app.agents.resume_agent import parse_resume
 from app.agents.github_agent import summarize_github_profile
-from app.agents.content_enhance_agent import enhance_profile_content
-from app.agents.build_profile_agent import build_profile
+from app.agents.content_enhance_agent import aenhance_profile_content, astream_enhance_profile_content
+from app.agents.build_profile_agent import abuild_profile
 from app.schemas.build_profile_schema import BuildProfileRequest
 from app.db.database import get_db
 from app.db import models
-from app.agents.analysis_agent import analyze_portfolio_trends, analyze_resume_text
+from app.agents.analysis_agent import aanalyze_portfolio_trends, aanalyze_resume_text, astream_portfolio_trends
+from app.utils.skill_matcher import skill_matcher
 from app.services.db_service import (
     create_portfolio, create_profile_data, create_skill, 
     create_social_link, create_project, create_user, get_user_by_firebase_uid
@@ -24,6 +34,34 @@ from datetime import datetime
 router = APIRouter(prefix="/ai")
 
 
+def _ai_error_message(e: Exception) -> str:
+    """Turn provider errors into a message the dashboard can show as-is."""
+    err_msg = str(e)
+    if "429" in err_msg or "Rate limit" in err_msg:
+        return "AI rate limit hit — free model allows ~20 req/min. Wait a moment and try again."
+    if "401" in err_msg or "API key not valid" in err_msg or "API_KEY_INVALID" in err_msg:
+        return "OpenRouter key invalid. Check OPENROUTER_API_KEY in backend/.env and restart the backend."
+    return err_msg
+
+
+def _event_stream(events) -> StreamingResponse:
+    """Serve (event, data) pairs from an agent as Server-Sent Events.
+    Failures mid-stream are reported as a final "error" event."""
+    async def _generate():
+        try:
+            async for event, data in events:
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            print(f"AI stream error: {e}")
+            yield f"event: error\ndata: {json.dumps({'message': _ai_error_message(e)})}\n\n"
+
+    return StreamingResponse(
+        _generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/build-profile")
 async def build_profile_route(
     payload: BuildProfileRequest, 
@@ -47,6 +85,8 @@ async def build_profile_route(
             )
         
         user_id = user.id
+        # The user's own stored GitHub token keeps their builds off the shared budget
+        github_token = github_tokens.for_user(db, user_id)
         # Create unique slug using GitHub username + timestamp
         # Format: github-username-timestamp
         # This ensures multiple portfolios for same user have unique slugs
@@ -74,14 +114,25 @@ async def build_profile_route(
             nonlocal resume_data
             if payload.resume_text:
                 try:
-                    resume_data = await asyncio.to_thread(parse_resume, payload.resume_text)
+                    cached = None
+                    if payload.force_reparse:
+                        record_cache_result("bypass")
+                    else:
+                        cached = find_parsed_resume(db, text_hash=text_sha256(payload.resume_text))
+                        record_cache_result("text_hit" if cached else "miss")
+                    if cached:
+                        resume_data = cached.parsed_json
+                    else:
+                        resume_data = await asyncio.to_thread(
+                            parse_resume, payload.resume_text, use_cache=not payload.force_reparse
+                        )
                 except Exception as e:
                     print(f"Resume parsing error: {e}")
 
         async def _parse_github():
             nonlocal github_data
             try:
-                github_data = await asyncio.to_thread(summarize_github_profile, payload.github_username)
+                github_data = await asyncio.to_thread(summarize_github_profile, payload.github_username, github_token)
             except Exception as e:
                 print(f"GitHub parsing error: {e}")
 
@@ -89,11 +140,12 @@ async def build_profile_route(
         
         # Merge profiles
         try:
-            profile_result = build_profile(
+            profile_result = await abuild_profile(
                 resume_text=payload.resume_text,
                 github_username=payload.github_username,
                 resume_data=resume_data,
-                github_data=github_data
+                github_data=github_data,
+                github_token=github_token
             )
             # Merge raw profile (has basic info) with enhanced profile (has enhanced content)
             raw_profile = profile_result.get("raw_profile") or {}
@@ -159,18 +211,19 @@ async def build_profile_route(
             )
         )
         
-        # Save resume text data if provided
-        if payload.resume_text:
-            resume_record = models.ResumeData(
-                portfolio_id=portfolio.id,
+        # Save resume text data if provided (a failed parse is not kept)
+        if payload.resume_text and resume_data:
+            store_parsed_resume(
+                db,
+                resume_data,
                 file_name="uploaded_resume.txt",
-                parsed_json=resume_data,
-                upload_date=datetime.utcnow()
+                text=payload.resume_text,
+                portfolio_id=portfolio.id,
+                commit=False,
             )
-            db.add(resume_record)
         
         # Save skills
-        for skill in merged.get("technicalSkills", []):
+        for skill in skill_matcher.normalize(merged.get("technicalSkills"), "technical"):
             if isinstance(skill, str):
                 create_skill(
                     db,
@@ -179,7 +232,7 @@ async def build_profile_route(
                 )
         
         # Save soft skills
-        for skill in merged.get("softSkills", []):
+        for skill in skill_matcher.normalize(merged.get("softSkills"), "soft"):
             if isinstance(skill, str):
                 create_skill(
                     db,
@@ -188,7 +241,7 @@ async def build_profile_route(
                 )
         
         # Save languages
-        for skill in merged.get("languages", []):
+        for skill in skill_matcher.normalize(merged.get("languages"), "language"):
             if isinstance(skill, str):
                 create_skill(
                     db,
@@ -347,10 +400,13 @@ async def build_profile_route(
 @router.post("/analyze-portfolio/{portfolio_id}")
 async def analyze_portfolio_route(
     portfolio_id: str, 
+    stream: bool = False,
     db: Session = Depends(get_db),
     firebase_user: dict = Depends(get_firebase_user)
 ):
-    """Analyze a portfolio and provide hiring trend suggestions"""
+    """Analyze a portfolio and provide hiring trend suggestions.
+    With ?stream=true the analysis is sent as Server-Sent Events: a "field"
+    event per completed field/list item, then "done" with the full analysis."""
 
     # Check the portfolio itself exists first
     portfolio = db.query(models.Portfolio).filter(models.Portfolio.id == portfolio_id).first()
@@ -384,19 +440,17 @@ async def analyze_portfolio_route(
         "projects": [{"name": p.name, "description": p.description} for p in projects]
     }
 
+    if stream:
+        return _event_stream(astream_portfolio_trends(portfolio_data))
+
     try:
-        analysis = analyze_portfolio_trends(portfolio_data)
+        analysis = await aanalyze_portfolio_trends(portfolio_data)
         return {
             "status": "success",
             "analysis": analysis
         }
     except Exception as e:
-        err_msg = str(e)
-        if "429" in err_msg or "Rate limit" in err_msg:
-            return {"status": "error", "message": "AI rate limit hit — free model allows ~20 req/min. Wait a moment and try again."}
-        if "401" in err_msg or "API key not valid" in err_msg or "API_KEY_INVALID" in err_msg:
-            return {"status": "error", "message": "OpenRouter key invalid. Check OPENROUTER_API_KEY in backend/.env and restart the backend."}
-        return {"status": "error", "message": err_msg}
+        return {"status": "error", "message": _ai_error_message(e)}
 
 
 @router.post("/analyze-resume")
@@ -410,21 +464,20 @@ async def analyze_resume_route(
     """
     resume_text = (body or {}).get("resume_text") or ""
     try:
-        analysis = analyze_resume_text(resume_text)
+        analysis = await aanalyze_resume_text(resume_text)
         return {"status": "success", "analysis": analysis}
     except Exception as e:
-        err_msg = str(e)
-        if "429" in err_msg or "Rate limit" in err_msg:
-            return {"status": "error", "message": "AI rate limit hit — free model allows ~20 req/min. Wait a moment and try again."}
-        if "401" in err_msg or "API key not valid" in err_msg or "API_KEY_INVALID" in err_msg:
-            return {"status": "error", "message": "OpenRouter key invalid. Check OPENROUTER_API_KEY in backend/.env and restart the backend."}
-        return {"status": "error", "message": err_msg}
+        return {"status": "error", "message": _ai_error_message(e)}
 
 
 @router.post("/enhance-profile")
-async def enhance_profile(profile_data: dict):
-    """Enhance profile content using AI"""
-    enhanced_content = enhance_profile_content(profile_data)
+async def enhance_profile(profile_data: dict, stream: bool = False):
+    """Enhance profile content using AI.
+    With ?stream=true the result is sent as Server-Sent Events ("field" per
+    completed field/list item, then "done")."""
+    if stream:
+        return _event_stream(astream_enhance_profile_content(profile_data))
+    enhanced_content = await aenhance_profile_content(profile_data)
     return enhanced_content
 
 
@@ -437,9 +490,12 @@ async def get_github_profile(username: str):
 @router.post("/parse-resume")
 async def parse_resume_route(
     file: UploadFile, 
+    force_reparse: bool = False,
+    db: Session = Depends(get_db),
     firebase_user: dict = Depends(get_firebase_user)
 ):
-    """Parse resume PDF"""
+    """Parse resume PDF.
+    Results are cached by file and text hash; ?force_reparse=true ignores the cache."""
     try:
         if not file:
             raise ValueError("No file provided")
@@ -447,20 +503,78 @@ async def parse_resume_route(
         if not file.filename.lower().endswith('.pdf'):
             raise ValueError("Only PDF files are supported")
         
-        text = await extract_text_from_file(file)
+        pdf_path, file_hash = await spool_pdf_upload(file)
+        try:
+            if not force_reparse:
+                cached = find_parsed_resume(db, file_hash=file_hash)
+                if cached:
+                    record_cache_result("file_hit")
+                    return {
+                        "status": "success",
+                        "text": cached.extracted_text,
+                        "structured_data": cached.parsed_json,
+                        "cached": True
+                    }
+
+            text, sections = await extract_pdf_async(pdf_path)
+        finally:
+            remove_spooled(pdf_path)
         if not text:
             raise ValueError("Could not extract text from PDF")
         
-        structured_data = parse_resume(text)
+        cached = None if force_reparse else find_parsed_resume(db, text_hash=text_sha256(text))
+        if cached:
+            # Same resume in a different file (e.g. re-exported PDF)
+            record_cache_result("text_hit")
+            structured_data = cached.parsed_json
+        else:
+            record_cache_result("bypass" if force_reparse else "miss")
+            structured_data = await asyncio.to_thread(parse_resume, text, sections, use_cache=not force_reparse)
+
+        # Remember this file too, so the next upload of it skips text extraction
+        if structured_data:
+            store_parsed_resume(db, structured_data, file_name=file.filename, file_hash=file_hash, text=text)
         
         return {
             "status": "success",
             "text": text,
-            "structured_data": structured_data
+            "structured_data": structured_data,
+            "cached": cached is not None
         }
     except Exception as e:
         print(f"Resume parse error: {e}")
         return {
             "status": "error",
             "message": str(e)
-        }
\ No newline at end of file
+        }
+
+
+@router.post("/batch-parse-resumes")
+async def batch_parse_resumes_route(
+    file: UploadFile,
+    force_reparse: bool = False,
+    db: Session = Depends(get_db),
+    firebase_user: dict = Depends(get_firebase_user)
+):
+    """Parse a zip of resume PDFs (cohort onboarding).
+    Files already stored are skipped, so an interrupted upload can be retried as-is.
+    Returns per-file status and timings."""
+    try:
+        if not file or not file.filename.lower().endswith(".zip"):
+            raise ValueError("Upload a .zip of PDF resumes")
+
+        zip_path, _ = await spool_upload(file, BATCH_MAX_UPLOAD_MB, suffix=".zip")
+        try:
+            if not zipfile.is_zipfile(zip_path):
+                raise ValueError("Uploaded file is not a valid zip archive")
+            # Member count and sizes are checked before anything is extracted
+            result = await asyncio.to_thread(ingest_resumes, iter_zip(zip_path), db, force=force_reparse)
+        finally:
+            remove_spooled(zip_path)
+        return {"status": "success", **result}
+    except Exception as e:
+        print(f"Batch resume parse error: {e}")
+        return {
+            "status": "error",
+            "message": str(e)
+        }
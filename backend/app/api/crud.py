@@ -10,6 +10,8 @@ from typing import List, Optional
 
 from app.db.database import get_db
 from app.db import models
+from app.services.github_tokens import github_tokens, encrypt_token
+from app.utils.firebase_auth import get_firebase_user
 from app.schemas.database_schemas import (
     # User
     UserCreate, UserUpdate, UserResponse,
@@ -575,38 +577,63 @@ def delete_section(section_id: str, db: Session = Depends(get_db)):
 #  API CREDENTIAL ENDPOINTS
 # ═══════════════════════════════════════════
 
-@router.post("/users/{user_id}/credentials", response_model=APICredentialResponse, status_code=201)
-def create_credential(user_id: str, cred: APICredentialCreate, db: Session = Depends(get_db)):
-    """Store an API credential for a user"""
+def _require_owner(db: Session, user_id: str, firebase_user: dict) -> models.User:
+    """The user, if it is the signed-in caller; credentials are never managed for someone else."""
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    if not user.firebase_uid or user.firebase_uid != firebase_user["firebase_uid"]:
+        raise HTTPException(status_code=403, detail="Not allowed to manage this user's credentials")
+    return user
+
+
+@router.post("/users/{user_id}/credentials", response_model=APICredentialResponse, status_code=201)
+def create_credential(
+    user_id: str,
+    cred: APICredentialCreate,
+    db: Session = Depends(get_db),
+    firebase_user: dict = Depends(get_firebase_user),
+):
+    """Store an API credential for the signed-in user"""
+    _require_owner(db, user_id, firebase_user)
     db_cred = models.APICredential(
         user_id=user_id,
         service=cred.service,
-        token=cred.token,
+        token=encrypt_token(cred.token),
         username=cred.username,
     )
     db.add(db_cred)
     db.commit()
     db.refresh(db_cred)
+    github_tokens.invalidate(user_id)
     return db_cred
 
 
 @router.get("/users/{user_id}/credentials", response_model=List[APICredentialResponse])
-def list_credentials(user_id: str, db: Session = Depends(get_db)):
-    """List all API credentials for a user (tokens hidden)"""
+def list_credentials(
+    user_id: str,
+    db: Session = Depends(get_db),
+    firebase_user: dict = Depends(get_firebase_user),
+):
+    """List all API credentials for the signed-in user (tokens hidden)"""
+    _require_owner(db, user_id, firebase_user)
     return db.query(models.APICredential).filter(models.APICredential.user_id == user_id).all()
 
 
 @router.delete("/credentials/{cred_id}", status_code=204)
-def delete_credential(cred_id: str, db: Session = Depends(get_db)):
-    """Delete an API credential"""
+def delete_credential(
+    cred_id: str,
+    db: Session = Depends(get_db),
+    firebase_user: dict = Depends(get_firebase_user),
+):
+    """Delete one of the signed-in user's API credentials"""
     cred = db.query(models.APICredential).filter(models.APICredential.id == cred_id).first()
     if not cred:
         raise HTTPException(status_code=404, detail="Credential not found")
+    _require_owner(db, cred.user_id, firebase_user)
     db.delete(cred)
     db.commit()
+    github_tokens.invalidate(cred.user_id)
     return None
 
 
@@ -57,10 +57,14 @@ class ResumeData(Base):
     __tablename__ = "resume_data"
 
     id = Column(String(36), primary_key=True, default=generate_uuid)
-    portfolio_id = Column(String(36), ForeignKey("portfolios.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Nullable: standalone /ai/parse-resume uploads are kept (as parse cache entries) before any portfolio exists
+    portfolio_id = Column(String(36), ForeignKey("portfolios.id", ondelete="CASCADE"), nullable=True, index=True)
     file_name = Column(String(255))
     file_url = Column(String(255), nullable=True)  # S3 or storage URL (nullable for text uploads)
     parsed_json = Column(JSON)  # Entire parsed resume as JSON
+    extracted_text = Column(Text, nullable=True)  # Text pulled from the file, returned on cache hits
+    file_sha256 = Column(String(64), nullable=True, index=True)  # Parse cache key: uploaded file bytes
+    text_sha256 = Column(String(64), nullable=True, index=True)  # Parse cache key: normalized extracted text
     upload_date = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -1,10 +1,18 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.ai import router as ai_router
 from app.api.crud import router as crud_router
 from app.api.portfolio import router as portfolio_router
 from app.db import models  # Import models to register them with SQLAlchemy
 from app.db.database import engine, init_db
+from app.services.llm_services import aclose_llm_clients
+from app.services.pdf_parser import shutdown_pdf_pool
+from app.services.github_service import close_github_session
+from app.services.github_tokens import github_tokens
+from app.services.llm_router import llm_router
+from app.services.metrics import metrics
+from app.utils.token_budget import budget_stats
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -24,10 +32,33 @@ app.add_middleware(
 )
 
 
+@app.on_event("shutdown")
+async def close_pooled_clients():
+    await aclose_llm_clients()
+    shutdown_pdf_pool()
+    close_github_session()
+    github_tokens.flush()
+
+
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
 
+
+@app.get("/metrics")
+def get_metrics(format: str = "json"):
+    """Aggregated LLM telemetry: per-agent latency/token histograms, cache hits,
+    retries, JSON repair counts, router health and prompt budgets.
+    ?format=prometheus returns the counters/histograms in Prometheus text format."""
+    if format == "prometheus":
+        return PlainTextResponse(metrics.prometheus())
+    return {
+        **metrics.snapshot(),
+        "llm_routes": llm_router.snapshot(),
+        "prompt_budget": budget_stats(),
+    }
+
+
 app.include_router(ai_router)
 app.include_router(crud_router)
 app.include_router(portfolio_router)
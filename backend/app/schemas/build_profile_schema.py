@@ -7,4 +7,5 @@ class BuildProfileRequest(BaseModel):
     github_username: Optional[str] = None
     resume_data: Optional[Dict] = None
     github_data: Optional[Dict] = None
-    template_type: Optional[str] = "professional"
\ No newline at end of file
+    template_type: Optional[str] = "professional"
+    force_reparse: bool = False  # ignore the resume parse cache for resume_text
\ No newline at end of file
@@ -73,10 +73,12 @@ class ResumeDataCreate(BaseModel):
 
 class ResumeDataResponse(BaseModel):
     id: str
-    portfolio_id: str
+    portfolio_id: Optional[str] = None
     file_name: str
-    file_url: str
+    file_url: Optional[str] = None
     parsed_json: dict
+    file_sha256: Optional[str] = None
+    text_sha256: Optional[str] = None
     upload_date: datetime
 
     class Config:
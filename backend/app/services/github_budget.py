@@ -0,0 +1,159 @@
+"""
+GitHub API rate-limit accounting.
+
+Every GitHub response reports the remaining budget of its resource (core,
+graphql, ...) in X-RateLimit-* headers. Budgets are per token, so state is
+kept per (resource, token id) (see github_tokens.token_id). The last reported
+values are kept in a small SQLite file so every uvicorn worker sees the same
+budget, and each request is counted against it before it is sent.
+
+Interactive fetches (a user waiting on a build) always go ahead. Background
+fetches stop spending once the budget is down to the reserve kept for
+interactive use: they wait for the reset, or are refused with
+GitHubBudgetExhausted when the reset is too far away.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Mapping, Optional
+from dotenv import load_dotenv
+from app.services.metrics import metrics
+
+load_dotenv()
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+
+class GitHubBudgetExhausted(Exception):
+    """A background fetch would have to wait longer than allowed for the budget to reset."""
+
+
+class GitHubRateBudget:
+    def __init__(
+        self,
+        state_path: Optional[str] = None,
+        reserve_fraction: float = 0.2,
+        background_max_wait: float = 300,
+    ):
+        self.state_path = state_path
+        self.reserve_fraction = reserve_fraction
+        self.background_max_wait = background_max_wait
+        self._lock = threading.Lock()
+        # "resource:token id" -> {"limit", "remaining", "reset_at"}; unknown until the first response
+        self._state = {}
+
+    @classmethod
+    def from_env(cls) -> "GitHubRateBudget":
+        return cls(
+            state_path=os.getenv("GITHUB_RATE_BUDGET_PATH", "./github_budget.db").strip() or None,
+            reserve_fraction=float(os.getenv("GITHUB_RATE_RESERVE_FRACTION", "0.2")),
+            background_max_wait=float(os.getenv("GITHUB_BACKGROUND_MAX_WAIT", "300")),
+        )
+
+    # ─────── STATE STORAGE ───────
+
+    def _with_state(self, resource: str, token_id: str, update):
+        """Run update(state) -> result atomically, in memory or in the shared SQLite file."""
+        key = f"{resource}:{token_id}"
+        if not self.state_path:
+            with self._lock:
+                return update(self._state.setdefault(key, {}))
+
+        with self._lock:
+            conn = None
+            try:
+                conn = sqlite3.connect(self.state_path, timeout=30, isolation_level=None)
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS github_rate_budget ("
+                    "resource TEXT PRIMARY KEY, rate_limit INTEGER, remaining INTEGER, reset_at REAL)"
+                )
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT rate_limit, remaining, reset_at FROM github_rate_budget WHERE resource = ?",
+                    (key,),
+                ).fetchone()
+                state = {"limit": row[0], "remaining": row[1], "reset_at": row[2]} if row else {}
+                result = update(state)
+                if state:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO github_rate_budget VALUES (?, ?, ?, ?)",
+                        (key, state["limit"], state["remaining"], state["reset_at"]),
+                    )
+                conn.execute("COMMIT")
+                return result
+            except sqlite3.Error as e:
+                print(f"GitHub rate budget: shared state unavailable ({e}), using process-local state")
+                self.state_path = None
+                return update(self._state.setdefault(key, {}))
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    # ─────── PUBLIC API ───────
+
+    def acquire(self, resource: str = "core", priority: str = INTERACTIVE, token_id: str = "anonymous") -> float:
+        """
+        Count one request against `resource` and return the seconds waited.
+        Background requests inside the interactive reserve wait for the reset
+        (or raise GitHubBudgetExhausted if it is more than background_max_wait away).
+        """
+
+        def update(state):
+            now = time.time()
+            if not state:
+                return 0.0
+            if state["reset_at"] <= now:
+                # Window rolled over: assume a full budget until a response says otherwise
+                state["remaining"] = state["limit"]
+                state["reset_at"] = now + 3600
+            reserve = int(state["limit"] * self.reserve_fraction)
+            if priority != INTERACTIVE and state["remaining"] <= reserve:
+                return state["reset_at"] - now
+            state["remaining"] = max(0, state["remaining"] - 1)
+            return 0.0
+
+        delay = self._with_state(resource, token_id, update)
+        if delay <= 0:
+            return 0.0
+        if delay > self.background_max_wait:
+            metrics.inc("github_budget_rejected_total", {"resource": resource, "priority": priority})
+            raise GitHubBudgetExhausted(
+                f"GitHub {resource} budget is reserved for interactive requests for another {delay:.0f}s"
+            )
+        metrics.inc("github_budget_delayed_total", {"resource": resource, "priority": priority})
+        time.sleep(delay)
+        return delay + self.acquire(resource, priority, token_id)
+
+    def record(self, headers: Mapping[str, str], token_id: str = "anonymous") -> None:
+        """Take the budget reported by a GitHub response as the new truth."""
+        try:
+            limit = int(headers["X-RateLimit-Limit"])
+            remaining = int(headers["X-RateLimit-Remaining"])
+            reset_at = float(headers["X-RateLimit-Reset"])
+        except (KeyError, TypeError, ValueError):
+            return
+        resource = headers.get("X-RateLimit-Resource") or "core"
+
+        def update(state):
+            state.update(limit=limit, remaining=remaining, reset_at=reset_at)
+
+        self._with_state(resource, token_id, update)
+        labels = {"resource": resource, "token": token_id}
+        metrics.set_gauge("github_rate_limit_remaining", remaining, labels)
+        metrics.set_gauge("github_rate_limit_limit", limit, labels)
+        metrics.set_gauge("github_rate_limit_reset_seconds", max(0.0, reset_at - time.time()), labels)
+
+    def exhausted_for(self, resource: str = "core", token_id: str = "anonymous") -> float:
+        """Seconds until the budget resets if it is used up, else 0."""
+
+        def update(state):
+            if not state or state["remaining"] > 0:
+                return 0.0
+            return max(0.0, state["reset_at"] - time.time())
+
+        return self._with_state(resource, token_id, update)
+
+
+github_budget = GitHubRateBudget.from_env()
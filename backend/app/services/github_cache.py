@@ -0,0 +1,137 @@
+"""
+Conditional-request cache for GitHub API responses.
+
+Every 200 response that carries an ETag or Last-Modified is stored in a small
+SQLite file with its validators. The next request for the same URL sends
+If-None-Match / If-Modified-Since; a 304 answer does not count against
+GitHub's rate limit and the stored body is served instead.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Response headers kept with the body (Link drives pagination)
+STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Link")
+
+
+class GitHubResponseCache:
+    def __init__(
+        self,
+        path: Optional[str] = "./github_cache.db",
+        fresh_seconds: float = 60,
+        max_entries: int = 5000,
+        enabled: bool = True,
+    ):
+        self.path = path
+        self.fresh_seconds = fresh_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled and bool(path)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._failed = False
+
+    @classmethod
+    def from_env(cls) -> "GitHubResponseCache":
+        return cls(
+            path=os.getenv("GITHUB_CACHE_PATH", "./github_cache.db").strip() or None,
+            fresh_seconds=float(os.getenv("GITHUB_CACHE_FRESH_SECONDS", "60")),
+            max_entries=int(os.getenv("GITHUB_CACHE_MAX_ENTRIES", "5000")),
+            enabled=os.getenv("GITHUB_CACHE_ENABLED", "true").lower() == "true",
+        )
+
+    def _db(self) -> Optional[sqlite3.Connection]:
+        """Open the SQLite store lazily; disable the cache on any error."""
+        if not self.enabled or self._failed:
+            return None
+        if self._conn is None:
+            try:
+                conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS github_responses (
+                        url TEXT PRIMARY KEY,
+                        etag TEXT,
+                        last_modified TEXT,
+                        headers TEXT NOT NULL,
+                        body BLOB NOT NULL,
+                        fetched_at REAL NOT NULL
+                    )
+                    """
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_github_responses_fetched ON github_responses(fetched_at)")
+                conn.commit()
+                self._conn = conn
+            except sqlite3.Error as e:
+                print(f"GitHub cache unavailable ({e}), requests go out uncached")
+                self._failed = True
+                return None
+        return self._conn
+
+    def get(self, url: str) -> Optional[dict]:
+        """{"etag", "last_modified", "headers", "body", "fetched_at"} or None."""
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    "SELECT etag, last_modified, headers, body, fetched_at FROM github_responses WHERE url = ?",
+                    (url,),
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"GitHub cache read error: {e}")
+                return None
+        if not row:
+            return None
+        etag, last_modified, headers, body, fetched_at = row
+        return {"etag": etag, "last_modified": last_modified, "headers": json.loads(headers),
+                "body": body, "fetched_at": fetched_at}
+
+    def is_fresh(self, entry: dict) -> bool:
+        return time.time() - entry["fetched_at"] < self.fresh_seconds
+
+    def set(self, url: str, headers, body: bytes) -> None:
+        etag, last_modified = headers.get("ETag"), headers.get("Last-Modified")
+        if not (etag or last_modified):
+            return
+        stored = {name: headers[name] for name in STORED_HEADERS if headers.get(name)}
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO github_responses (url, etag, last_modified, headers, body, fetched_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (url, etag, last_modified, json.dumps(stored), body, time.time()),
+                )
+                conn.execute(
+                    "DELETE FROM github_responses WHERE url IN ("
+                    "SELECT url FROM github_responses ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"GitHub cache write error: {e}")
+
+    def touch(self, url: str) -> None:
+        """Mark a revalidated (304) entry as fresh again."""
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return
+            try:
+                conn.execute("UPDATE github_responses SET fetched_at = ? WHERE url = ?", (time.time(), url))
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"GitHub cache write error: {e}")
+
+
+github_cache = GitHubResponseCache.from_env()
@@ -1,26 +1,153 @@
 import requests
 import base64
 import os
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+from dotenv import load_dotenv
+from requests.structures import CaseInsensitiveDict
+from app.services.github_budget import github_budget, INTERACTIVE
+from app.services.github_cache import github_cache
+from app.services.github_tokens import github_tokens, token_id
+from app.services.metrics import metrics
 
+load_dotenv()
 
-GITHUB_API_BASE = "https://api.github.com"
+# Override to point at a GitHub Enterprise instance or a local test server
+GITHUB_API_BASE = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+GITHUB_GRAPHQL_URL = os.getenv("GITHUB_GRAPHQL_URL", f"{GITHUB_API_BASE}/graphql")
+# Use the single-request GraphQL backend when GITHUB_API_TOKEN is set
+GITHUB_USE_GRAPHQL = os.getenv("GITHUB_USE_GRAPHQL", "true").lower() == "true"
+GITHUB_TIMEOUT = 10
+REPOS_PER_PAGE = 100
+GITHUB_MAX_REPO_PAGES = int(os.getenv("GITHUB_MAX_REPO_PAGES", "5"))
+RECENCY_HALF_LIFE_DAYS = 180
 
 
-def _get_headers():
-    """Get GitHub API headers with optional auth token for higher rate limits."""
+# ─────── SHARED SESSION ───────
+# One pooled keep-alive session for all GitHub calls, so concurrent fetches
+# reuse open TLS connections instead of handshaking for every request.
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=20)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def close_github_session() -> None:
+    """Close pooled connections (called on app shutdown)."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def _get_headers(token: Optional[str] = None):
+    """Get GitHub API headers with optional auth token for higher rate limits.
+    `token` (a user's or pooled token) takes precedence over GITHUB_API_TOKEN."""
     headers = {"Accept": "application/vnd.github.v3+json"}
-    token = os.getenv("GITHUB_API_TOKEN", "").strip()
+    token = token or github_tokens.env_token()
     if token:
         headers["Authorization"] = f"token {token}"
     return headers
 
 
-def fetch_user_profile(username: str):
+def _cached_response(url: str, entry: dict) -> requests.Response:
+    """A 200 Response rebuilt from a stored entry, so callers never see the 304."""
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response._content = entry["body"]
+    response.headers = CaseInsensitiveDict(entry["headers"])
+    return response
+
+
+def _rate_limited(response: requests.Response) -> bool:
+    return response.status_code in (403, 429) and response.headers.get("X-RateLimit-Remaining") == "0"
+
+
+def _get(url: str, resource: str, priority: str = INTERACTIVE, token: Optional[str] = None) -> Optional[requests.Response]:
+    """
+    GET over the shared session, timed per resource. None on a network error.
+    Revalidates against the response cache: a 304 (free of rate-limit cost) is
+    answered from storage, and a stored copy younger than
+    GITHUB_CACHE_FRESH_SECONDS is served without a request at all. The request
+    is counted against the shared rate budget; background requests may wait for
+    it (or raise GitHubBudgetExhausted), and with the budget used up a stored
+    copy is served rather than spending a request on a 403.
+    """
+    entry = github_cache.get(url)
+    if entry and github_cache.is_fresh(entry):
+        metrics.inc("github_cache_total", {"resource": resource, "result": "fresh"})
+        return _cached_response(url, entry)
+    token = token or github_tokens.env_token()
+    headers = _get_headers(token)
+    if entry and github_budget.exhausted_for("core", token_id(token)):
+        metrics.inc("github_cache_total", {"resource": resource, "result": "stale"})
+        return _cached_response(url, entry)
+    github_budget.acquire("core", priority, token_id(token))
+
+    if entry:
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    started = time.perf_counter()
+    try:
+        response = _get_session().get(url, headers=headers, timeout=GITHUB_TIMEOUT)
+    except requests.RequestException as e:
+        print(f"GitHub request failed ({resource}): {e}")
+        metrics.inc("github_requests_total", {"resource": resource, "status": "error"})
+        if entry:
+            # Better an old copy than the not-found fallback
+            metrics.inc("github_cache_total", {"resource": resource, "result": "stale"})
+            return _cached_response(url, entry)
+        return None
+    finally:
+        metrics.observe("github_request_seconds", time.perf_counter() - started, {"resource": resource})
+    metrics.inc("github_requests_total", {"resource": resource, "status": str(response.status_code)})
+    github_budget.record(response.headers, token_id(token))
+    github_tokens.mark_used(token)
+    if response.status_code == 401:
+        github_tokens.mark_invalid(token)
+
+    if _rate_limited(response):
+        print(f"GitHub rate limit exhausted ({resource}), resets in {github_budget.exhausted_for('core', token_id(token)):.0f}s")
+        if entry:
+            metrics.inc("github_cache_total", {"resource": resource, "result": "stale"})
+            return _cached_response(url, entry)
+    if response.status_code == 304 and entry:
+        github_cache.touch(url)
+        metrics.inc("github_cache_total", {"resource": resource, "result": "revalidated"})
+        return _cached_response(url, entry)
+    if response.status_code == 200:
+        github_cache.set(url, response.headers, response.content)
+        metrics.inc("github_cache_total", {"resource": resource, "result": "miss" if not entry else "changed"})
+    return response
+
+
+def fetch_user_profile(username: str, priority: str = INTERACTIVE, token: Optional[str] = None):
     url = f"{GITHUB_API_BASE}/users/{username}"
-    response = requests.get(url, headers=_get_headers(), timeout=10)
+    response = _get(url, "profile", priority, token)
 
-    if response.status_code != 200:
-        print(f"GitHub user '{username}' not found (status {response.status_code})")
+    if response is None or response.status_code != 200:
+        print(f"GitHub user '{username}' not found (status {getattr(response, 'status_code', None)})")
         return {
             "name": username,
             "bio": None,
@@ -47,11 +174,11 @@ def fetch_user_profile(username: str):
     }
 
 
-def fetch_profile_readme(username: str):
+def fetch_profile_readme(username: str, priority: str = INTERACTIVE, token: Optional[str] = None):
     url = f"{GITHUB_API_BASE}/repos/{username}/{username}/contents/README.md"
-    response = requests.get(url, headers=_get_headers(), timeout=10)
+    response = _get(url, "readme", priority, token)
 
-    if response.status_code != 200:
+    if response is None or response.status_code != 200:
         return ""  # No README, return empty string instead of throwing
 
     data = response.json()
@@ -62,29 +189,240 @@ def fetch_profile_readme(username: str):
         return ""
 
 
-def fetch_user_repos(username: str):
-    url = f"{GITHUB_API_BASE}/users/{username}/repos"
-    response = requests.get(url, headers=_get_headers(), timeout=10)
+def _simplify_repo(repo: dict) -> dict:
+    return {
+        "name": repo.get("name"),
+        "description": repo.get("description"),
+        "language": repo.get("language"),
+        "stars": repo.get("stargazers_count"),
+        "topics": repo.get("topics", []),
+        "url": repo.get("html_url"),
+        "html_url": repo.get("html_url"),
+        "pushed_at": repo.get("pushed_at"),
+        "fork": bool(repo.get("fork")),
+        "archived": bool(repo.get("archived")),
+    }
+
 
-    if response.status_code != 200:
-        print(f"Could not fetch repos for '{username}' (status {response.status_code})")
+def _last_page(response: requests.Response) -> int:
+    last = response.links.get("last", {}).get("url")
+    if not last:
+        return 1
+    page = parse_qs(urlparse(last).query).get("page", ["1"])[0]
+    return int(page) if page.isdigit() else 1
+
+
+def fetch_user_repos(username: str, priority: str = INTERACTIVE, token: Optional[str] = None):
+    """
+    Every public repo of the user (forks flagged, not dropped; see rank_repos).
+    The first page tells us the page count from its Link header; the rest
+    are fetched concurrently, up to GITHUB_MAX_REPO_PAGES pages of 100.
+    """
+    url = f"{GITHUB_API_BASE}/users/{username}/repos?per_page={REPOS_PER_PAGE}"
+    response = _get(f"{url}&page=1", "repos", priority, token)
+
+    if response is None or response.status_code != 200:
+        print(f"Could not fetch repos for '{username}' (status {getattr(response, 'status_code', None)})")
         return []  # Return empty list instead of throwing
 
-    repos = response.json()
+    repos = list(response.json())
+    pages = range(2, min(_last_page(response), GITHUB_MAX_REPO_PAGES) + 1)
+    if pages:
+        with ThreadPoolExecutor(max_workers=min(len(pages), 4), thread_name_prefix="github-repos") as pool:
+            for page in pool.map(lambda n: _get(f"{url}&page={n}", "repos", priority, token), pages):
+                # A missing page costs us some repos, not the whole list
+                if page is not None and page.status_code == 200:
+                    repos.extend(page.json())
+
+    return [_simplify_repo(repo) for repo in repos]
+
+
+def fetch_repo_languages(username: str, repos: list, priority: str = INTERACTIVE, token: Optional[str] = None) -> dict:
+    """
+    {repo name: {language: bytes}} for the given repos, fetched concurrently.
+    Repos that already carry a "languages" breakdown (GraphQL) are not fetched
+    again; a failed fetch leaves its repo out rather than failing the rest.
+    """
+    token = token or github_tokens.pick()
+    found = {repo["name"]: repo["languages"] for repo in repos if repo.get("languages") is not None}
+    missing = [repo["name"] for repo in repos if repo.get("name") and repo.get("languages") is None]
+
+    def fetch(name):
+        response = _get(f"{GITHUB_API_BASE}/repos/{username}/{name}/languages", "languages", priority, token)
+        if response is None or response.status_code != 200:
+            return name, None
+        return name, response.json()
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(len(missing), 8), thread_name_prefix="github-languages") as pool:
+            for name, languages in pool.map(fetch, missing):
+                if isinstance(languages, dict):
+                    found[name] = languages
+    return found
+
+
+def _days_since(timestamp: Optional[str]) -> Optional[float]:
+    if not timestamp:
+        return None
+    try:
+        pushed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return max(0.0, (datetime.now(timezone.utc) - pushed).total_seconds() / 86400)
+
+
+def repo_score(repo: dict) -> float:
+    """How much a repo says about its owner: stars, recent pushes, topics, a description,
+    being pinned; forks and archives count less."""
+    score = math.log1p(repo.get("stars") or 0) * 2
+    days = _days_since(repo.get("pushed_at"))
+    if days is not None:
+        # Halves every RECENCY_HALF_LIFE_DAYS without a push
+        score += 3 * 0.5 ** (days / RECENCY_HALF_LIFE_DAYS)
+    score += 0.3 * min(len(repo.get("topics") or []), 5)
+    if repo.get("description"):
+        score += 1
+    if repo.get("pinned"):
+        # The owner chose to show it
+        score += 5
+    if repo.get("fork"):
+        score -= 3
+    if repo.get("archived"):
+        score -= 1
+    return score
+
+
+def rank_repos(repos: list, top_n: Optional[int] = None) -> list:
+    """Repos ordered by repo_score (stable for ties), cut to top_n."""
+    ranked = sorted(repos, key=repo_score, reverse=True)
+    return ranked[:top_n] if top_n else ranked
+
+
+# ─────── GRAPHQL ───────
+# With a token, one GraphQL query returns what the three REST calls (plus
+# pagination) would: profile, pinned and recently pushed repos with languages
+# and topics, and the profile README.
+
+GITHUB_GRAPHQL_QUERY = """
+query($login: String!) {
+  user(login: $login) {
+    login name bio location company avatarUrl url
+    followers { totalCount }
+    following { totalCount }
+    pinnedItems(first: 6, types: REPOSITORY) { nodes { ... on Repository { ...RepoFields } } }
+    repositories(first: 100, privacy: PUBLIC, ownerAffiliations: OWNER,
+                 orderBy: {field: PUSHED_AT, direction: DESC}) {
+      totalCount
+      nodes { ...RepoFields }
+    }
+    readme: repository(name: $login) {
+      object(expression: "HEAD:README.md") { ... on Blob { text } }
+    }
+  }
+}
+
+fragment RepoFields on Repository {
+  name description url isFork isArchived stargazerCount pushedAt
+  primaryLanguage { name }
+  languages(first: 10, orderBy: {field: SIZE, direction: DESC}) { edges { size node { name } } }
+  repositoryTopics(first: 10) { nodes { topic { name } } }
+}
+"""
+
+
+def _graphql_repo(node: dict, pinned: bool = False) -> dict:
+    html_url = node.get("url")
+    return {
+        "name": node.get("name"),
+        "description": node.get("description"),
+        "language": (node.get("primaryLanguage") or {}).get("name"),
+        "stars": node.get("stargazerCount"),
+        "topics": [t["topic"]["name"] for t in (node.get("repositoryTopics") or {}).get("nodes", [])],
+        "url": html_url,
+        "html_url": html_url,
+        "pushed_at": node.get("pushedAt"),
+        "fork": bool(node.get("isFork")),
+        "archived": bool(node.get("isArchived")),
+        "languages": {e["node"]["name"]: e["size"] for e in (node.get("languages") or {}).get("edges", [])},
+        "pinned": pinned,
+    }
+
+
+def fetch_github_data_graphql(username: str, priority: str = INTERACTIVE, token: Optional[str] = None) -> Optional[tuple]:
+    """(profile, readme, repos) from one GraphQL request, or None if it could not be answered
+    (no token, network/auth error, unknown user) and the REST path should be used."""
+    headers = _get_headers(token)
+    if "Authorization" not in headers:
+        return None  # GraphQL does not allow anonymous access
+    token = token or github_tokens.env_token()
+    if github_budget.exhausted_for("graphql", token_id(token)):
+        return None  # REST has its own budget (and cached copies)
+    github_budget.acquire("graphql", priority, token_id(token))
+
+    started = time.perf_counter()
+    try:
+        response = _get_session().post(
+            GITHUB_GRAPHQL_URL,
+            json={"query": GITHUB_GRAPHQL_QUERY, "variables": {"login": username}},
+            headers=headers,
+            timeout=GITHUB_TIMEOUT,
+        )
+        payload = response.json() if response.status_code == 200 else {}
+    except (requests.RequestException, ValueError) as e:
+        print(f"GitHub GraphQL request failed: {e}")
+        metrics.inc("github_requests_total", {"resource": "graphql", "status": "error"})
+        return None
+    finally:
+        metrics.observe("github_request_seconds", time.perf_counter() - started, {"resource": "graphql"})
+    metrics.inc("github_requests_total", {"resource": "graphql", "status": str(response.status_code)})
+    github_budget.record(response.headers, token_id(token))
+    github_tokens.mark_used(token)
+    if response.status_code == 401:
+        github_tokens.mark_invalid(token)
+
+    user = (payload.get("data") or {}).get("user")
+    if not user:
+        errors = [e.get("message") for e in payload.get("errors") or []]
+        print(f"GitHub GraphQL returned no user for '{username}' (status {response.status_code}, {errors}), using REST")
+        return None
+
+    profile = {
+        "name": user.get("name") or username,
+        "bio": user.get("bio"),
+        "location": user.get("location"),
+        "company": user.get("company"),
+        "avatar_url": user.get("avatarUrl"),
+        "profile_url": user.get("url"),
+        "followers": (user.get("followers") or {}).get("totalCount"),
+        "following": (user.get("following") or {}).get("totalCount"),
+        "public_repos": (user.get("repositories") or {}).get("totalCount"),
+    }
+    readme = (((user.get("readme") or {}).get("object") or {}).get("text") or "")[:4000]
 
-    simplified = []
-    for repo in repos:
-        if repo.get("fork"):
-            continue
+    repos, seen = [], set()
+    pinned = [(node, True) for node in (user.get("pinnedItems") or {}).get("nodes", []) if node]
+    owned = [(node, False) for node in (user.get("repositories") or {}).get("nodes", []) if node]
+    for node, is_pinned in pinned + owned:
+        if node.get("url") not in seen:
+            seen.add(node.get("url"))
+            repos.append(_graphql_repo(node, is_pinned))
+    return profile, readme, repos
 
-        simplified.append({
-            "name": repo.get("name"),
-            "description": repo.get("description"),
-            "language": repo.get("language"),
-            "stars": repo.get("stargazers_count"),
-            "topics": repo.get("topics", []),
-            "url": repo.get("html_url"),
-            "html_url": repo.get("html_url"),
-        })
 
-    return simplified
\ No newline at end of file
+def fetch_github_data(username: str, priority: str = INTERACTIVE, token: Optional[str] = None) -> tuple:
+    """(profile, readme, repos) for a user: one GraphQL request when a token is
+    available, otherwise the three REST requests made concurrently.
+    `token` is the requesting user's own token; without one a token from the
+    stored-credential pool is used (see github_tokens).
+    priority=BACKGROUND for work nobody is waiting on (see github_budget)."""
+    started = time.perf_counter()
+    token = token or github_tokens.pick()
+    result = fetch_github_data_graphql(username, priority, token) if GITHUB_USE_GRAPHQL else None
+    if result is None:
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="github") as pool:
+            profile = pool.submit(fetch_user_profile, username, priority, token)
+            readme = pool.submit(fetch_profile_readme, username, priority, token)
+            repos = pool.submit(fetch_user_repos, username, priority, token)
+            result = profile.result(), readme.result(), repos.result()
+    metrics.observe("github_fetch_seconds", time.perf_counter() - started)
+    return result
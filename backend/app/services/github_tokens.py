@@ -0,0 +1,229 @@
+"""
+GitHub tokens from stored API credentials.
+
+Tokens saved through /api/users/{user_id}/credentials are encrypted with
+Fernet (CREDENTIALS_ENCRYPTION_KEY). Rows written before a key was configured
+hold plaintext and are still read as-is. Decrypted tokens are kept in memory
+for a few minutes so a build does not decrypt on every request.
+
+A fetch on behalf of a user uses that user's token; anonymous lookups rotate
+over every stored GitHub token (plus GITHUB_API_TOKEN), skipping tokens whose
+rate budget is used up, so each token's 5000/hour is spent in turn. A token
+GitHub answers with 401 (revoked or expired) is marked invalid and left out of
+the pool and of per-user lookups for the life of the process.
+last_used is updated in batched writes rather than once per request.
+"""
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from cryptography.fernet import Fernet, InvalidToken
+from dotenv import load_dotenv
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.db import models
+from app.db.database import SessionLocal
+from app.services.github_budget import github_budget
+
+load_dotenv()
+
+ENCRYPTED_PREFIX = "fernet:"
+
+
+# ─────── ENCRYPTION ───────
+
+def _load_fernet() -> Optional[Fernet]:
+    key = os.getenv("CREDENTIALS_ENCRYPTION_KEY", "").strip()
+    if not key:
+        print("CREDENTIALS_ENCRYPTION_KEY is not set, API credentials are stored unencrypted")
+        return None
+    try:
+        return Fernet(key.encode())
+    except ValueError as e:
+        print(f"CREDENTIALS_ENCRYPTION_KEY is not a valid Fernet key ({e}), API credentials are stored unencrypted")
+        return None
+
+
+_fernet = _load_fernet()
+
+
+def encrypt_token(token: str) -> str:
+    if _fernet is None:
+        return token
+    return ENCRYPTED_PREFIX + _fernet.encrypt(token.encode()).decode()
+
+
+def decrypt_token(stored: str) -> Optional[str]:
+    """Plaintext token; legacy unprefixed rows are plaintext already. None if undecryptable."""
+    if not stored or not stored.startswith(ENCRYPTED_PREFIX):
+        return stored
+    if _fernet is None:
+        print("Encrypted API credential found but CREDENTIALS_ENCRYPTION_KEY is not set")
+        return None
+    try:
+        return _fernet.decrypt(stored[len(ENCRYPTED_PREFIX):].encode()).decode()
+    except InvalidToken:
+        print("API credential could not be decrypted (key changed?), ignoring it")
+        return None
+
+
+def token_id(token: Optional[str]) -> str:
+    """Short, non-reversible label for a token (budget keys, metrics)."""
+    return hashlib.sha256(token.encode()).hexdigest()[:12] if token else "anonymous"
+
+
+# ─────── TOKEN STORE ───────
+
+class GitHubTokenStore:
+    def __init__(self, cache_seconds: float = 300, flush_seconds: float = 60):
+        self.cache_seconds = cache_seconds
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._user_tokens: Dict[str, Tuple[float, Optional[str]]] = {}  # user id -> (expires_at, token)
+        self._pool: List[str] = []
+        self._pool_expires_at = 0.0
+        self._next = 0
+        self._credential_ids: Dict[str, str] = {}  # token_id -> credential id
+        self._used: Dict[str, datetime] = {}  # credential id -> last use not yet written
+        self._invalid: Set[str] = set()  # token ids GitHub rejected with 401
+        self._last_flush = time.time()
+
+    @classmethod
+    def from_env(cls) -> "GitHubTokenStore":
+        return cls(
+            cache_seconds=float(os.getenv("GITHUB_TOKEN_CACHE_SECONDS", "300")),
+            flush_seconds=float(os.getenv("GITHUB_TOKEN_LAST_USED_FLUSH_SECONDS", "60")),
+        )
+
+    def _credentials(self, db: Session, user_id: Optional[str] = None) -> List[Tuple[str, str]]:
+        """(credential id, plaintext token) for stored GitHub credentials, newest first."""
+        query = db.query(models.APICredential).filter(models.APICredential.service == "github")
+        if user_id:
+            query = query.filter(models.APICredential.user_id == user_id)
+        rows = query.order_by(models.APICredential.created_at.desc()).all()
+        found = []
+        for row in rows:
+            token = decrypt_token(row.token)
+            if token:
+                found.append((row.id, token))
+        return found
+
+    def for_user(self, db: Session, user_id: str) -> Optional[str]:
+        """The user's own GitHub token, if they stored one."""
+        now = time.time()
+        with self._lock:
+            cached = self._user_tokens.get(user_id)
+            if cached and cached[0] > now:
+                return cached[1]
+        try:
+            credentials = self._credentials(db, user_id)
+        except SQLAlchemyError as e:
+            print(f"Could not load GitHub credentials for user {user_id}: {e}")
+            return None
+        credentials = [c for c in credentials if not self.is_invalid(c[1])]
+        token = credentials[0][1] if credentials else None
+        with self._lock:
+            if token:
+                self._credential_ids[token_id(token)] = credentials[0][0]
+            self._user_tokens[user_id] = (now + self.cache_seconds, token)
+        return token
+
+    def env_token(self) -> Optional[str]:
+        """GITHUB_API_TOKEN, unless GitHub has rejected it."""
+        token = os.getenv("GITHUB_API_TOKEN", "").strip()
+        return token if token and not self.is_invalid(token) else None
+
+    def _load_pool(self) -> None:
+        env_token = self.env_token()
+        try:
+            with SessionLocal() as db:
+                credentials = self._credentials(db)
+        except SQLAlchemyError as e:
+            print(f"Could not load the GitHub token pool: {e}")
+            credentials = []
+        tokens = [token for _, token in credentials]
+        if env_token and env_token not in tokens:
+            tokens.append(env_token)
+        with self._lock:
+            for credential_id, token in credentials:
+                self._credential_ids[token_id(token)] = credential_id
+            # De-duplicated, order kept; a token rejected while loading stays out
+            self._pool = [t for t in dict.fromkeys(tokens) if token_id(t) not in self._invalid]
+            self._pool_expires_at = time.time() + self.cache_seconds
+
+    def pick(self) -> Optional[str]:
+        """Next token in rotation for an anonymous lookup, skipping exhausted budgets.
+        None when no token is available (unauthenticated requests)."""
+        if time.time() >= self._pool_expires_at:
+            self._load_pool()
+        with self._lock:
+            pool = list(self._pool)
+            start = self._next
+            self._next += 1
+        for offset in range(len(pool)):
+            token = pool[(start + offset) % len(pool)]
+            if not github_budget.exhausted_for("core", token_id(token)):
+                return token
+        return pool[start % len(pool)] if pool else None
+
+    def mark_used(self, token: Optional[str]) -> None:
+        """Note a request made with a stored token; written to last_used in batches."""
+        if not token:
+            return
+        with self._lock:
+            credential_id = self._credential_ids.get(token_id(token))
+            if credential_id:
+                self._used[credential_id] = datetime.utcnow()
+            due = self._used and time.time() - self._last_flush >= self.flush_seconds
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write pending last_used times in one transaction (also called on shutdown)."""
+        with self._lock:
+            pending, self._used = self._used, {}
+            self._last_flush = time.time()
+        if not pending:
+            return
+        try:
+            with SessionLocal() as db:
+                db.bulk_update_mappings(
+                    models.APICredential,
+                    [{"id": credential_id, "last_used": used} for credential_id, used in pending.items()],
+                )
+                db.commit()
+        except SQLAlchemyError as e:
+            print(f"Could not update credential last_used: {e}")
+
+    def is_invalid(self, token: Optional[str]) -> bool:
+        with self._lock:
+            return bool(token) and token_id(token) in self._invalid
+
+    def mark_invalid(self, token: Optional[str]) -> None:
+        """GitHub rejected the token (401): stop handing it out."""
+        if not token:
+            return
+        label = token_id(token)
+        with self._lock:
+            if label in self._invalid:
+                return
+            self._invalid.add(label)
+            self._pool = [t for t in self._pool if t != token]
+            # Users whose cached token this was look their credentials up again
+            for user_id in [u for u, (_, t) in self._user_tokens.items() if t == token]:
+                del self._user_tokens[user_id]
+        print(f"GitHub rejected token {label} (401), removed it from rotation")
+
+    def invalidate(self, user_id: Optional[str] = None) -> None:
+        """Forget cached tokens after credentials change."""
+        with self._lock:
+            if user_id:
+                self._user_tokens.pop(user_id, None)
+            else:
+                self._user_tokens.clear()
+            self._pool_expires_at = 0.0
+
+
+github_tokens = GitHubTokenStore.from_env()
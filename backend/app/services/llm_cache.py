@@ -0,0 +1,186 @@
+"""
+Content-addressed cache for LLM responses.
+
+An in-memory LRU sits in front of a small SQLite file so repeat prompts
+(rebuilding the same portfolio, re-running an analysis) skip the network
+entirely and survive restarts.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def make_cache_key(provider: str, model: str, max_tokens: int, prompt: str) -> str:
+    """Hash everything that changes the completion into a stable key."""
+    payload = json.dumps(
+        {"provider": provider, "model": model, "max_tokens": max_tokens, "prompt": prompt},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Two-level (memory LRU + SQLite) cache with TTL and size-based eviction."""
+
+    def __init__(
+        self,
+        path: Optional[str] = "./llm_cache.db",
+        ttl: float = 86400,
+        max_memory_entries: int = 256,
+        max_disk_entries: int = 5000,
+        enabled: bool = True,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.enabled = enabled
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disk_failed = False
+
+    @classmethod
+    def from_env(cls) -> "LLMCache":
+        return cls(
+            path=os.getenv("LLM_CACHE_PATH", "./llm_cache.db").strip() or None,
+            ttl=float(os.getenv("LLM_CACHE_TTL", "86400")),
+            max_memory_entries=int(os.getenv("LLM_CACHE_MAX_MEMORY_ENTRIES", "256")),
+            max_disk_entries=int(os.getenv("LLM_CACHE_MAX_DISK_ENTRIES", "5000")),
+            enabled=os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true",
+        )
+
+    # ─────── DISK BACKEND ───────
+
+    def _disk(self) -> Optional[sqlite3.Connection]:
+        """Open the SQLite store lazily; fall back to memory-only on any error."""
+        if not self.path or self._disk_failed:
+            return None
+        if self._conn is None:
+            try:
+                conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS llm_cache (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        expires_at REAL NOT NULL,
+                        last_access REAL NOT NULL
+                    )
+                    """
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache(last_access)")
+                conn.commit()
+                self._conn = conn
+            except sqlite3.Error as e:
+                print(f"LLM cache: disk store unavailable ({e}), using memory only")
+                self._disk_failed = True
+                return None
+        return self._conn
+
+    def _disk_get(self, key: str, now: float) -> Optional[tuple]:
+        conn = self._disk()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if not row:
+                return None
+            value, expires_at = row
+            if expires_at < now:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                conn.commit()
+                return None
+            conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+            return expires_at, value
+        except sqlite3.Error as e:
+            print(f"LLM cache read error: {e}")
+            return None
+
+    def _disk_set(self, key: str, value: str, now: float, expires_at: float) -> None:
+        conn = self._disk()
+        if conn is None:
+            return
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, now, expires_at, now),
+            )
+            conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (now,))
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_entries,),
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"LLM cache write error: {e}")
+
+    # ─────── PUBLIC API ───────
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached completion, or None on miss/expiry."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= now:
+                    self._memory.move_to_end(key)
+                    return value
+                del self._memory[key]
+
+            entry = self._disk_get(key, now)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            self._remember(key, value, expires_at)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        """Store a completion in both tiers."""
+        if not self.enabled or not value:
+            return
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+            self._disk_set(key, value, now, expires_at)
+
+    def clear(self) -> None:
+        """Drop every cached entry (memory and disk)."""
+        with self._lock:
+            self._memory.clear()
+            conn = self._disk()
+            if conn is not None:
+                try:
+                    conn.execute("DELETE FROM llm_cache")
+                    conn.commit()
+                except sqlite3.Error as e:
+                    print(f"LLM cache clear error: {e}")
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+
+llm_cache = LLMCache.from_env()
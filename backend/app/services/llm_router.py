@@ -0,0 +1,285 @@
+"""
+Latency-aware routing across LLM providers/models.
+
+Every configured (provider, model) pair is a route. The router keeps an
+exponentially weighted moving average of latency and error rate per route,
+tries the fastest healthy one first and falls back down the list on
+failure. Routes that fail repeatedly are put on a short cooldown.
+
+With LLM_HEDGE=true a second request is fired on the next-best route when
+the first has not answered within that route's p95 latency (or right away
+if the first fails sooner); whichever
+finishes first wins and the other is cancelled (async) or ignored (sync).
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_OPENROUTER_MODEL = "google/gemma-3-4b-it:free"
+DEFAULT_GEMINI_MODEL = "gemini-2.0-flash"
+
+
+@dataclass(frozen=True)
+class Route:
+    provider: str
+    model: str
+
+
+@dataclass
+class RouteStats:
+    latency_ewma: Optional[float] = None
+    error_ewma: float = 0.0
+    samples: deque = field(default_factory=lambda: deque(maxlen=50))
+    calls: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    cooldown_until: float = 0.0
+
+    def p95(self) -> Optional[float]:
+        if len(self.samples) < 5:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class LLMRouter:
+    """Tracks per-route health and runs calls over the best routes with fallback/hedging."""
+
+    def __init__(
+        self,
+        alpha: float = 0.3,
+        hedge: bool = False,
+        default_hedge_delay: float = 8.0,
+        failure_threshold: int = 3,
+        cooldown: float = 60.0,
+    ):
+        self.alpha = alpha
+        self.hedge = hedge
+        self.default_hedge_delay = default_hedge_delay
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @classmethod
+    def from_env(cls) -> "LLMRouter":
+        return cls(
+            hedge=os.getenv("LLM_HEDGE", "false").lower() == "true",
+            default_hedge_delay=float(os.getenv("LLM_HEDGE_DELAY", "8")),
+            cooldown=float(os.getenv("LLM_ROUTE_COOLDOWN", "60")),
+        )
+
+    # ─────── ROUTE SELECTION ───────
+
+    def configured_routes(self) -> List[Route]:
+        """Routes in configuration order: OpenRouter primary, its fallbacks, then Gemini."""
+        routes = []
+        if os.getenv("OPENROUTER_API_KEY", "").strip():
+            routes.append(Route("openrouter", os.getenv("OPENROUTER_MODEL", DEFAULT_OPENROUTER_MODEL)))
+            for model in os.getenv("OPENROUTER_FALLBACK_MODELS", "").split(","):
+                if model.strip():
+                    routes.append(Route("openrouter", model.strip()))
+        if os.getenv("GEMINI_API_KEY", "").strip():
+            routes.append(Route("gemini", os.getenv("GEMINI_MODEL", DEFAULT_GEMINI_MODEL)))
+        return list(dict.fromkeys(routes))
+
+    def _get_stats(self, route: Route) -> RouteStats:
+        stats = self._stats.get(route)
+        if stats is None:
+            stats = self._stats[route] = RouteStats()
+        return stats
+
+    def ranked_routes(self) -> List[Route]:
+        """Healthy routes fastest-first (error-weighted), cooling-down routes last.
+
+        Untried fallbacks rank after measured routes so the configured primary
+        keeps serving until there is evidence against it."""
+        routes = self.configured_routes()
+        now = time.time()
+        with self._lock:
+            def sort_key(indexed):
+                index, route = indexed
+                stats = self._get_stats(route)
+                cooling = stats.cooldown_until > now
+                if stats.latency_ewma is None:
+                    return (cooling, index != 0, 0.0, index)
+                return (cooling, False, stats.latency_ewma * (1 + 4 * stats.error_ewma), index)
+
+            return [route for _, route in sorted(enumerate(routes), key=sort_key)]
+
+    def primary_route(self) -> Route:
+        routes = self.ranked_routes()
+        if not routes:
+            raise ValueError("No LLM API key configured. Set OPENROUTER_API_KEY or GEMINI_API_KEY in backend/.env")
+        return routes[0]
+
+    def hedge_delay(self, route: Route) -> float:
+        with self._lock:
+            p95 = self._get_stats(route).p95()
+        return p95 if p95 is not None else self.default_hedge_delay
+
+    # ─────── BOOKKEEPING ───────
+
+    def record(self, route: Route, latency: float, ok: bool) -> None:
+        with self._lock:
+            stats = self._get_stats(route)
+            stats.calls += 1
+            stats.error_ewma = self.alpha * (0.0 if ok else 1.0) + (1 - self.alpha) * stats.error_ewma
+            if ok:
+                stats.samples.append(latency)
+                stats.latency_ewma = (
+                    latency if stats.latency_ewma is None
+                    else self.alpha * latency + (1 - self.alpha) * stats.latency_ewma
+                )
+                stats.consecutive_failures = 0
+            else:
+                stats.failures += 1
+                stats.consecutive_failures += 1
+                if stats.consecutive_failures >= self.failure_threshold:
+                    stats.cooldown_until = time.time() + self.cooldown
+
+    def snapshot(self) -> dict:
+        """Per-route stats for the metrics endpoint."""
+        with self._lock:
+            return {
+                f"{route.provider}/{route.model}": {
+                    "latency_ewma": stats.latency_ewma,
+                    "latency_p95": stats.p95(),
+                    "error_rate": round(stats.error_ewma, 4),
+                    "calls": stats.calls,
+                    "failures": stats.failures,
+                    "cooling_down": stats.cooldown_until > time.time(),
+                }
+                for route, stats in self._stats.items()
+            }
+
+    # ─────── EXECUTION ───────
+
+    def _timed(self, route: Route, invoke: Callable[[Route], str]) -> str:
+        start = time.perf_counter()
+        try:
+            text = invoke(route)
+        except Exception:
+            self.record(route, time.perf_counter() - start, ok=False)
+            raise
+        self.record(route, time.perf_counter() - start, ok=True)
+        return text
+
+    async def _atimed(self, route: Route, ainvoke) -> str:
+        start = time.perf_counter()
+        try:
+            text = await ainvoke(route)
+        except asyncio.CancelledError:
+            raise  # lost a hedge race: says nothing about the route's health
+        except Exception:
+            self.record(route, time.perf_counter() - start, ok=False)
+            raise
+        self.record(route, time.perf_counter() - start, ok=True)
+        return text
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
+        return self._executor
+
+    def call(self, invoke: Callable[[Route], str]) -> Tuple[str, Route]:
+        """Run invoke(route) over the ranked routes; return (text, winning route)."""
+        routes = self.ranked_routes()
+        if not routes:
+            raise ValueError("No LLM API key configured. Set OPENROUTER_API_KEY or GEMINI_API_KEY in backend/.env")
+
+        last_error = None
+        i = 0
+        while i < len(routes):
+            primary = routes[i]
+            backup = routes[i + 1] if self.hedge and i + 1 < len(routes) else None
+            started = [primary]
+            try:
+                if backup is None:
+                    return self._timed(primary, invoke), primary
+                return self._hedged(primary, backup, invoke, started)
+            except Exception as e:
+                print(f"LLM route {primary.provider}/{primary.model} failed: {e}")
+                last_error = e
+            # A backup that was never started is still next in line
+            i += len(started)
+        raise last_error
+
+    def _hedged(self, primary: Route, backup: Route, invoke, started: List[Route]) -> Tuple[str, Route]:
+        """Race primary against backup; the backup starts after the hedge delay, or
+        as soon as the primary fails. Started routes are appended to `started`."""
+        pool = self._pool()
+        first = pool.submit(self._timed, primary, invoke)
+        futures = {first: primary}
+        wait(futures, timeout=self.hedge_delay(primary))
+        if not first.done() or first.exception() is not None:
+            futures[pool.submit(self._timed, backup, invoke)] = backup
+            started.append(backup)
+
+        pending = set(futures)
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # Threads cannot be interrupted; a still-running loser just finishes unobserved
+                    return future.result(), futures[future]
+                last_error = future.exception()
+        raise last_error
+
+    async def acall(self, ainvoke) -> Tuple[str, Route]:
+        """Async version of call; the losing hedge request is cancelled."""
+        routes = self.ranked_routes()
+        if not routes:
+            raise ValueError("No LLM API key configured. Set OPENROUTER_API_KEY or GEMINI_API_KEY in backend/.env")
+
+        last_error = None
+        i = 0
+        while i < len(routes):
+            primary = routes[i]
+            backup = routes[i + 1] if self.hedge and i + 1 < len(routes) else None
+            started = [primary]
+            try:
+                if backup is None:
+                    return await self._atimed(primary, ainvoke), primary
+                return await self._ahedged(primary, backup, ainvoke, started)
+            except Exception as e:
+                print(f"LLM route {primary.provider}/{primary.model} failed: {e}")
+                last_error = e
+            # A backup that was never started is still next in line
+            i += len(started)
+        raise last_error
+
+    async def _ahedged(self, primary: Route, backup: Route, ainvoke, started: List[Route]) -> Tuple[str, Route]:
+        first = asyncio.ensure_future(self._atimed(primary, ainvoke))
+        tasks = {first: primary}
+        await asyncio.wait(tasks, timeout=self.hedge_delay(primary))
+        if not first.done() or first.exception() is not None:
+            tasks[asyncio.ensure_future(self._atimed(backup, ainvoke))] = backup
+            started.append(backup)
+
+        pending = set(tasks)
+        last_error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result(), tasks[task]
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+llm_router = LLMRouter.from_env()
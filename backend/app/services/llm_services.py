@@ -1,72 +1,539 @@
 import os
 import time
+import asyncio
+import json
+import threading
+import importlib.util
+from concurrent.futures import Future
+from typing import AsyncIterator, Callable, Optional
+import httpx
 import requests
 from dotenv import load_dotenv
+from app.services.llm_cache import llm_cache, make_cache_key
+from app.services.rate_limiter import get_limiter
+from app.utils.token_budget import estimate_tokens
+from app.services.metrics import metrics, llm_caller, TOKEN_BUCKETS
+from app.services.llm_router import llm_router, Route, DEFAULT_OPENROUTER_MODEL, DEFAULT_GEMINI_MODEL
 
 load_dotenv(override=True)
 
-OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+# Override to point at a compatible server, e.g. the local openrouter_stub.py
+OPENROUTER_URL = os.getenv("OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/completions")
+OPENROUTER_TIMEOUT = 30
+OPENROUTER_MAX_RETRIES = int(os.getenv("OPENROUTER_MAX_RETRIES", "5"))
 
 
-def _call_openrouter(prompt: str, max_tokens: int = 4096) -> str:
-    """Call OpenRouter API with auto-retry on rate limits."""
+# ─────── SHARED CLIENTS ───────
+# Created lazily and reused so every call rides an already-open keep-alive
+# connection instead of paying for a fresh TCP/TLS handshake.
+
+_http_session = None
+_async_http = None
+_async_http_loop = None
+_gemini_clients = {}
+
+
+def _get_http_session() -> requests.Session:
+    """Pooled requests.Session for the synchronous path."""
+    global _http_session
+    if _http_session is None:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=20)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _http_session = session
+    return _http_session
+
+
+def _get_async_http() -> httpx.AsyncClient:
+    """Pooled httpx.AsyncClient (HTTP/2 when the h2 package is installed).
+
+    A client is bound to the event loop that created it, so a new one is made
+    if we are called from a different loop (e.g. scripts using asyncio.run)."""
+    global _async_http, _async_http_loop
+    loop = asyncio.get_running_loop()
+    if _async_http is None or _async_http.is_closed or _async_http_loop is not loop:
+        _async_http = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            timeout=httpx.Timeout(OPENROUTER_TIMEOUT, connect=10),
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60),
+        )
+        _async_http_loop = loop
+    return _async_http
+
+
+def _get_gemini_client():
+    """One genai.Client per API key, reused across calls."""
+    key = os.getenv("GEMINI_API_KEY", "").strip()
+    if not key:
+        raise ValueError("No LLM API key configured. Set OPENROUTER_API_KEY or GEMINI_API_KEY in backend/.env")
+    client = _gemini_clients.get(key)
+    if client is None:
+        from google import genai
+        client = genai.Client(api_key=key, http_options={"api_version": "v1"})
+        _gemini_clients[key] = client
+    return client
+
+
+async def aclose_llm_clients() -> None:
+    """Close pooled connections (called on app shutdown)."""
+    global _async_http, _http_session
+    if _async_http is not None and not _async_http.is_closed:
+        await _async_http.aclose()
+    _async_http = None
+    if _http_session is not None:
+        _http_session.close()
+        _http_session = None
+
+
+# ─────── PROVIDERS ───────
+
+def _openrouter_request(prompt: str, max_tokens: int, model: str) -> tuple:
+    """Build (headers, body) for an OpenRouter chat completion."""
     api_key = os.getenv("OPENROUTER_API_KEY", "").strip()
     if not api_key:
         raise ValueError("OPENROUTER_API_KEY is not set")
-    model = os.getenv("OPENROUTER_MODEL", "google/gemma-3-4b-it:free")
-    
-    for attempt in range(3):
-        resp = requests.post(
-            OPENROUTER_URL,
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": os.getenv("OPENROUTER_REFERER", "http://localhost:3000"),
-            },
-            json={
-                "model": model,
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": max_tokens,
-            },
-            timeout=30,
-        )
-        
-        if resp.status_code == 429:
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+        "HTTP-Referer": os.getenv("OPENROUTER_REFERER", "http://localhost:3000"),
+    }
+    body = {
+        "model": model or os.getenv("OPENROUTER_MODEL", DEFAULT_OPENROUTER_MODEL),
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens,
+    }
+    return headers, body
+
+
+def _openrouter_text(data: dict) -> str:
+    """Pull the completion text out of an OpenRouter response body."""
+    choice = (data.get("choices") or [None])[0]
+    if not choice:
+        raise ValueError("OpenRouter returned no choices")
+    msg = choice.get("message") or {}
+    text = msg.get("content") or ""
+    if not text:
+        raise ValueError("OpenRouter returned empty content")
+    return text
+
+
+def _reserved_tokens(prompt: str, max_tokens: int) -> int:
+    """Rough token reservation for the TPM bucket; corrected from `usage` afterwards."""
+    return estimate_tokens(prompt) + min(max_tokens, 1024)
+
+
+def _record_usage(info: dict, usage: dict) -> None:
+    if info is not None and usage:
+        info["prompt_tokens"] = usage.get("prompt_tokens")
+        info["completion_tokens"] = usage.get("completion_tokens")
+
+
+def _handle_openrouter_response(resp, limiter, reserved: int, attempt: int, info: dict = None):
+    """Return the completion text, or None when the call was rate limited and should be retried.
+
+    A 429 pushes the shared limiter back by Retry-After (or a linear back-off
+    when the provider gives no hint) so every queued caller waits, not just
+    this one."""
+    if resp.status_code == 429:
+        wait = limiter.update_from_headers(resp.headers)
+        if not wait:
             wait = 3 * (attempt + 1)
-            print(f"OpenRouter rate limit (attempt {attempt+1}/3), waiting {wait}s...")
-            time.sleep(wait)
-            continue
-        
-        resp.raise_for_status()
-        data = resp.json()
-        choice = (data.get("choices") or [None])[0]
-        if not choice:
-            raise ValueError("OpenRouter returned no choices")
-        msg = choice.get("message") or {}
-        text = msg.get("content") or ""
-        if not text:
-            raise ValueError("OpenRouter returned empty content")
-        return text
-    
-    raise ValueError("Rate limit exceeded after 3 retries. Wait a minute and try again.")
+            limiter.block_for(wait)
+        print(f"OpenRouter rate limit (attempt {attempt+1}/{OPENROUTER_MAX_RETRIES}), backing off {wait:.0f}s...")
+        return None
 
+    limiter.update_from_headers(resp.headers)
+    resp.raise_for_status()
+    data = resp.json()
+    limiter.record_usage(reserved, (data.get("usage") or {}).get("total_tokens"))
+    _record_usage(info, data.get("usage"))
+    return _openrouter_text(data)
 
-def call_llm(prompt: str) -> str:
-    """Main LLM call for resume parsing, build profile, content enhance.
-    Uses OpenRouter directly when available (fastest path)."""
-    if os.getenv("OPENROUTER_API_KEY", "").strip():
-        return _call_openrouter(prompt)
 
-    # Fallback to Gemini only if no OpenRouter key
-    from google import genai
-    key = os.getenv("GEMINI_API_KEY", "").strip()
-    if not key:
-        raise ValueError("No LLM API key configured. Set OPENROUTER_API_KEY or GEMINI_API_KEY in backend/.env")
-    client = genai.Client(api_key=key, http_options={"api_version": "v1"})
-    response = client.models.generate_content(model="gemini-2.0-flash", contents=prompt)
+def _call_openrouter(prompt: str, max_tokens: int = 4096, model: str = None, info: dict = None) -> str:
+    """Call OpenRouter API, queueing on the shared rate limiter and retrying on 429."""
+    headers, body = _openrouter_request(prompt, max_tokens, model)
+    session = _get_http_session()
+    limiter = get_limiter("openrouter")
+    reserved = _reserved_tokens(prompt, max_tokens)
+
+    for attempt in range(OPENROUTER_MAX_RETRIES):
+        limiter.acquire(reserved)
+        resp = session.post(OPENROUTER_URL, headers=headers, json=body, timeout=OPENROUTER_TIMEOUT)
+        text = _handle_openrouter_response(resp, limiter, reserved, attempt, info)
+        if info is not None:
+            info["retries"] = attempt
+        if text is not None:
+            return text
+
+    raise ValueError(f"Rate limit exceeded after {OPENROUTER_MAX_RETRIES} retries. Wait a minute and try again.")
+
+
+async def _acall_openrouter(prompt: str, max_tokens: int = 4096, model: str = None, info: dict = None) -> str:
+    """Async twin of _call_openrouter over the pooled httpx client."""
+    headers, body = _openrouter_request(prompt, max_tokens, model)
+    client = _get_async_http()
+    limiter = get_limiter("openrouter")
+    reserved = _reserved_tokens(prompt, max_tokens)
+
+    for attempt in range(OPENROUTER_MAX_RETRIES):
+        await limiter.aacquire(reserved)
+        resp = await client.post(OPENROUTER_URL, headers=headers, json=body)
+        text = await limiter.offload(_handle_openrouter_response, resp, limiter, reserved, attempt, info)
+        if info is not None:
+            info["retries"] = attempt
+        if text is not None:
+            return text
+
+    raise ValueError(f"Rate limit exceeded after {OPENROUTER_MAX_RETRIES} retries. Wait a minute and try again.")
+
+
+async def _astream_openrouter(
+    prompt: str, max_tokens: int = 4096, model: str = None, info: dict = None
+) -> AsyncIterator[str]:
+    """Stream completion deltas from OpenRouter (server-sent events, stream=True)."""
+    headers, body = _openrouter_request(prompt, max_tokens, model)
+    body["stream"] = True
+    client = _get_async_http()
+    limiter = get_limiter("openrouter")
+    reserved = _reserved_tokens(prompt, max_tokens)
+
+    for attempt in range(OPENROUTER_MAX_RETRIES):
+        await limiter.aacquire(reserved)
+        async with client.stream("POST", OPENROUTER_URL, headers=headers, json=body) as resp:
+            if resp.status_code == 429:
+                await limiter.offload(_handle_openrouter_response, resp, limiter, reserved, attempt)
+                if info is not None:
+                    info["retries"] = attempt + 1
+                continue
+            await limiter.offload(limiter.update_from_headers, resp.headers)
+            if resp.is_error:
+                await resp.aread()
+                resp.raise_for_status()
+
+            async for line in resp.aiter_lines():
+                # Blank lines separate events; ":" lines are keep-alive comments
+                if not line.startswith("data:"):
+                    continue
+                payload = line[5:].strip()
+                if payload == "[DONE]":
+                    return
+                try:
+                    event = json.loads(payload)
+                except json.JSONDecodeError:
+                    continue
+                if event.get("error"):
+                    raise ValueError(f"OpenRouter stream error: {event['error']}")
+                if event.get("usage"):
+                    await limiter.offload(limiter.record_usage, reserved, event["usage"].get("total_tokens"))
+                    _record_usage(info, event["usage"])
+                choice = (event.get("choices") or [None])[0] or {}
+                delta = (choice.get("delta") or {}).get("content")
+                if delta:
+                    yield delta
+            return
+
+    raise ValueError(f"Rate limit exceeded after {OPENROUTER_MAX_RETRIES} retries. Wait a minute and try again.")
+
+
+def _gemini_usage(response, info: dict = None) -> None:
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        _record_usage(info, {
+            "prompt_tokens": getattr(usage, "prompt_token_count", None),
+            "completion_tokens": getattr(usage, "candidates_token_count", None),
+        })
+
+
+def _call_gemini(prompt: str, model: str = DEFAULT_GEMINI_MODEL, info: dict = None) -> str:
+    """Call Gemini directly (used when no OpenRouter key is configured)."""
+    get_limiter("gemini").acquire(_reserved_tokens(prompt, 4096))
+    response = _get_gemini_client().models.generate_content(model=model, contents=prompt)
+    _gemini_usage(response, info)
     return response.text
 
 
-def call_llm_for_suggestions(prompt: str) -> str:
+async def _acall_gemini(prompt: str, model: str = DEFAULT_GEMINI_MODEL, info: dict = None) -> str:
+    """Async Gemini call through the shared client's aio surface."""
+    await get_limiter("gemini").aacquire(_reserved_tokens(prompt, 4096))
+    response = await _get_gemini_client().aio.models.generate_content(model=model, contents=prompt)
+    _gemini_usage(response, info)
+    return response.text
+
+
+async def _astream_gemini(prompt: str, model: str = DEFAULT_GEMINI_MODEL, info: dict = None) -> AsyncIterator[str]:
+    """Stream completion chunks from Gemini."""
+    await get_limiter("gemini").aacquire(_reserved_tokens(prompt, 4096))
+    stream = await _get_gemini_client().aio.models.generate_content_stream(model=model, contents=prompt)
+    async for chunk in stream:
+        _gemini_usage(chunk, info)
+        if chunk.text:
+            yield chunk.text
+
+
+# ─────── IN-FLIGHT COALESCING ───────
+
+class _SingleFlight:
+    """Collapse concurrent calls that share a key into one upstream request.
+
+    The first caller (the leader) runs the work; everyone who arrives while it
+    is in flight waits for and receives the same result or exception. Sync
+    and async callers are tracked separately so a blocking waiter can never
+    sit on the event loop that is supposed to finish the async leader."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> concurrent.futures.Future
+        self._tasks = {}  # (loop, key) -> asyncio.Task
+
+    def do(self, key: str, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    async def ado(self, key: str, coro_fn):
+        loop = asyncio.get_running_loop()
+        task_key = (loop, key)
+        task = self._tasks.get(task_key)
+        if task is None:
+            task = loop.create_task(coro_fn())
+            self._tasks[task_key] = task
+            task.add_done_callback(lambda _t: self._tasks.pop(task_key, None))
+        # shield: one impatient caller cancelling must not cancel everyone else's call
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._tasks)
+
+
+_single_flight = _SingleFlight()
+
+
+# ─────── TELEMETRY ───────
+
+def _record_call(caller: str, result: str, started: float, route: Route = None, info: dict = None) -> None:
+    """Per-call telemetry. result: upstream | cache_hit | coalesced | error."""
+    metrics.inc("llm_calls_total", {"caller": caller, "result": result})
+    metrics.observe("llm_call_seconds", time.perf_counter() - started, {"caller": caller})
+    if route is None or info is None:
+        return
+    model = f"{route.provider}/{route.model}"
+    if "latency" in info:
+        metrics.observe("llm_upstream_seconds", info["latency"], {"model": model})
+    if info.get("retries"):
+        metrics.inc("llm_retries_total", {"caller": caller, "model": model}, info["retries"])
+    for field in ("prompt_tokens", "completion_tokens"):
+        if info.get(field) is not None:
+            metrics.observe(f"llm_{field}", info[field], {"caller": caller}, buckets=TOKEN_BUCKETS)
+
+
+# ─────── PUBLIC API ───────
+
+def _invoke(route: Route, prompt: str, max_tokens: int, info: dict = None) -> str:
+    started = time.perf_counter()
+    if route.provider == "openrouter":
+        text = _call_openrouter(prompt, max_tokens=max_tokens, model=route.model, info=info)
+    else:
+        text = _call_gemini(prompt, model=route.model, info=info)
+    if info is not None:
+        info["latency"] = time.perf_counter() - started
+    return text
+
+
+async def _ainvoke(route: Route, prompt: str, max_tokens: int, info: dict = None) -> str:
+    started = time.perf_counter()
+    if route.provider == "openrouter":
+        text = await _acall_openrouter(prompt, max_tokens=max_tokens, model=route.model, info=info)
+    else:
+        text = await _acall_gemini(prompt, model=route.model, info=info)
+    if info is not None:
+        info["latency"] = time.perf_counter() - started
+    return text
+
+
+def _route_cache_key(route: Route, prompt: str, max_tokens: int) -> str:
+    return make_cache_key(route.provider, route.model, max_tokens, prompt)
+
+
+Validator = Optional[Callable[[str], bool]]
+
+
+def _cached_response(prompt: str, max_tokens: int, validate: Validator = None):
+    """Any configured route's cached answer to this prompt, or None.
+    Entries that fail `validate` (e.g. stored before it was passed) are misses."""
+    for route in llm_router.configured_routes():
+        cached = llm_cache.get(_route_cache_key(route, prompt, max_tokens))
+        if cached is not None and (validate is None or validate(cached)):
+            return cached
+    return None
+
+
+def _cache_completion(route: Route, prompt: str, max_tokens: int, text: str, validate: Validator) -> None:
+    """Store a fresh completion, unless the caller's validator rejects it: a
+    malformed answer would otherwise be replayed on every retry."""
+    if validate is not None and not validate(text):
+        return
+    llm_cache.set(_route_cache_key(route, prompt, max_tokens), text)
+
+
+def call_llm(
+    prompt: str, max_tokens: int = 4096, use_cache: bool = True, caller: str = "unknown", validate: Validator = None
+) -> str:
+    """Main LLM call for resume parsing, build profile, content enhance.
+    The router picks the fastest healthy provider/model and falls back (or
+    hedges) to the next one on failure.
+    Identical (provider, model, max_tokens, prompt) calls are served from the
+    response cache unless use_cache=False, and concurrent identical calls
+    share a single upstream request. `caller` names the agent in telemetry.
+    With `validate`, only completions it accepts (e.g. is_json_response) are cached."""
+    llm_caller.set(caller)
+    started = time.perf_counter()
+    if use_cache:
+        cached = _cached_response(prompt, max_tokens, validate)
+        if cached is not None:
+            _record_call(caller, "cache_hit", started)
+            return cached
+
+    upstream = {}
+
+    def _fetch() -> str:
+        infos = {}
+
+        def _invoke_route(route: Route) -> str:
+            infos[route] = {}
+            return _invoke(route, prompt, max_tokens, infos[route])
+
+        text, route = llm_router.call(_invoke_route)
+        upstream.update(route=route, info=infos.get(route))
+        if use_cache:
+            _cache_completion(route, prompt, max_tokens, text, validate)
+        return text
+
+    try:
+        text = _single_flight.do(make_cache_key("*", "*", max_tokens, prompt), _fetch)
+    except Exception:
+        _record_call(caller, "error", started)
+        raise
+    _record_call(caller, "upstream" if upstream else "coalesced", started, **upstream)
+    return text
+
+
+async def acall_llm(
+    prompt: str, max_tokens: int = 4096, use_cache: bool = True, caller: str = "unknown", validate: Validator = None
+) -> str:
+    """Async version of call_llm: same routing, cache, coalescing and
+    telemetry, but awaits the network instead of holding a worker thread."""
+    llm_caller.set(caller)
+    started = time.perf_counter()
+    if use_cache:
+        cached = _cached_response(prompt, max_tokens, validate)
+        if cached is not None:
+            _record_call(caller, "cache_hit", started)
+            return cached
+
+    upstream = {}
+
+    async def _fetch() -> str:
+        infos = {}
+
+        def _invoke_route(route: Route):
+            infos[route] = {}
+            return _ainvoke(route, prompt, max_tokens, infos[route])
+
+        text, route = await llm_router.acall(_invoke_route)
+        upstream.update(route=route, info=infos.get(route))
+        if use_cache:
+            _cache_completion(route, prompt, max_tokens, text, validate)
+        return text
+
+    try:
+        text = await _single_flight.ado(make_cache_key("*", "*", max_tokens, prompt), _fetch)
+    except Exception:
+        _record_call(caller, "error", started)
+        raise
+    _record_call(caller, "upstream" if upstream else "coalesced", started, **upstream)
+    return text
+
+
+async def astream_llm(
+    prompt: str, max_tokens: int = 4096, use_cache: bool = True, caller: str = "unknown", validate: Validator = None
+) -> AsyncIterator[str]:
+    """Yield the completion incrementally as the provider streams it.
+
+    Streams always use the router's current best route (no hedging). A cache
+    hit is yielded as a single chunk; a completed stream that passes `validate`
+    is written back to the cache so the non-streaming path benefits too."""
+    llm_caller.set(caller)
+    started = time.perf_counter()
+    if use_cache:
+        cached = _cached_response(prompt, max_tokens, validate)
+        if cached is not None:
+            _record_call(caller, "cache_hit", started)
+            yield cached
+            return
+
+    route = llm_router.primary_route()
+    info = {}
+    if route.provider == "openrouter":
+        stream = _astream_openrouter(prompt, max_tokens=max_tokens, model=route.model, info=info)
+    else:
+        stream = _astream_gemini(prompt, model=route.model, info=info)
+
+    parts = []
+    try:
+        async for delta in stream:
+            if not parts:
+                metrics.observe("llm_stream_first_chunk_seconds", time.perf_counter() - started, {"caller": caller})
+            parts.append(delta)
+            yield delta
+        if not parts:
+            raise ValueError(f"{route.provider} returned empty content")
+    except Exception:
+        llm_router.record(route, time.perf_counter() - started, ok=False)
+        _record_call(caller, "error", started)
+        raise
+    info["latency"] = time.perf_counter() - started
+    llm_router.record(route, info["latency"], ok=True)
+    _record_call(caller, "upstream", started, route=route, info=info)
+
+    if use_cache:
+        _cache_completion(route, prompt, max_tokens, "".join(parts), validate)
+
+
+def call_llm_for_suggestions(
+    prompt: str, use_cache: bool = True, caller: str = "analysis", validate: Validator = None
+) -> str:
     """For portfolio/resume analysis and AI suggestions."""
-    return call_llm(prompt)
+    return call_llm(prompt, use_cache=use_cache, caller=caller, validate=validate)
+
+
+async def acall_llm_for_suggestions(
+    prompt: str, use_cache: bool = True, caller: str = "analysis", validate: Validator = None
+) -> str:
+    """Async version of call_llm_for_suggestions."""
+    return await acall_llm(prompt, use_cache=use_cache, caller=caller, validate=validate)
+
+
+def astream_llm_for_suggestions(
+    prompt: str, use_cache: bool = True, caller: str = "analysis", validate: Validator = None
+) -> AsyncIterator[str]:
+    """Streaming version of call_llm_for_suggestions."""
+    return astream_llm(prompt, use_cache=use_cache, caller=caller, validate=validate)
@@ -0,0 +1,127 @@
+"""
+In-process metrics: labelled counters and fixed-bucket histograms.
+
+Everything is aggregated in memory and served by GET /metrics, as JSON by
+default or in Prometheus text format with ?format=prometheus.
+"""
+import bisect
+import threading
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+# Seconds: covers cache hits (ms) through slow free-tier completions (a minute+)
+LATENCY_BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+
+# Name of the agent making the current LLM call; set by call_llm so later steps
+# in the same flow (e.g. extract_json) can attribute their metrics to it.
+llm_caller: ContextVar[str] = ContextVar("llm_caller", default="unknown")
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> Tuple:
+    return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (bucket resolution)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": {str(b): c for b, c in zip(list(self.buckets) + ["+Inf"], self.counts)},
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Tuple, float]] = {}
+        self._histograms: Dict[str, Dict[Tuple, Histogram]] = {}
+        self._gauges: Dict[str, Dict[Tuple, float]] = {}
+
+    def inc(self, name: str, labels: Optional[Dict[str, str]] = None, value: float = 1) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None,
+                buckets=LATENCY_BUCKETS) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram(buckets)
+            hist.observe(value)
+
+    def snapshot(self) -> dict:
+        def labelled(series, render):
+            return [{"labels": dict(key), **render(v)} for key, v in series.items()]
+
+        with self._lock:
+            return {
+                "counters": {n: labelled(s, lambda v: {"value": v}) for n, s in self._counters.items()},
+                "gauges": {n: labelled(s, lambda v: {"value": v}) for n, s in self._gauges.items()},
+                "histograms": {n: labelled(s, lambda h: h.to_dict()) for n, s in self._histograms.items()},
+            }
+
+    def prometheus(self) -> str:
+        def fmt(key, extra=()):
+            pairs = list(key) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for name, series in self._counters.items():
+                lines.append(f"# TYPE {name} counter")
+                lines += [f"{name}{fmt(k)} {v}" for k, v in series.items()]
+            for name, series in self._gauges.items():
+                lines.append(f"# TYPE {name} gauge")
+                lines += [f"{name}{fmt(k)} {v}" for k, v in series.items()]
+            for name, series in self._histograms.items():
+                lines.append(f"# TYPE {name} histogram")
+                for k, h in series.items():
+                    cumulative = 0
+                    for bound, c in zip(list(h.buckets) + ["+Inf"], h.counts):
+                        cumulative += c
+                        lines.append(f"{name}_bucket{fmt(k, [('le', bound)])} {cumulative}")
+                    lines.append(f"{name}_sum{fmt(k)} {h.sum}")
+                    lines.append(f"{name}_count{fmt(k)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
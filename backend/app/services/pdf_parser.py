@@ -1,22 +1,417 @@
+import asyncio
+import hashlib
+import itertools
+import multiprocessing
+import os
+import signal
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
 import fitz  # PyMuPDF
 from fastapi import UploadFile, HTTPException
+from dotenv import load_dotenv
+from app.services.metrics import metrics
+from app.utils.pdf_layout import extract_layout_blocks, sections_from_blocks
+from app.utils.resume_rules import SECTION_HEADINGS
 
+try:
+    import resource  # POSIX only; memory limits are skipped on Windows
+except ImportError:
+    resource = None
 
-async def extract_text_from_file(file: UploadFile) -> str:
+load_dotenv()
+
+# PDFs are opened in a small pool of worker processes so a huge or malicious file
+# cannot block the event loop or take the API process down with it
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+PDF_EXTRACT_TIMEOUT = float(os.getenv("PDF_EXTRACT_TIMEOUT", "20"))
+PDF_WORKER_MAX_MEMORY_MB = int(os.getenv("PDF_WORKER_MAX_MEMORY_MB", "512"))
+# Jobs allowed to wait for a worker before uploads are turned away with 503
+PDF_MAX_QUEUED = int(os.getenv("PDF_MAX_QUEUED", str(PDF_WORKERS * 4)))
+# Uploads are copied to disk in chunks and rejected past this size
+PDF_MAX_UPLOAD_MB = float(os.getenv("PDF_MAX_UPLOAD_MB", "10"))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "20"))
+# "layout" also recovers resume sections from font sizes/styles; "text" is plain get_text()
+PDF_LAYOUT = os.getenv("PDF_EXTRACTION_MODE", "layout").lower() == "layout"
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+
+class PdfTooLarge(Exception):
+    pass
+
+
+# ─────── UPLOADS ───────
+
+async def spool_pdf_upload(file: UploadFile, max_mb: float = PDF_MAX_UPLOAD_MB) -> tuple:
+    """
+    Copy a PDF upload to a temporary file chunk by chunk, hashing as it goes.
+    Returns (path, sha256 hex); the caller deletes the file (see remove_spooled).
+    """
     if file.content_type != "application/pdf":
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
+    return await spool_upload(file, max_mb, suffix=".pdf")
 
+
+async def spool_upload(file: UploadFile, max_mb: float, suffix: str = "") -> tuple:
+    """spool_pdf_upload for any file type: (path, sha256 hex), 413 past max_mb."""
+    max_bytes = int(max_mb * 1024 * 1024)
+    digest, size = hashlib.sha256(), 0
+    handle = tempfile.NamedTemporaryFile(prefix="upload-", suffix=suffix, delete=False)
     try:
-        file_bytes = await file.read()
-        document = fitz.open(stream=file_bytes, filetype="pdf")
+        with handle:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"File is larger than {max_mb:g} MB")
+                digest.update(chunk)
+                handle.write(chunk)
+    except BaseException:
+        remove_spooled(handle.name)
+        raise
+    return handle.name, digest.hexdigest()
 
-        text = ""
-        for page in document:
-            text += page.get_text()
 
+def remove_spooled(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# ─────── EXTRACTION ───────
+
+def extract_text_from_document(document, max_pages: int = PDF_MAX_PAGES, layout: bool = False) -> tuple:
+    """
+    (text, sections). With layout, sections maps resume section -> body text as
+    found from font sizes and styles (see app/utils/pdf_layout.py); it is None
+    in plain-text mode or when fewer than two known sections were recognised.
+    """
+    try:
+        if max_pages and document.page_count > max_pages:
+            raise PdfTooLarge(f"PDF has {document.page_count} pages, the limit is {max_pages}")
+
+        if not layout:
+            text = ""
+            for page in document:
+                text += page.get_text()
+            return text.strip(), None
+
+        blocks = extract_layout_blocks(document)
+        text = "\n".join(block["text"] for block in blocks)
+        sections = sections_from_blocks(blocks)
+        if len([name for name in sections if name in SECTION_HEADINGS]) < 2:
+            sections = None
+        return text.strip(), sections
+    finally:
         document.close()
 
-        return text.strip()
 
+def extract_pdf(source, layout: bool = PDF_LAYOUT) -> tuple:
+    """(text, sections) for PDF bytes or a file path (MuPDF then reads it from disk as needed)."""
+    try:
+        if isinstance(source, str):
+            document = fitz.open(source, filetype="pdf")
+        else:
+            document = fitz.open(stream=source, filetype="pdf")
+        return extract_text_from_document(document, layout=layout)
+    except PdfTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception:
-        raise HTTPException(status_code=500, detail="Failed to parse PDF")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to parse PDF")
+
+
+def extract_text_job(source) -> dict:
+    """
+    Process-pool entry point for PDF bytes or a file path:
+    {"text", "sections", "seconds", "error", "status"}, status being the HTTP code
+    for the error. Never raises, so results pickle cleanly.
+    """
+    started = time.perf_counter()
+    result = {"text": "", "sections": None, "error": None, "status": None}
+    try:
+        result["text"], result["sections"] = extract_pdf(source)
+    except HTTPException as e:
+        result.update(error=e.detail, status=e.status_code)
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def init_pdf_worker(max_memory_mb: int = PDF_WORKER_MAX_MEMORY_MB) -> None:
+    """Cap the worker's address space; allocations past it fail inside PyMuPDF instead of growing."""
+    if resource is None or max_memory_mb <= 0:
+        return
+    limit = max_memory_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+# ─────── WORKER POOL ───────
+
+class PdfJobTimeout(Exception):
+    """A PDF job ran longer than its pool's per-job timeout."""
+
+
+_started_jobs = None  # worker side: queue the pool is told about started jobs through
+
+
+def _init_tracked_worker(started_jobs, initializer) -> None:
+    global _started_jobs
+    _started_jobs = started_jobs
+    if initializer is not None:
+        initializer()
+
+
+def _tracked_job(run_id: int, fn, *args):
+    _started_jobs.put((run_id, os.getpid()))
+    return fn(*args)
+
+
+class PdfWorkerPool:
+    """
+    Spawned worker processes for PDF jobs, each job with its own timeout counted
+    from when a worker picks it up.
+
+    Workers report every job they start, so an overrunning job fails on its own:
+    its executor stops taking new jobs (a fresh one does, along with the jobs still
+    waiting in its queue), the jobs already running on it finish normally, and only
+    then is the stuck worker killed.
+
+    A worker dying breaks its whole executor. Jobs that were only waiting are
+    resubmitted; jobs that were running are retried once, one at a time on a
+    single-worker executor, so the one that crashed it fails alone.
+    """
+
+    MAX_RESUBMITS = 5
+
+    def __init__(self, workers: int, timeout: float, initializer=init_pdf_worker, name: str = "pdf"):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.initializer = initializer
+        self.name = name
+        self._context = multiprocessing.get_context("spawn")  # forking a threaded server can deadlock the child
+        # SimpleQueue writes synchronously, so a start is reported even if the worker dies right after
+        self._started = self._context.SimpleQueue()
+        # Re-entrant: cancelling a future runs its done-callback (_finished) on the spot
+        self._lock = threading.RLock()
+        self._run_ids = itertools.count()
+        self._executors = {False: None, True: None}  # isolated? -> executor taking new jobs
+        self._retired = []
+        # run id (one submission of a job to an executor) -> job; a job is live under its latest run
+        self._runs = {}
+        self._monitor = None
+        self._closed = False
+
+    def _current(self, isolated: bool = False) -> ProcessPoolExecutor:
+        if self._executors[isolated] is None:
+            self._executors[isolated] = ProcessPoolExecutor(
+                max_workers=1 if isolated else self.workers,
+                mp_context=self._context,
+                initializer=_init_tracked_worker,
+                initargs=(self._started, self.initializer),
+            )
+        return self._executors[isolated]
+
+    def _jobs(self) -> list:
+        """Live jobs, each once (lock held)."""
+        return [job for run_id, job in self._runs.items() if job["run"] == run_id]
+
+    def submit(self, fn, *args) -> Future:
+        """Run fn(*args) in a worker. The future fails with PdfJobTimeout if the job
+        overruns, or BrokenProcessPool if it crashed its worker."""
+        job = {"fn": fn, "args": args, "future": Future(), "isolated": False,
+               "timed_out": False, "retried": False, "resubmits": 0}
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"{self.name} worker pool is shut down")
+            self._start(job)
+            if self._monitor is None:
+                self._monitor = threading.Thread(target=self._watch, name=f"{self.name}-pool-monitor", daemon=True)
+                self._monitor.start()
+        return job["future"]
+
+    def _start(self, job: dict) -> None:
+        """Submit a job to the current executor of its kind (lock held)."""
+        run_id = next(self._run_ids)
+        executor = self._current(job["isolated"])
+        try:
+            inner = executor.submit(_tracked_job, run_id, job["fn"], *job["args"])
+        except BrokenProcessPool:
+            # Broke before any of its jobs' callbacks told us
+            self._retire(executor)
+            executor = self._current(job["isolated"])
+            inner = executor.submit(_tracked_job, run_id, job["fn"], *job["args"])
+        job.update(run=run_id, executor=executor, inner=inner, pid=None, started_at=None)
+        self._runs[run_id] = job
+        inner.add_done_callback(lambda done: self._finished(run_id, done))
+
+    def _finished(self, run_id: int, inner: Future) -> None:
+        with self._lock:
+            job = self._runs.pop(run_id, None)
+            if job is None or job["run"] != run_id or job["timed_out"]:
+                return  # a superseded run, or a job already failed with PdfJobTimeout
+            executor = job["executor"]
+            error = inner.exception() if not inner.cancelled() else None
+            if isinstance(error, BrokenProcessPool) and not self._closed:
+                self._record_starts()
+                self._retire(executor)
+                if job["started_at"] is None and job["resubmits"] < self.MAX_RESUBMITS:
+                    # Never ran: not the job that broke it
+                    job["resubmits"] += 1
+                    self._start(job)
+                elif not job["retried"]:
+                    job.update(retried=True, isolated=True)
+                    self._start(job)
+        if job["run"] != run_id:
+            self._reap(executor)
+            return
+        if inner.cancelled():
+            job["future"].cancel()
+        elif error is not None:
+            job["future"].set_exception(error)
+        else:
+            job["future"].set_result(inner.result())
+        self._reap(executor)
+
+    def _retire(self, executor) -> None:
+        """Stop sending jobs to `executor`; jobs still waiting in its queue move to a fresh one (lock held)."""
+        for isolated, current in self._executors.items():
+            if current is executor:
+                self._executors[isolated] = None
+        if executor in self._retired:
+            return
+        self._retired.append(executor)
+        for job in self._jobs():
+            if job["executor"] is executor and job["started_at"] is None and not job["timed_out"]:
+                waiting = job["inner"]
+                self._start(job)
+                waiting.cancel()  # too late if already handed to a worker; that run is then ignored
+
+    def _reap(self, executor) -> None:
+        """Shut a retired executor down once only its timed-out jobs are left, killing their workers."""
+        with self._lock:
+            if executor not in self._retired:
+                return
+            jobs = [job for job in self._jobs() if job["executor"] is executor]
+            if any(not job["timed_out"] for job in jobs):
+                return
+            self._retired.remove(executor)
+            for job in jobs:
+                self._runs.pop(job["run"], None)
+        for job in jobs:
+            _kill(job["pid"])
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _record_starts(self) -> None:
+        """Note which worker started which job, from the workers' reports (lock held)."""
+        while not self._started.empty():
+            run_id, pid = self._started.get()
+            job = self._runs.get(run_id)
+            if job is not None and job["run"] == run_id:
+                job["pid"], job["started_at"] = pid, time.monotonic()
+
+    def _watch(self) -> None:
+        """Time out jobs that overrun."""
+        while not self._closed:
+            time.sleep(0.05)
+            now = time.monotonic()
+            expired = []
+            with self._lock:
+                try:
+                    self._record_starts()
+                except (EOFError, OSError):
+                    return
+                for job in self._jobs():
+                    if job["started_at"] and not job["timed_out"] and now - job["started_at"] > self.timeout:
+                        job["timed_out"] = True
+                        self._retire(job["executor"])
+                        expired.append(job)
+            for job in expired:
+                metrics.inc("pdf_worker_timeouts_total", {"pool": self.name})
+                job["future"].set_exception(PdfJobTimeout(f"PDF job ran longer than {self.timeout:g}s"))
+                self._reap(job["executor"])
+
+    def shutdown(self) -> None:
+        """Stop every executor; waiting jobs are cancelled and stuck workers killed."""
+        with self._lock:
+            self._closed = True
+            executors = [e for e in list(self._executors.values()) + self._retired if e is not None]
+            jobs, self._runs = self._jobs(), {}
+            self._executors, self._retired = {False: None, True: None}, []
+        for job in jobs:
+            if job["timed_out"]:
+                _kill(job["pid"])
+            elif not job["future"].done():
+                job["future"].cancel()
+        for executor in executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _kill(pid: Optional[int]) -> None:
+    if not pid:
+        return
+    try:
+        os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+    except OSError:
+        pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_queued = 0
+
+
+def _get_pool() -> PdfWorkerPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PdfWorkerPool(PDF_WORKERS, PDF_EXTRACT_TIMEOUT)
+        return _pool
+
+
+def shutdown_pdf_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+async def extract_pdf_async(source) -> tuple:
+    """(text, sections) for PDF bytes, or better a file path, from the worker pool.
+    A PDF that takes longer than PDF_EXTRACT_TIMEOUT fails on its own; other
+    uploads being extracted at the same time are unaffected (see PdfWorkerPool)."""
+    global _queued
+    with _pool_lock:
+        if _queued >= PDF_WORKERS + PDF_MAX_QUEUED:
+            metrics.inc("pdf_extract_total", {"result": "rejected"})
+            raise HTTPException(status_code=503, detail="PDF parser is busy, try again shortly")
+        _queued += 1
+
+    started = time.perf_counter()
+    try:
+        result = await asyncio.wrap_future(_get_pool().submit(extract_text_job, source))
+    except PdfJobTimeout:
+        metrics.inc("pdf_extract_total", {"result": "timeout"})
+        raise HTTPException(status_code=422, detail="PDF took too long to process")
+    except BrokenProcessPool:
+        # Its worker died (e.g. killed for exceeding its memory limit), twice
+        metrics.inc("pdf_extract_total", {"result": "crashed"})
+        raise HTTPException(status_code=422, detail="PDF could not be processed")
+    finally:
+        with _pool_lock:
+            _queued -= 1
+
+    metrics.observe("pdf_extract_seconds", time.perf_counter() - started)
+    if result["error"]:
+        metrics.inc("pdf_extract_total", {"result": "failed"})
+        raise HTTPException(status_code=result["status"] or 500, detail=result["error"])
+    metrics.inc("pdf_extract_total", {"result": "ok"})
+    return result["text"], result["sections"]
@@ -0,0 +1,244 @@
+"""
+Token-bucket rate limiting for outbound LLM calls.
+
+Each provider gets a limiter with two buckets, requests per minute and
+tokens per minute. Callers *reserve* capacity up front: the bucket is
+allowed to go into debt and each reservation is told how long to wait
+until its share has refilled. Later callers see more debt and therefore
+wait longer, so the queue is served in arrival order instead of whoever
+happens to retry first.
+
+By default state lives in process memory. Set LLM_RATE_LIMIT_STATE_PATH
+to a local SQLite file to share one budget across uvicorn workers.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class RateLimitExceeded(ValueError):
+    """Raised when a caller would have to queue longer than the configured maximum."""
+
+
+def retry_after_from_headers(headers: Mapping[str, str]) -> Optional[float]:
+    """Seconds to back off according to Retry-After / X-RateLimit-* headers.
+
+    Returns None when the response carries no usable hint."""
+    if not headers:
+        return None
+    now = time.time()
+
+    retry_after = headers.get("Retry-After") or headers.get("retry-after")
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - now)
+            except (TypeError, ValueError):
+                pass
+
+    remaining = headers.get("X-RateLimit-Remaining") or headers.get("x-ratelimit-remaining")
+    reset = headers.get("X-RateLimit-Reset") or headers.get("x-ratelimit-reset")
+    if reset and (remaining is None or str(remaining).strip() == "0"):
+        try:
+            reset_at = float(reset)
+        except ValueError:
+            return None
+        if reset_at > 1e12:  # OpenRouter reports epoch milliseconds
+            reset_at /= 1000.0
+        if reset_at > 1e9:  # absolute epoch seconds
+            return max(0.0, reset_at - now)
+        return max(0.0, reset_at)  # already a delta
+    return None
+
+
+class RateLimiter:
+    """Requests-per-minute + tokens-per-minute limiter with FIFO reservations."""
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        state_path: Optional[str] = None,
+        max_wait: float = 120,
+    ):
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.state_path = state_path
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        now = time.time()
+        # In-process state: bucket levels (may go negative), last refill time, hard block
+        self._state = {
+            "requests": float(requests_per_minute),
+            "tokens": float(tokens_per_minute),
+            "updated_at": now,
+            "blocked_until": 0.0,
+        }
+
+    @classmethod
+    def from_env(cls, name: str, prefix: str, default_rpm: float = 0) -> "RateLimiter":
+        return cls(
+            name=name,
+            requests_per_minute=float(os.getenv(f"{prefix}_RPM", str(default_rpm))),
+            tokens_per_minute=float(os.getenv(f"{prefix}_TPM", "0")),
+            state_path=os.getenv("LLM_RATE_LIMIT_STATE_PATH", "").strip() or None,
+            max_wait=float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT", "120")),
+        )
+
+    # ─────── STATE STORAGE ───────
+
+    def _with_state(self, update):
+        """Run update(state) -> result atomically, in memory or in the shared SQLite file."""
+        if not self.state_path:
+            with self._lock:
+                return update(self._state)
+
+        with self._lock:
+            conn = None
+            try:
+                conn = sqlite3.connect(self.state_path, timeout=30, isolation_level=None)
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS rate_limit_state ("
+                    "name TEXT PRIMARY KEY, requests REAL, tokens REAL, "
+                    "updated_at REAL, blocked_until REAL)"
+                )
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT requests, tokens, updated_at, blocked_until FROM rate_limit_state WHERE name = ?",
+                    (self.name,),
+                ).fetchone()
+                state = dict(self._state)
+                if row:
+                    state.update(requests=row[0], tokens=row[1], updated_at=row[2], blocked_until=row[3])
+                result = update(state)
+                conn.execute(
+                    "INSERT OR REPLACE INTO rate_limit_state VALUES (?, ?, ?, ?, ?)",
+                    (self.name, state["requests"], state["tokens"], state["updated_at"], state["blocked_until"]),
+                )
+                conn.execute("COMMIT")
+                return result
+            except sqlite3.Error as e:
+                print(f"Rate limiter '{self.name}': shared state unavailable ({e}), using process-local state")
+                self.state_path = None
+                return update(self._state)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def _refill(self, state: dict, now: float) -> None:
+        elapsed = max(0.0, now - state["updated_at"])
+        if self.requests_per_minute:
+            state["requests"] = min(
+                self.requests_per_minute, state["requests"] + elapsed * self.requests_per_minute / 60.0
+            )
+        if self.tokens_per_minute:
+            state["tokens"] = min(
+                self.tokens_per_minute, state["tokens"] + elapsed * self.tokens_per_minute / 60.0
+            )
+        state["updated_at"] = now
+
+    # ─────── PUBLIC API ───────
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Reserve one request (and `tokens` tokens); return seconds to wait before sending.
+
+        Raises RateLimitExceeded, without reserving anything, if the wait
+        would exceed max_wait."""
+
+        def update(state):
+            now = time.time()
+            self._refill(state, now)
+            delay = max(0.0, state["blocked_until"] - now)
+            requests_left = state["requests"] - 1
+            tokens_left = state["tokens"] - tokens
+            if self.requests_per_minute and requests_left < 0:
+                delay = max(delay, -requests_left * 60.0 / self.requests_per_minute)
+            if self.tokens_per_minute and tokens_left < 0:
+                # A single call bigger than the whole bucket still goes, it just waits for a full refill
+                debt = min(-tokens_left, self.tokens_per_minute)
+                delay = max(delay, debt * 60.0 / self.tokens_per_minute)
+            if delay > self.max_wait:
+                raise RateLimitExceeded(
+                    f"Rate limit exceeded: {self.name} queue wait would be {delay:.0f}s. Wait a minute and try again."
+                )
+            if self.requests_per_minute:
+                state["requests"] = requests_left
+            if self.tokens_per_minute:
+                state["tokens"] = tokens_left
+            return delay
+
+        return self._with_state(update)
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block until a reservation is due; return the time waited."""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def offload(self, fn, *args):
+        """Call fn(*args) from async code. With shared SQLite state the call may wait
+        on the file lock, so it runs in a worker thread instead of on the event loop."""
+        if self.state_path:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def aacquire(self, tokens: int = 0) -> float:
+        """Async version of acquire."""
+        delay = await self.offload(self.reserve, tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def record_usage(self, reserved_tokens: int, actual_tokens: int) -> None:
+        """Correct the token bucket once the real usage is known."""
+        if not self.tokens_per_minute or actual_tokens is None:
+            return
+
+        def update(state):
+            state["tokens"] += reserved_tokens - actual_tokens
+
+        self._with_state(update)
+
+    def block_for(self, seconds: float) -> None:
+        """Hold every caller back for `seconds` (used after a 429 / exhausted budget)."""
+        if seconds <= 0:
+            return
+
+        def update(state):
+            state["blocked_until"] = max(state["blocked_until"], time.time() + seconds)
+
+        self._with_state(update)
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> Optional[float]:
+        """Apply provider hints from a response; return the back-off applied, if any."""
+        wait = retry_after_from_headers(headers)
+        if wait:
+            self.block_for(wait)
+        return wait
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str) -> RateLimiter:
+    """Process-wide limiter for a provider, configured from <PROVIDER>_RPM / <PROVIDER>_TPM."""
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            defaults = {"openrouter": 20, "gemini": 15}
+            limiter = RateLimiter.from_env(provider, provider.upper(), default_rpm=defaults.get(provider, 0))
+            _limiters[provider] = limiter
+        return limiter
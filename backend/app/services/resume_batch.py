@@ -0,0 +1,273 @@
+"""
+Batch resume ingestion for cohort onboarding (a directory or zip of PDFs).
+
+Text extraction is CPU-bound and runs in a process pool; LLM parsing is
+I/O-bound and runs in a thread pool capped at `llm_concurrency` (the rate
+limiter paces the actual requests). Sources are read only as the pools have
+room, so a large archive is never held in memory whole. Results are written
+to resume_data in batches through the parse cache, so an interrupted run
+picks up where it stopped: files whose hash is already stored are skipped.
+"""
+import os
+import signal
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.agents.resume_agent import parse_resume
+from app.db import models
+from app.services.pdf_parser import (
+    PDF_EXTRACT_TIMEOUT, PDF_MAX_UPLOAD_MB, PdfJobTimeout, PdfWorkerPool, extract_text_job, init_pdf_worker
+)
+from app.services.resume_cache import (
+    file_sha256, text_sha256, find_parsed_resume, has_parse, store_parsed_resume, record_cache_result
+)
+
+BATCH_EXTRACT_WORKERS = int(os.getenv("RESUME_BATCH_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+BATCH_LLM_CONCURRENCY = int(os.getenv("RESUME_BATCH_LLM_CONCURRENCY", "3"))
+BATCH_COMMIT_SIZE = 20
+# Per file: text extraction (counted from when a worker starts it) and the LLM parse
+BATCH_EXTRACT_TIMEOUT = float(os.getenv("RESUME_BATCH_EXTRACT_TIMEOUT", str(PDF_EXTRACT_TIMEOUT)))
+BATCH_PARSE_TIMEOUT = float(os.getenv("RESUME_BATCH_PARSE_TIMEOUT", "300"))
+# Zip archives: PDF members, and their total size once decompressed (each member
+# is also held to PDF_MAX_UPLOAD_MB like a single upload)
+BATCH_MAX_FILES = int(os.getenv("RESUME_BATCH_MAX_FILES", "500"))
+BATCH_MAX_UNCOMPRESSED_MB = float(os.getenv("RESUME_BATCH_MAX_UNCOMPRESSED_MB", "1000"))
+# The zip itself, as uploaded to /ai/batch-parse-resumes
+BATCH_MAX_UPLOAD_MB = float(os.getenv("RESUME_BATCH_MAX_UPLOAD_MB", "200"))
+
+
+# ─────── SOURCES ───────
+
+def iter_directory(path: str, max_file_mb: float = PDF_MAX_UPLOAD_MB) -> Iterator[Tuple[str, bytes]]:
+    root = Path(path)
+    pdfs = sorted(p for p in root.rglob("*") if p.suffix.lower() == ".pdf" and p.is_file())
+    for pdf in pdfs:
+        if pdf.stat().st_size > max_file_mb * 1024 * 1024:
+            raise ValueError(f"{pdf.relative_to(root)} is larger than {max_file_mb:g} MB")
+    for pdf in pdfs:
+        yield str(pdf.relative_to(root)), pdf.read_bytes()
+
+
+def _read_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo, max_bytes: int) -> bytes:
+    """Member bytes, refusing to inflate past max_bytes whatever its header claims."""
+    chunks, size = [], 0
+    with archive.open(info) as member:
+        while True:
+            chunk = member.read(256 * 1024)
+            if not chunk:
+                return b"".join(chunks)
+            size += len(chunk)
+            if size > max_bytes:
+                raise ValueError(f"{info.filename} expands past {max_bytes // (1024 * 1024)} MB")
+            chunks.append(chunk)
+
+
+def iter_zip(
+    source,
+    max_files: int = BATCH_MAX_FILES,
+    max_file_mb: float = PDF_MAX_UPLOAD_MB,
+    max_total_mb: float = BATCH_MAX_UNCOMPRESSED_MB,
+) -> Iterator[Tuple[str, bytes]]:
+    """
+    PDF members of a zip (path or file object); macOS resource forks are ignored.
+    Archives over the member count or declared sizes are refused before anything
+    is extracted; sizes are enforced again while inflating, since headers can lie.
+    """
+    max_file_bytes = int(max_file_mb * 1024 * 1024)
+    max_total_bytes = int(max_total_mb * 1024 * 1024)
+    with zipfile.ZipFile(source) as archive:
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir() and info.filename.lower().endswith(".pdf") and "__MACOSX/" not in info.filename
+        ]
+        if len(members) > max_files:
+            raise ValueError(f"Archive has {len(members)} PDFs, the limit is {max_files}")
+        if sum(info.file_size for info in members) > max_total_bytes:
+            raise ValueError(f"Archive expands past {max_total_mb:g} MB")
+        for info in members:
+            if info.file_size > max_file_bytes:
+                raise ValueError(f"{info.filename} is larger than {max_file_mb:g} MB")
+
+        total = 0
+        for info in members:
+            data = _read_member(archive, info, min(max_file_bytes, max_total_bytes - total))
+            total += len(data)
+            yield info.filename, data
+
+
+def iter_sources(path: str) -> Iterator[Tuple[str, bytes]]:
+    if os.path.isdir(path):
+        return iter_directory(path)
+    if zipfile.is_zipfile(path):
+        return iter_zip(path)
+    raise ValueError(f"{path} is neither a directory nor a zip file")
+
+
+# ─────── INGESTION ───────
+
+def _init_batch_worker() -> None:
+    # Ctrl-C is handled by the parent, which saves finished files and shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    init_pdf_worker()
+
+
+@contextmanager
+def _sigint_ignored():
+    """Let a commit finish even if Ctrl-C is pressed again (main thread only)."""
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    previous = signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGINT, previous)
+
+
+def _known_file_hashes(db: Session) -> set:
+    rows = db.query(models.ResumeData.file_sha256).filter(models.ResumeData.file_sha256.isnot(None), has_parse()).all()
+    return {row[0] for row in rows}
+
+
+def ingest_resumes(
+    sources,
+    db: Session,
+    extract_workers: int = BATCH_EXTRACT_WORKERS,
+    llm_concurrency: int = BATCH_LLM_CONCURRENCY,
+    force: bool = False,
+    on_file: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """
+    Extract and parse every (name, pdf bytes) in `sources`, storing one resume_data
+    row per file. Returns {"files": [per-file report], "totals": {...}, "elapsed": s}.
+    Only the calling thread touches `db`.
+    """
+    started = time.perf_counter()
+    known = set() if force else _known_file_hashes(db)
+    reports, pending_rows = [], 0
+    totals = {"parsed": 0, "cached": 0, "skipped": 0, "failed": 0}
+
+    def finish(report: dict) -> None:
+        nonlocal pending_rows
+        report["total_seconds"] = round(time.perf_counter() - report.pop("_started"), 3)
+        totals[report["status"]] += 1
+        reports.append(report)
+        if on_file:
+            on_file(report)
+        if pending_rows >= BATCH_COMMIT_SIZE:
+            db.commit()
+            pending_rows = 0
+
+    def store(report: dict, parsed: dict, text: str) -> None:
+        nonlocal pending_rows
+        store_parsed_resume(db, parsed, file_name=report["file"], file_hash=report["sha256"], text=text, commit=False)
+        known.add(report["sha256"])
+        pending_rows += 1
+
+    def parse(report: dict, text: str, sections) -> dict:
+        # Stamped by the worker thread: BATCH_PARSE_TIMEOUT counts from here, not from queueing
+        report["_parse_started"] = time.perf_counter()
+        return parse_resume(text, sections, use_cache=not force)
+
+    extract_pool = PdfWorkerPool(extract_workers, BATCH_EXTRACT_TIMEOUT, initializer=_init_batch_worker, name="batch")
+    parse_pool = ThreadPoolExecutor(max_workers=max(1, llm_concurrency), thread_name_prefix="resume-batch")
+    # Caps on jobs submitted ahead of the workers
+    max_extracting = 2 * max(1, extract_workers)
+    max_in_flight = max_extracting + 2 * max(1, llm_concurrency)
+    sources = iter(sources)
+    # future -> (stage, report, text)
+    in_flight = {}
+
+    def submit_sources() -> None:
+        extracting = sum(1 for stage, _, _ in in_flight.values() if stage == "extract")
+        while extracting < max_extracting and len(in_flight) < max_in_flight:
+            item = next(sources, None)
+            if item is None:
+                return
+            name, data = item
+            report = {"file": name, "sha256": file_sha256(data), "_started": time.perf_counter()}
+            if report["sha256"] in known:
+                report.update(status="skipped", reason="already stored or duplicate in this batch")
+                finish(report)
+                continue
+            known.add(report["sha256"])
+            in_flight[extract_pool.submit(extract_text_job, data)] = ("extract", report, None)
+            extracting += 1
+
+    try:
+        submit_sources()
+        while in_flight:
+            done, _ = wait(in_flight, timeout=1, return_when=FIRST_COMPLETED)
+            now = time.perf_counter()
+            for future, (stage, report, _) in list(in_flight.items()):
+                parse_started = report.get("_parse_started")
+                if stage == "parse" and future not in done and parse_started and now - parse_started > BATCH_PARSE_TIMEOUT:
+                    # A running LLM call cannot be interrupted; its thread finishes unobserved
+                    future.cancel()
+                    in_flight.pop(future)
+                    report.pop("_parse_started")
+                    report.update(status="failed", error=f"Parsing took longer than {BATCH_PARSE_TIMEOUT:g}s")
+                    finish(report)
+            for future in done:
+                stage, report, text = in_flight.pop(future)
+                if stage == "extract":
+                    try:
+                        result = future.result()
+                    except PdfJobTimeout:
+                        report.update(status="failed", error=f"Text extraction took longer than {BATCH_EXTRACT_TIMEOUT:g}s")
+                        finish(report)
+                        continue
+                    except BrokenProcessPool:
+                        report.update(status="failed", error="PDF could not be processed")
+                        finish(report)
+                        continue
+                    text = result["text"]
+                    report["extract_seconds"] = result["seconds"]
+                    if result["error"] or not text:
+                        report.update(status="failed", error=result["error"] or "No text extracted")
+                        finish(report)
+                        continue
+                    cached = None if force else find_parsed_resume(db, text_hash=text_sha256(text))
+                    if cached:
+                        record_cache_result("text_hit")
+                        report["status"] = "cached"
+                        store(report, cached.parsed_json, text)
+                        finish(report)
+                        continue
+                    record_cache_result("bypass" if force else "miss")
+                    in_flight[parse_pool.submit(parse, report, text, result["sections"])] = ("parse", report, text)
+                else:
+                    report["parse_seconds"] = round(time.perf_counter() - report.pop("_parse_started"), 3)
+                    try:
+                        parsed = future.result()
+                    except Exception as e:
+                        report.update(status="failed", error=str(getattr(e, "detail", e)))
+                        finish(report)
+                        continue
+                    if not parsed:
+                        report.update(status="failed", error="Empty parse")
+                        finish(report)
+                        continue
+                    report["status"] = "parsed"
+                    store(report, parsed, text)
+                    finish(report)
+            submit_sources()
+        db.commit()
+    except BaseException:
+        # Keep everything finished so far; a re-run skips it by file hash
+        with _sigint_ignored():
+            db.commit()
+        for future in in_flight:
+            future.cancel()
+        raise
+    finally:
+        extract_pool.shutdown()
+        parse_pool.shutdown(wait=False, cancel_futures=True)
+
+    return {"files": reports, "totals": totals, "elapsed": round(time.perf_counter() - started, 3)}
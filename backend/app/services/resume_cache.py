@@ -0,0 +1,89 @@
+"""
+Resume parse cache on top of the resume_data table.
+
+A parsed resume is stored with the SHA-256 of the uploaded file bytes and of
+the (whitespace-normalized) extracted text. A repeat upload of the same PDF
+is answered from the file hash without opening it; a different file with the
+same text (re-exported PDF, pasted resume text) is answered from the text hash.
+"""
+import hashlib
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import String, and_, cast
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.db import models
+from app.services.metrics import metrics
+
+
+def file_sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def text_sha256(text: str) -> str:
+    normalized = " ".join((text or "").split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def record_cache_result(result: str) -> None:
+    """result: file_hit | text_hit | miss | bypass"""
+    metrics.inc("resume_parse_cache_total", {"result": result})
+
+
+def has_parse():
+    """SQL condition: the row holds a non-empty parse (not NULL, JSON null or {})."""
+    return and_(
+        models.ResumeData.parsed_json.isnot(None),
+        cast(models.ResumeData.parsed_json, String).notin_(["{}", "null"]),
+    )
+
+
+def find_parsed_resume(db: Session, file_hash: str = None, text_hash: str = None) -> Optional[models.ResumeData]:
+    """Most recent stored parse matching either hash, or None.
+    Empty parses (rows written before failed parses were skipped) are misses, as is
+    a lookup failure (e.g. a database not yet migrated with update_resume_cache.py)."""
+    try:
+        query = db.query(models.ResumeData).filter(has_parse())
+        for column, value in ((models.ResumeData.file_sha256, file_hash), (models.ResumeData.text_sha256, text_hash)):
+            if not value:
+                continue
+            row = query.filter(column == value).order_by(models.ResumeData.upload_date.desc()).first()
+            if row is not None:
+                return row
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"Resume cache lookup failed: {e}")
+    return None
+
+
+def store_parsed_resume(
+    db: Session,
+    parsed: dict,
+    file_name: str = None,
+    file_hash: str = None,
+    text: str = None,
+    portfolio_id: str = None,
+    commit: bool = True,
+) -> Optional[models.ResumeData]:
+    """Store a parse as a cache entry. Empty parses are not stored (None is returned):
+    they would answer every later upload of the same file with nothing."""
+    if not parsed:
+        return None
+    record = models.ResumeData(
+        portfolio_id=portfolio_id,
+        file_name=file_name,
+        parsed_json=parsed,
+        extracted_text=text,
+        file_sha256=file_hash,
+        text_sha256=text_sha256(text) if text else None,
+        upload_date=datetime.utcnow(),
+    )
+    db.add(record)
+    if commit:
+        try:
+            db.commit()
+        except SQLAlchemyError as e:
+            # Caching is best-effort; the parse result is still returned
+            db.rollback()
+            print(f"Resume cache store failed: {e}")
+    return record
@@ -1,17 +1,26 @@
 import re
 from fastapi import HTTPException
 import json
+from app.services.metrics import metrics, llm_caller
 
-def extract_json(text: str) -> str:
-    """Extract JSON from LLM response, handling various edge cases"""
+
+def _record_parse(result: str) -> None:
+    """Count parse outcomes (clean / extracted / repaired / failed) per calling agent."""
+    metrics.inc("llm_json_parse_total", {"caller": llm_caller.get(), "result": result})
+
+
+def _find_json(text: str) -> tuple:
+    """(json_str, how) for the main JSON object in an LLM response, how being
+    clean / extracted / repaired. Raises ValueError when there is none."""
+    original = text
     # Clean up markdown code blocks
     text = text.replace("```json", "").replace("```", "")
-    
+
     # Find the main JSON block - look for opening { and match to closing }
     start_idx = text.find('{')
     if start_idx == -1:
-        raise HTTPException(status_code=500, detail="No JSON found in AI response")
-    
+        raise ValueError("No JSON found in AI response")
+
     # Simple approach: find matching closing brace
     brace_count = 0
     end_idx = start_idx
@@ -23,23 +32,44 @@ def extract_json(text: str) -> str:
             if brace_count == 0:
                 end_idx = i + 1
                 break
-    
+
     json_str = text[start_idx:end_idx]
-    
+
     # Try to validate the JSON
     try:
         json.loads(json_str)
-        return json_str
+        # "extracted": usable, but only after stripping fences/prose around it
+        return json_str, "clean" if json_str == original.strip() else "extracted"
     except json.JSONDecodeError as e:
         # Try to fix common issues
-        
+
         # 1. Remove trailing commas before closing braces/brackets
         json_str = re.sub(r',(\s*[}\]])', r'\1', json_str)
-        
+
         # 2. Try again
         try:
             json.loads(json_str)
-            return json_str
+            return json_str, "repaired"
         except json.JSONDecodeError:
-            print(f"JSON parsing failed: {e}")
-            raise HTTPException(status_code=500, detail=f"Invalid JSON in AI response: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Invalid JSON in AI response: {str(e)}")
+
+
+def extract_json(text: str) -> str:
+    """Extract JSON from LLM response, handling various edge cases"""
+    try:
+        json_str, how = _find_json(text)
+    except ValueError as e:
+        _record_parse("failed")
+        print(f"JSON parsing failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    _record_parse(how)
+    return json_str
+
+
+def is_json_response(text: str) -> bool:
+    """Whether extract_json would succeed; used to keep malformed completions out of the LLM cache."""
+    try:
+        _find_json(text)
+        return True
+    except ValueError:
+        return False
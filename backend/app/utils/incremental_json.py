@@ -0,0 +1,131 @@
+"""Incremental JSON parsing for streamed LLM output."""
+import json
+from typing import Any, List, Tuple
+
+_WHITESPACE = " \t\r\n"
+
+
+class _Frame:
+    __slots__ = ("kind", "start", "key", "index", "expect")
+
+    def __init__(self, kind: str, start: int):
+        self.kind = kind  # "object" or "array"
+        self.start = start
+        self.key = None
+        self.index = 0
+        # object: "key" -> "colon" -> "value" -> "comma"; array: "value" -> "comma"
+        self.expect = "key" if kind == "object" else "value"
+
+    @property
+    def slot(self):
+        return self.key if self.kind == "object" else self.index
+
+
+class IncrementalJSONParser:
+    """
+    Feed text chunks of a JSON object as they stream in and get back every
+    value that has just been completed, as (path, value) pairs.
+
+    Only values up to `max_depth` are reported: with the default of 2 that is
+    each top-level field (("score",), 82) and each item of a top-level array
+    (("suggestions", 0), {...}). Text before the first "{" (markdown fences,
+    preambles) and anything after the root object closes is ignored. Values
+    that do not decode on their own are skipped; callers should still run the
+    full text through extract_json once the stream ends.
+    """
+
+    def __init__(self, max_depth: int = 2):
+        self.max_depth = max_depth
+        self.done = False
+        self._text = ""
+        self._pos = 0
+        self._started = False
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escape = False
+        self._token_start = None  # start of the string/scalar being read
+        self._string_is_key = False
+
+    def feed(self, chunk: str) -> List[Tuple[tuple, Any]]:
+        """Consume a chunk and return the (path, value) pairs it completed."""
+        self._text += chunk
+        events = []
+        text = self._text
+
+        while self._pos < len(text) and not self.done:
+            i = self._pos
+            c = text[i]
+            self._pos += 1
+
+            if not self._started:
+                if c == "{":
+                    self._started = True
+                    self._stack.append(_Frame("object", i))
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    raw = text[self._token_start:i + 1]
+                    frame = self._stack[-1]
+                    if self._string_is_key:
+                        try:
+                            frame.key = json.loads(raw)
+                        except json.JSONDecodeError:
+                            frame.key = raw.strip('"')
+                        frame.expect = "colon"
+                    else:
+                        self._complete(raw, events)
+                continue
+
+            if self._token_start is not None:
+                # Inside a bare scalar (number / true / false / null)
+                if c in _WHITESPACE or c in ",]}":
+                    self._complete(text[self._token_start:i], events)
+                else:
+                    continue
+
+            if c in _WHITESPACE:
+                continue
+            frame = self._stack[-1]
+
+            if c == '"':
+                self._in_string = True
+                self._token_start = i
+                self._string_is_key = frame.kind == "object" and frame.expect == "key"
+            elif c == ":":
+                frame.expect = "value"
+            elif c == ",":
+                if frame.kind == "array":
+                    frame.index += 1
+                frame.expect = "key" if frame.kind == "object" else "value"
+            elif c in "{[":
+                self._stack.append(_Frame("object" if c == "{" else "array", i))
+            elif c in "}]":
+                closed = self._stack.pop()
+                if not self._stack:
+                    self.done = True
+                    break
+                self._token_start = closed.start
+                self._complete(text[closed.start:i + 1], events)
+            else:
+                self._token_start = i
+
+        return events
+
+    def _complete(self, raw: str, events: list) -> None:
+        """A value in the current frame just finished; report it if shallow enough."""
+        self._token_start = None
+        frame = self._stack[-1]
+        frame.expect = "comma"
+        if len(self._stack) > self.max_depth:
+            return
+        path = tuple(f.slot for f in self._stack)
+        try:
+            events.append((path, json.loads(raw)))
+        except json.JSONDecodeError:
+            pass
@@ -0,0 +1,124 @@
+"""
+Layout-aware reading of PDF text.
+
+page.get_text() throws away font sizes and styles, which are usually the only
+thing that marks "EXPERIENCE" as a heading. Here lines from PyMuPDF's "dict"
+output are grouped into ordered blocks, and each block is tagged with a
+heading level (0 = body text, 1 = largest heading style) and the resume
+section it belongs to, so the resume agent can send each prompt only the
+sections it needs.
+"""
+from collections import Counter
+from typing import Dict, List, Optional
+from app.utils.resume_rules import detect_heading
+
+# Headings are short and set larger than body text (or bold / all caps at body size)
+HEADING_SIZE_RATIO = 1.15
+HEADING_MAX_WORDS = 6
+BOLD_FLAG = 16
+
+
+def _line_info(line: dict, page_number: int) -> Optional[dict]:
+    spans = [span for span in line.get("spans", []) if span.get("text", "").strip()]
+    if not spans:
+        return None
+    text = "".join(span["text"] for span in line["spans"]).strip()
+    return {
+        "text": text,
+        "page": page_number,
+        "bbox": tuple(round(v, 1) for v in line["bbox"]),
+        "size": round(max(span["size"] for span in spans) * 2) / 2,
+        "bold": all(span["flags"] & BOLD_FLAG or "bold" in span.get("font", "").lower() for span in spans),
+    }
+
+
+def _body_size(lines: List[dict]) -> float:
+    """Font size carrying the most characters."""
+    weights = Counter()
+    for line in lines:
+        weights[line["size"]] += len(line["text"])
+    return weights.most_common(1)[0][0] if weights else 0.0
+
+
+def _looks_like_heading(line: dict, body_size: float) -> bool:
+    text = line["text"]
+    if len(text.split()) > HEADING_MAX_WORDS or len(text) > 60 or "@" in text:
+        return False
+    if text.endswith((".", ",", ";")) or sum(ch.isdigit() for ch in text) > 4:
+        return False
+    if line["size"] >= body_size * HEADING_SIZE_RATIO:
+        return True
+    letters = [ch for ch in text if ch.isalpha()]
+    return bool(letters) and (line["bold"] or text.isupper())
+
+
+def extract_layout_blocks(document) -> List[dict]:
+    """
+    Ordered blocks for the whole document:
+    {"text", "page", "bbox", "size", "heading_level", "section"}.
+    Heading blocks are single lines; body blocks are runs of lines from one
+    PyMuPDF block. "section" is the canonical resume section (see
+    resume_rules.SECTION_HEADINGS), or "header" before the first section heading.
+    """
+    lines = []
+    for page_number, page in enumerate(document):
+        for block_number, block in enumerate(page.get_text("dict").get("blocks", [])):
+            if block.get("type") != 0:
+                continue
+            for line in block.get("lines", []):
+                info = _line_info(line, page_number)
+                if info:
+                    info["block"] = (page_number, block_number)
+                    lines.append(info)
+    if not lines:
+        return []
+
+    body_size = _body_size(lines)
+    heading_sizes = sorted({l["size"] for l in lines if l["size"] >= body_size * HEADING_SIZE_RATIO}, reverse=True)
+    for line in lines:
+        line["section_name"] = detect_heading(line["text"])
+        if line["section_name"] or _looks_like_heading(line, body_size):
+            # Larger type is a higher-level heading; body-size bold/caps headings come last
+            line["heading_level"] = (heading_sizes.index(line["size"]) + 1
+                                     if line["size"] in heading_sizes else len(heading_sizes) + 1)
+        else:
+            line["heading_level"] = 0
+
+    # Only recognized section names switch sections; other heading-styled lines (a bold
+    # all-caps company or job title inside Experience) stay content of the current section
+    blocks, section = [], "header"
+    for line in lines:
+        if line["heading_level"]:
+            if line["section_name"]:
+                section = line["section_name"]
+            blocks.append({key: line[key] for key in ("text", "page", "bbox", "size", "heading_level")})
+            blocks[-1]["section"] = section
+            continue
+        previous = blocks[-1] if blocks else None
+        if previous and not previous["heading_level"] and previous["_block"] == line["block"]:
+            previous["text"] += "\n" + line["text"]
+            x0, y0, x1, y1 = previous["bbox"]
+            previous["bbox"] = (min(x0, line["bbox"][0]), y0, max(x1, line["bbox"][2]), line["bbox"][3])
+            continue
+        blocks.append({
+            "text": line["text"], "page": line["page"], "bbox": line["bbox"], "size": line["size"],
+            "heading_level": 0, "section": section, "_block": line["block"],
+        })
+
+    for block in blocks:
+        block.pop("_block", None)
+    return blocks
+
+
+def sections_from_blocks(blocks: List[dict]) -> Dict[str, str]:
+    """Section -> body text (headings dropped), the same shape as resume_rules.split_sections."""
+    sections, current = {"header": []}, "header"
+    for block in blocks:
+        opens_section = block["section"] != current
+        current = block["section"]
+        # The heading that opens a section is implied by the key; other headings are content
+        if block["heading_level"] and opens_section:
+            sections.setdefault(current, [])
+            continue
+        sections.setdefault(current, []).append(block["text"])
+    return {name: "\n".join(parts).strip() for name, parts in sections.items()}
@@ -0,0 +1,268 @@
+"""
+Deterministic resume pre-extraction.
+
+Recovers contact details, links, skills and a few simple sections from the
+raw resume text with regexes, heading detection and the skills vocabulary in
+app/utils/skill_matcher.py. Every field comes with a confidence in [0, 1];
+the resume agent only asks the LLM for the fields that are missing or below
+the threshold.
+"""
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from app.utils.skill_matcher import skill_matcher
+
+load_dotenv()
+
+# Fields at or above this confidence are taken as-is and not requested from the LLM
+MIN_CONFIDENCE = float(os.getenv("RESUME_RULES_MIN_CONFIDENCE", "0.8"))
+
+
+# ─────── HEADINGS ───────
+
+# canonical section -> heading spellings (lower-case, without trailing colon)
+SECTION_HEADINGS = {
+    "summary": ["summary", "professional summary", "profile", "professional profile", "objective",
+                "career objective", "about", "about me"],
+    "experience": ["experience", "work experience", "professional experience", "employment",
+                   "employment history", "work history", "internships", "internship"],
+    "education": ["education", "academic background", "academics", "qualifications",
+                  "educational qualifications"],
+    "projects": ["projects", "personal projects", "academic projects", "key projects", "selected projects"],
+    "skills": ["skills", "technical skills", "core skills", "key skills", "tech stack", "technologies",
+               "skills & tools", "skills and tools", "core competencies"],
+    "soft_skills": ["soft skills", "interpersonal skills"],
+    "languages": ["languages", "spoken languages", "languages known"],
+    "certifications": ["certifications", "certificates", "licenses & certifications",
+                       "licenses and certifications", "courses", "certifications & courses"],
+    "publications": ["publications", "research", "papers"],
+    "awards": ["awards", "achievements", "honors", "honours", "awards & achievements",
+               "honors & awards", "accomplishments"],
+}
+
+_HEADING_LOOKUP = {spelling: section for section, spellings in SECTION_HEADINGS.items() for spelling in spellings}
+
+
+def detect_heading(line: str) -> Optional[str]:
+    """Canonical section name if the line is a section heading, else None."""
+    cleaned = re.sub(r"^[\W_]+|[\W_]+$", "", line.strip()).lower()
+    cleaned = re.sub(r"\s+", " ", cleaned)
+    if not cleaned or len(cleaned.split()) > 4:
+        return None
+    return _HEADING_LOOKUP.get(cleaned)
+
+
+def split_sections(text: str) -> Dict[str, str]:
+    """Map canonical section -> body text. Text before the first heading is "header"."""
+    sections = {"header": []}
+    current = "header"
+    for line in text.splitlines():
+        heading = detect_heading(line)
+        if heading:
+            current = heading
+            sections.setdefault(current, [])
+            continue
+        sections.setdefault(current, []).append(line)
+    return {name: "\n".join(lines).strip() for name, lines in sections.items()}
+
+
+def _list_items(body: str) -> List[str]:
+    """Items of a comma/bullet separated section, dropping "Label:" prefixes."""
+    items = []
+    for line in body.splitlines():
+        line = line.split(":", 1)[1] if re.match(r"^\s*[\w &/+-]{2,30}:", line) else line
+        for item in re.split(r"[,|•·●▪;]|\s{3,}|\s-\s", line):
+            item = item.strip(" \t-*.")
+            if item and len(item.split()) <= 4 and item not in items:
+                items.append(item)
+    return items
+
+
+# ─────── CONTACT DETAILS ───────
+
+EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+PHONE_RE = re.compile(r"(?<![\w/])\+?\(?\d[\d\s().-]{6,}\d(?![\w/])")
+LOCATION_LABEL_RE = re.compile(r"^\s*(?:location|address)\s*[:\-]\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+CITY_COUNTRY_RE = re.compile(r"^[A-Z][A-Za-z .'-]{1,40},\s*[A-Z][A-Za-z .'-]{1,40}$")
+
+
+def extract_social_links(text: str):
+    social = {
+        "github": None,
+        "linkedin": None,
+        "website": None,
+        "twitter": None,
+        "leetcode": None,
+    }
+
+    # Drop email addresses first so their domains are not mistaken for a website
+    urls = re.findall(
+        r"(https?://[^\s]+|www\.[^\s]+|[a-zA-Z0-9./-]+\.(com|in|org)[^\s]*)",
+        EMAIL_RE.sub(" ", text),
+    )
+
+    flat_urls = [u[0] if isinstance(u, tuple) else u for u in urls]
+
+    for url in flat_urls:
+        lower = url.lower()
+
+        if "github.com" in lower:
+            social["github"] = url
+        elif "linkedin.com" in lower:
+            social["linkedin"] = url
+        elif "twitter.com" in lower:
+            social["twitter"] = url
+        elif "leetcode.com" in lower:
+            social["leetcode"] = url
+        else:
+            if social["website"] is None:
+                social["website"] = url
+
+    return social
+
+
+def _contact_segments(header: str) -> List[Tuple[int, str]]:
+    """(line index, segment) pairs of the header split on the usual separators."""
+    segments = []
+    for index, line in enumerate(header.splitlines()):
+        for segment in re.split(r"[|•·●▪]|\s{3,}", line):
+            if segment.strip():
+                segments.append((index, segment.strip()))
+    return segments
+
+
+# Header lines that look like a name but are a document title or a job title
+NOT_NAME_WORDS = {
+    "curriculum", "vitae", "resume", "cv", "biodata", "bio-data", "portfolio",
+    "engineer", "developer", "programmer", "manager", "designer", "analyst", "consultant",
+    "scientist", "architect", "intern", "student", "officer", "director", "administrator",
+    "specialist", "lead", "senior", "junior", "software", "data", "full-stack", "frontend",
+    "backend", "devops", "product", "research", "graduate", "fresher",
+}
+
+
+def _extract_name(header: str, email: Optional[str]) -> Tuple[Optional[str], float]:
+    """
+    First name-shaped segment of the header's first lines. It is only confident when
+    corroborated: its words appear in the email's local part, or it sits on the
+    contact line next to the email or phone.
+    """
+    local_part = email.split("@")[0].lower() if email else ""
+    segments = [(index, segment) for index, segment in _contact_segments(header) if index < 5]
+    contact_lines = {index for index, segment in segments if EMAIL_RE.search(segment) or PHONE_RE.search(segment)}
+    for index, segment in segments:
+        if any(ch.isdigit() for ch in segment) or "@" in segment or "/" in segment:
+            continue
+        words = segment.split()
+        if not 2 <= len(words) <= 4 or not all(re.fullmatch(r"[A-Za-z][A-Za-z.'-]*", w) for w in words):
+            continue
+        if not all(w[0].isupper() for w in words):
+            continue
+        if any(w.lower().strip(".") in NOT_NAME_WORDS for w in words) or detect_heading(segment):
+            continue
+        name = segment.title() if segment.isupper() else segment
+        if local_part and any(w.lower().strip(".") in local_part for w in words if len(w) > 2):
+            return name, 0.95
+        if index in contact_lines:
+            return name, 0.85
+        return name, 0.6
+    return None, 0.0
+
+
+def _extract_location(header: str, text: str) -> Tuple[Optional[str], float]:
+    labelled = LOCATION_LABEL_RE.search(text)
+    if labelled:
+        return labelled.group(1).strip(), 0.95
+    segments = _contact_segments(header)
+    contact_lines = {i for i, seg in segments if EMAIL_RE.search(seg) or PHONE_RE.search(seg)}
+    for index, segment in segments:
+        if CITY_COUNTRY_RE.match(segment) and not EMAIL_RE.search(segment):
+            # "City, Country" on the same line as email/phone is almost certainly the location
+            return segment, 0.85 if index in contact_lines else 0.6
+    return None, 0.0
+
+
+# ─────── EXTRACTION ───────
+
+def extract_rule_based(text: str, sections: Optional[Dict[str, str]] = None) -> Dict[str, Tuple[object, float]]:
+    """
+    Rule-based values for the ResumeProfile basic-info fields.
+    `sections` (e.g. from the PDF layout) replaces the line-based split_sections.
+    Returns {field: (value, confidence)}; fields with no evidence are omitted.
+    """
+    text = text or ""
+    sections = sections or split_sections(text)
+    header = sections.get("header", "")
+    # A resume whose sections we can find is one where "no Languages heading" means "no languages"
+    structured = len([s for s in sections if s != "header"]) >= 3
+    fields = {}
+
+    email = EMAIL_RE.search(text)
+    if email:
+        fields["email"] = (email.group(0), 0.95)
+
+    for match in PHONE_RE.finditer(text):
+        digits = re.sub(r"\D", "", match.group(0))
+        if 10 <= len(digits) <= 15:
+            fields["phone"] = (match.group(0).strip(), 0.9)
+            break
+        if 7 <= len(digits) < 10 and "phone" not in fields:
+            fields["phone"] = (match.group(0).strip(), 0.5)
+
+    name, confidence = _extract_name(header, email.group(0) if email else None)
+    if name:
+        fields["name"] = (name, confidence)
+
+    location, confidence = _extract_location(header, text)
+    if location:
+        fields["location"] = (location, confidence)
+
+    social = {k: v for k, v in extract_social_links(text).items() if v}
+    if social:
+        fields["social"] = (social, 0.9)
+    elif structured:
+        # Links are often left out of the text layer, so their absence is not trusted
+        fields["social"] = ({}, 0.5)
+
+    summary = sections.get("summary")
+    if summary:
+        fields["summary"] = (re.sub(r"\s+", " ", summary), 0.9)
+    elif structured:
+        # The LLM can still write one from the rest of the resume
+        fields["summary"] = (None, 0.5)
+
+    skills_body = sections.get("skills", "")
+    if skills_body:
+        # Listed items are skills even when the vocabulary does not know them
+        skills = skill_matcher.normalize(
+            skill_matcher.find(skills_body, "technical") + _list_items(skills_body), "technical"
+        )
+        if skills:
+            fields["technicalSkills"] = (skills, 0.9 if len(skills) >= 3 else 0.7)
+    if "technicalSkills" not in fields:
+        skills = skill_matcher.find(text, "technical", prose=True)
+        if skills:
+            fields["technicalSkills"] = (skills, 0.6)
+
+    if sections.get("soft_skills"):
+        fields["softSkills"] = (skill_matcher.normalize(_list_items(sections["soft_skills"])), 0.9)
+    else:
+        soft = skill_matcher.find(text, "soft")
+        if soft:
+            fields["softSkills"] = (soft, 0.8 if structured else 0.6)
+        elif structured:
+            fields["softSkills"] = ([], 0.5)
+
+    if sections.get("languages"):
+        languages = skill_matcher.find(sections["languages"], "language") or _list_items(sections["languages"])
+        fields["languages"] = (languages, 0.9)
+    elif structured:
+        fields["languages"] = ([], 0.8)
+
+    return fields
+
+
+def confident_fields(extracted: Dict[str, Tuple[object, float]], threshold: float = MIN_CONFIDENCE) -> dict:
+    """{field: value} for fields at or above the confidence threshold."""
+    return {field: value for field, (value, confidence) in extracted.items() if confidence >= threshold}
@@ -0,0 +1,320 @@
+"""
+Skill vocabulary and a multi-pattern matcher over it.
+
+All canonical names and aliases ("JS" -> "JavaScript", "k8s" -> "Kubernetes")
+are compiled into one Aho-Corasick automaton, so scanning a resume or a list
+of GitHub topics is a single linear pass regardless of vocabulary size.
+Categories match the Skill table: technical, soft, language.
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# ─────── VOCABULARY ───────
+
+# canonical name -> aliases (matched case-insensitively, like the name itself)
+TECHNICAL = {
+    "Python": ["python3", "py"],
+    "Java": [],
+    "JavaScript": ["js", "javascript es6", "es6", "ecmascript"],
+    "TypeScript": ["TS"],
+    "C": [],
+    "C++": ["cpp", "c plus plus"],
+    "C#": ["csharp", "c sharp"],
+    "Go": ["golang"],
+    "Rust": [],
+    "Kotlin": [],
+    "Swift": [],
+    "Ruby": [],
+    "PHP": [],
+    "Scala": [],
+    "R": [],
+    "MATLAB": [],
+    "Dart": [],
+    "SQL": [],
+    "Bash": ["shell scripting", "shell"],
+    "HTML": ["html5"],
+    "CSS": ["css3"],
+    "Sass": ["scss"],
+    "Tailwind CSS": ["tailwind", "tailwindcss"],
+    "React": ["react.js", "reactjs"],
+    "Next.js": ["nextjs", "Next"],
+    "Angular": ["angularjs", "angular.js"],
+    "Vue.js": ["Vue", "vuejs"],
+    "Svelte": [],
+    "Redux": [],
+    "Node.js": ["Node", "nodejs", "node js"],
+    "Express": ["express.js", "expressjs"],
+    "Django": [],
+    "Flask": [],
+    "FastAPI": ["fast api"],
+    "Spring": ["spring framework"],
+    "Spring Boot": ["springboot"],
+    "Laravel": [],
+    "Ruby on Rails": ["Rails", "RoR"],
+    ".NET": ["dotnet", "asp.net", ".net core"],
+    "GraphQL": [],
+    "REST": ["rest api", "rest apis", "restful", "restful apis"],
+    "gRPC": [],
+    "PostgreSQL": ["postgres", "psql"],
+    "MySQL": [],
+    "SQLite": [],
+    "MongoDB": ["mongo"],
+    "Redis": [],
+    "Cassandra": [],
+    "Elasticsearch": ["elastic search"],
+    "Firebase": [],
+    "Supabase": [],
+    "DynamoDB": [],
+    "Kafka": ["apache kafka"],
+    "RabbitMQ": [],
+    "AWS": ["amazon web services"],
+    "Azure": ["microsoft azure"],
+    "GCP": ["google cloud", "google cloud platform"],
+    "Docker": ["dockerfile"],
+    "Kubernetes": ["k8s"],
+    "Terraform": ["hcl"],
+    "Ansible": [],
+    "Jenkins": [],
+    "GitHub Actions": [],
+    "CI/CD": ["ci-cd", "cicd", "continuous integration"],
+    "Linux": [],
+    "Git": [],
+    "Nginx": [],
+    "TensorFlow": ["TF"],
+    "PyTorch": ["Torch"],
+    "Keras": [],
+    "scikit-learn": ["sklearn", "scikit learn"],
+    "Pandas": [],
+    "NumPy": [],
+    "OpenCV": [],
+    "LangChain": [],
+    "Machine Learning": ["ML", "machine-learning"],
+    "Deep Learning": ["DL", "deep-learning"],
+    "NLP": ["natural language processing"],
+    "Computer Vision": ["CV", "computer-vision"],
+    "Data Analysis": ["data analytics"],
+    "Power BI": ["powerbi"],
+    "Tableau": [],
+    "Excel": ["ms excel", "microsoft excel"],
+    "Figma": [],
+    "Flutter": [],
+    "React Native": ["react-native"],
+    "Android": [],
+    "iOS": [],
+    "Unity": [],
+    "Selenium": [],
+    "Jest": [],
+    "Pytest": [],
+    "Jupyter Notebook": ["jupyter"],
+}
+
+SOFT = {
+    "Communication": ["communication skills"],
+    "Leadership": [],
+    "Teamwork": ["team work", "team player"],
+    "Collaboration": [],
+    "Problem Solving": ["problem-solving"],
+    "Critical Thinking": [],
+    "Time Management": [],
+    "Adaptability": [],
+    "Mentoring": ["mentorship"],
+    "Public Speaking": [],
+    "Creativity": [],
+    "Project Management": [],
+    "Attention to Detail": [],
+    "Negotiation": [],
+    "Decision Making": ["decision-making"],
+}
+
+LANGUAGES = {
+    "English": [], "Hindi": [], "Bengali": ["bangla"], "Tamil": [], "Telugu": [], "Marathi": [],
+    "Kannada": [], "Malayalam": [], "Gujarati": [], "Punjabi": [], "Urdu": [], "Odia": ["oriya"],
+    "French": [], "German": [], "Spanish": [], "Italian": [], "Portuguese": [], "Japanese": [],
+    "Chinese": [], "Mandarin": [], "Korean": [], "Arabic": [], "Russian": [],
+}
+
+# Surface forms that are ordinary words (or letters) in lower case; in free text they
+# only count when written exactly like this. Exact-list lookups are not affected.
+CASE_SENSITIVE = {
+    "Go", "R", "C", "Rust", "Swift", "Ruby", "Dart", "Express", "Flask", "Spring", "Unity", "Excel",
+    "Jest", "Node", "Torch", "TS", "TF", "ML", "DL", "REST", "Vue", "Rails", "RoR",
+}
+
+# Forms too ambiguous to scan for in prose (CV = curriculum vitae, "shell" is usually not
+# a skill mention, HCL is also a company); they still resolve in exact lookups such as
+# skill lists, topics and GitHub language names
+_FREE_TEXT_EXCLUDED = {"next", "py", "shell", "spring", "cv", "dl", "hcl"}
+
+
+# ─────── AHO-CORASICK ───────
+
+class AhoCorasick:
+    """Classic goto/fail/output automaton over lower-cased keywords."""
+
+    def __init__(self, keywords: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+        for keyword in keywords:
+            self._add(keyword)
+        self._build()
+
+    def _add(self, keyword: str) -> None:
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(keyword)
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter(self, text: str) -> Iterable[Tuple[int, int, str]]:
+        """Yield (start, end, keyword) for every occurrence, overlaps included."""
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for keyword in self._out[state]:
+                yield i + 1 - len(keyword), i + 1, keyword
+
+
+# ─────── MATCHER ───────
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch in "_+#"
+
+
+class SkillMatcher:
+    def __init__(self, vocabulary: Dict[str, Dict[str, List[str]]]):
+        # lower-cased surface form -> (canonical name, category, original surface form)
+        self._forms: Dict[str, Tuple[str, str, str]] = {}
+        for category, entries in vocabulary.items():
+            for canonical, aliases in entries.items():
+                for form in [canonical] + list(aliases):
+                    self._forms.setdefault(form.lower(), (canonical, category, form))
+        self._automaton = AhoCorasick(f for f in self._forms if f not in _FREE_TEXT_EXCLUDED)
+
+    def canonical(self, name: str) -> Optional[str]:
+        """Canonical name for an exact skill name or alias, else None."""
+        entry = self._forms.get(" ".join((name or "").split()).lower())
+        return entry[0] if entry else None
+
+    def category_of(self, name: str) -> Optional[str]:
+        entry = self._forms.get(" ".join((name or "").split()).lower())
+        return entry[1] if entry else None
+
+    def _accept(self, text: str, start: int, end: int, form: str) -> bool:
+        if start > 0 and (_is_word_char(text[start - 1]) or text[start - 1] in ".-@&"):
+            return False
+        if end < len(text):
+            after = text[end]
+            # "Node" in "Node.js" or "R" in "R&D" is part of a longer token
+            if _is_word_char(after) or after == "&" or (after == "." and text[end + 1:end + 2].isalnum()):
+                return False
+        surface = self._forms[form][2]
+        if surface in CASE_SENSITIVE:
+            return text[start:end] == surface
+        return True
+
+    def find(self, text: str, category: Optional[str] = None, prose: bool = False) -> List[str]:
+        """Canonical skills mentioned in free text, in order of first appearance.
+        Overlapping hits resolve leftmost-longest ("React Native" over "React").
+        prose=True is for whole documents rather than skill lists: forms that are
+        also everyday words ("Go", "Excel", "Swift", "Unity") are not counted."""
+        if not text:
+            return []
+        lowered = text.lower()
+        hits = sorted(
+            ((start, -(end - start), end, form) for start, end, form in self._automaton.iter(lowered)
+             if self._accept(text, start, end, form)
+             and not (prose and self._forms[form][2] in CASE_SENSITIVE)),
+        )
+        found, covered_to = [], 0
+        for start, _, end, form in hits:
+            if start < covered_to:
+                continue
+            canonical, form_category, _ = self._forms[form]
+            covered_to = end
+            if (category is None or form_category == category) and canonical not in found:
+                found.append(canonical)
+        return found
+
+    def normalize(self, items, category: Optional[str] = None) -> List[str]:
+        """
+        Flatten whatever shape the LLM returned (string list, {category: [...]},
+        [{"category": ..., "skills": [...]}], comma-separated string) into a
+        de-duplicated list of names, mapping known aliases to canonical names.
+        Unknown names are kept as written.
+        """
+        result, seen = [], set()
+        for name in _flatten(items):
+            name = " ".join(name.split()).strip(" .;-*")
+            if not name:
+                continue
+            canonical = self.canonical(name) or name
+            if category and self.category_of(name) not in (None, category):
+                continue
+            if canonical.lower() not in seen:
+                seen.add(canonical.lower())
+                result.append(canonical)
+        return result
+
+    def from_topics(self, topics: Iterable[str]) -> List[str]:
+        """Canonical skills for GitHub topics / language names ("machine-learning", "k8s")."""
+        found = []
+        for topic in topics or []:
+            if not isinstance(topic, str):
+                continue
+            canonical = self.canonical(topic) or self.canonical(topic.replace("-", " "))
+            if canonical and canonical not in found:
+                found.append(canonical)
+        return found
+
+
+def _flatten(items) -> List[str]:
+    if items is None:
+        return []
+    if isinstance(items, str):
+        return [part for part in items.split(",")] if "," in items else [items]
+    if isinstance(items, dict):
+        names = []
+        for key, value in items.items():
+            if key != "category":
+                names.extend(_flatten(value))
+        return names
+    if isinstance(items, (list, tuple, set)):
+        names = []
+        for item in items:
+            if isinstance(item, dict):
+                # {"category": "Languages", "skills": [...]} or {"name": "Python", "level": ...}
+                for key, value in item.items():
+                    if isinstance(value, list) and key != "category":
+                        names.extend(_flatten(value))
+                if isinstance(item.get("name"), str):
+                    names.append(item["name"])
+            else:
+                names.extend(_flatten(item))
+        return names
+    return []
+
+
+skill_matcher = SkillMatcher({"technical": TECHNICAL, "soft": SOFT, "language": LANGUAGES})
@@ -0,0 +1,97 @@
+"""
+Token estimation and input budgeting for agent prompts.
+
+Agents describe how to shrink their input as an ordered list of trimming
+steps (least important data first). fit_to_budget applies the steps one by
+one until the serialized input fits, and records the before/after size per
+caller so we can see how much each prompt is being cut.
+"""
+import json
+import os
+import threading
+from typing import Any, Callable, List, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Budget for the variable data embedded in a prompt (instructions not included)
+DEFAULT_INPUT_BUDGET = int(os.getenv("LLM_INPUT_TOKEN_BUDGET", "3000"))
+
+# ~4 characters per token is a good average for English prose and JSON
+CHARS_PER_TOKEN = 4
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap, dependency-free token estimate."""
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def compact_json(data: Any) -> str:
+    """JSON without indentation/extra spaces: same content, fewer tokens."""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to roughly max_tokens, preferring to stop at a line break."""
+    if not text or estimate_tokens(text) <= max_tokens:
+        return text or ""
+    limit = max(0, max_tokens * CHARS_PER_TOKEN)
+    cut = text[:limit]
+    newline = cut.rfind("\n")
+    if newline > limit * 0.8:
+        cut = cut[:newline]
+    return cut.rstrip()
+
+
+def fit_to_budget(
+    caller: str,
+    data: Any,
+    steps: List[Callable[[Any], Any]],
+    budget: int = DEFAULT_INPUT_BUDGET,
+    serialize: Callable[[Any], str] = compact_json,
+) -> Tuple[Any, str]:
+    """
+    Apply trimming steps in order until serialize(data) fits in `budget` tokens.
+    Returns (trimmed data, serialized text). Steps must not mutate their input.
+    """
+    text = serialize(data)
+    before = estimate_tokens(text)
+    for step in steps:
+        if estimate_tokens(text) <= budget:
+            break
+        data = step(data)
+        text = serialize(data)
+    record_budget(caller, before, estimate_tokens(text))
+    return data, text
+
+
+def fit_text(caller: str, text: str, budget: int = DEFAULT_INPUT_BUDGET) -> str:
+    """Budget a single block of free text (e.g. resume text)."""
+    trimmed = truncate_to_tokens(text, budget)
+    record_budget(caller, estimate_tokens(text), estimate_tokens(trimmed))
+    return trimmed
+
+
+def record_budget(caller: str, before: int, after: int) -> None:
+    with _stats_lock:
+        entry = _stats.setdefault(
+            caller, {"calls": 0, "trimmed_calls": 0, "tokens_before": 0, "tokens_after": 0}
+        )
+        entry["calls"] += 1
+        entry["tokens_before"] += before
+        entry["tokens_after"] += after
+        if after < before:
+            entry["trimmed_calls"] += 1
+    if after < before:
+        print(f"Prompt budget [{caller}]: ~{before} -> ~{after} input tokens")
+
+
+def budget_stats() -> dict:
+    """Per-caller totals of estimated input tokens before/after trimming."""
+    with _stats_lock:
+        return {caller: dict(entry) for caller, entry in _stats.items()}
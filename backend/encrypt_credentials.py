@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Encrypt API credential tokens stored before CREDENTIALS_ENCRYPTION_KEY was set.
+
+Plaintext rows keep working without this (they are read as-is); run it once
+after configuring the key:
+    python encrypt_credentials.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.db.database import SessionLocal
+from app.db import models
+from app.services.github_tokens import ENCRYPTED_PREFIX, encrypt_token
+
+
+def main():
+    if not encrypt_token("probe").startswith(ENCRYPTED_PREFIX):
+        print("✗ Set CREDENTIALS_ENCRYPTION_KEY first (python -c \"from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())\")")
+        return 1
+
+    with SessionLocal() as db:
+        rows = db.query(models.APICredential).all()
+        updated = 0
+        for row in rows:
+            if row.token and not row.token.startswith(ENCRYPTED_PREFIX):
+                row.token = encrypt_token(row.token)
+                updated += 1
+        db.commit()
+    print(f"✓ Encrypted {updated} of {len(rows)} credentials")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""
+Batch resume ingestion: parse a directory or zip of PDFs into resume_data.
+
+Run:
+    python ingest_resumes.py ./cohort-2026/ --workers 4 --llm-concurrency 3
+    python ingest_resumes.py cohort.zip --report report.json
+
+Interrupted runs can simply be re-run: files already stored are skipped.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.db.database import SessionLocal, init_db
+from app.services.resume_batch import (
+    BATCH_EXTRACT_WORKERS, BATCH_LLM_CONCURRENCY, ingest_resumes, iter_sources
+)
+
+
+def print_file(report: dict) -> None:
+    timings = " ".join(
+        f"{key.replace('_seconds', '')}={report[key]}s"
+        for key in ("extract_seconds", "parse_seconds", "total_seconds") if key in report
+    )
+    error = f" ({report['error']})" if report.get("error") else ""
+    print(f"[{report['status'].upper():7}] {report['file']} {timings}{error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse a directory or zip of resume PDFs")
+    parser.add_argument("path", help="directory (searched recursively) or .zip of PDFs")
+    parser.add_argument("--workers", type=int, default=BATCH_EXTRACT_WORKERS, help="text extraction processes")
+    parser.add_argument("--llm-concurrency", type=int, default=BATCH_LLM_CONCURRENCY, help="resumes parsed by the LLM at once")
+    parser.add_argument("--force", action="store_true", help="re-parse files that are already stored")
+    parser.add_argument("--report", help="write the full JSON report to this file")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        result = ingest_resumes(
+            iter_sources(args.path),
+            db,
+            extract_workers=args.workers,
+            llm_concurrency=args.llm_concurrency,
+            force=args.force,
+            on_file=print_file,
+        )
+    except KeyboardInterrupt:
+        print("\nInterrupted: finished files were saved, re-run the same command to continue")
+        sys.exit(130)
+    except ValueError as e:
+        print(f"[FAIL] {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+    totals = result["totals"]
+    print("=" * 60)
+    print(f"{sum(totals.values())} files in {result['elapsed']}s: "
+          + ", ".join(f"{count} {status}" for status, count in totals.items()))
+    if args.report:
+        Path(args.report).write_text(json.dumps(result, indent=2))
+        print(f"Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+"""
+Local OpenRouter-compatible stub for offline runs and benchmarking of the AI pipeline.
+
+Implements POST /api/v1/chat/completions (plain and stream=true) and answers
+with canned JSON chosen from the prompt type (resume basic info, resume
+sections, per-section resume chunks, combined resume extraction, GitHub
+summary, content enhancement, hiring-trends analysis).
+
+Run:
+    python openrouter_stub.py --port 8001 --latency lognormal:1.5,0.4 --rate-429 0.05
+
+Then point the backend at it (backend/.env):
+    OPENROUTER_URL=http://127.0.0.1:8001/api/v1/chat/completions
+    OPENROUTER_API_KEY=stub
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI(title="OpenRouter stub")
+
+
+# ─────── CONFIGURATION ───────
+
+CONFIG = {
+    # fixed:<s> | uniform:<lo>,<hi> | normal:<mean>,<sd> | lognormal:<median>,<sigma>
+    "latency": os.getenv("STUB_LATENCY", "fixed:0"),
+    "rate_429": float(os.getenv("STUB_429_RATE", "0")),
+    "retry_after": float(os.getenv("STUB_RETRY_AFTER", "1")),
+    "stream_chunk_chars": int(os.getenv("STUB_STREAM_CHUNK_CHARS", "24")),
+    "seed": os.getenv("STUB_SEED"),
+}
+
+_rng = random.Random(CONFIG["seed"])
+STATS = {"requests": 0, "rate_limited": 0, "by_type": {}}
+
+
+def sample_latency() -> float:
+    kind, _, args = CONFIG["latency"].partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()] if args else []
+    if kind == "fixed":
+        return values[0] if values else 0.0
+    if kind == "uniform":
+        return _rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return max(0.0, _rng.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        # parameterised by median so "lognormal:1.5,0.4" means a 1.5s median
+        return _rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Unknown latency distribution: {CONFIG['latency']}")
+
+
+# ─────── CANNED RESPONSES ───────
+
+def _section(prompt: str, marker: str) -> str:
+    """Text in the prompt after a marker line (the data the agent embedded)."""
+    idx = prompt.find(marker)
+    return prompt[idx + len(marker):] if idx != -1 else ""
+
+
+def _first_json(text: str, opener: str):
+    start = text.find(opener)
+    if start == -1:
+        return None
+    try:
+        value, _ = json.JSONDecoder().raw_decode(text[start:])
+        return value
+    except json.JSONDecodeError:
+        return None
+
+
+def _basic_info(prompt: str) -> dict:
+    resume = _section(prompt, "Resume Text:")
+    email = re.search(r"[\w.+-]+@[\w-]+\.[\w.]+", resume)
+    phone = re.search(r"\+?\d[\d\s().-]{8,}\d", resume)
+    first_line = next((line.strip() for line in resume.splitlines() if line.strip()), "Jane Doe")
+    return {
+        "name": first_line[:60],
+        "email": email.group(0) if email else "jane.doe@example.com",
+        "phone": phone.group(0) if phone else "+1 555 010 0000",
+        "location": "Bengaluru, India",
+        "summary": "Software engineer focused on backend services and developer tooling.",
+        "social": {"github": None, "linkedin": None, "website": None, "twitter": None, "leetcode": None},
+        "technicalSkills": ["Python", "FastAPI", "PostgreSQL", "React", "Docker"],
+        "softSkills": ["Communication", "Mentoring"],
+        "languages": ["English", "Hindi"],
+    }
+
+
+def _sections(prompt: str) -> dict:
+    return {
+        "experience": [
+            {"title": "Software Engineer", "company": "Acme Corp", "duration": "2022 - Present",
+             "description": "Built and operated FastAPI services handling 2M requests/day."},
+            {"title": "Intern", "company": "Globex", "duration": "2021 - 2022",
+             "description": "Automated CI pipelines, cutting build times by 40%."},
+        ],
+        "education": [{"school": "State University", "degree": "B.Tech", "field": "Computer Science"}],
+        "projects": [
+            {"name": "IntelliFolio", "description": "AI portfolio generator.",
+             "technologies": ["Python", "Next.js"], "url": "https://github.com/example/intellifolio"},
+        ],
+        "certifications": ["AWS Certified Cloud Practitioner"],
+        "publications": [],
+        "awards": ["Hackathon Winner 2023"],
+    }
+
+
+def _resume_section(prompt: str) -> dict:
+    name = re.search(r"^Section: (\w+)", prompt, re.MULTILINE)
+    name = name.group(1) if name else "experience"
+    return {name: _sections(prompt).get(name, [])}
+
+
+def _resume_combined(prompt: str) -> dict:
+    return {**_basic_info(prompt), **_sections(prompt)}
+
+
+def _github(prompt: str) -> dict:
+    repos = _first_json(_section(prompt, "Top Repositories (extract as projects):"), "[") or []
+    profile = _first_json(_section(prompt, "User Metadata:"), "{") or {}
+    repos = [repo for repo in repos if isinstance(repo, dict) and repo.get("name")]
+    projects = [
+        {
+            "name": repo["name"],
+            "description": repo.get("description") or f"{repo['name']} repository.",
+            "technologies": list(repo.get("technologies") or []),
+        }
+        for repo in repos
+    ]
+    # Skills from the most-starred repos first, as the prompt's repos are ranked
+    languages = []
+    for repo in sorted(repos, key=lambda repo: -(repo.get("stars") or 0)):
+        languages += [tech for tech in repo.get("technologies") or [] if tech not in languages]
+    return {
+        "name": profile.get("name") or "GitHub User",
+        "summary": profile.get("bio") or "Open-source contributor.",
+        "social": {"github": profile.get("profile_url"), "linkedin": None, "website": None, "twitter": None},
+        "education": [],
+        "technicalSkills": languages,
+        "projects": projects,
+    }
+
+
+def _enhance(prompt: str) -> dict:
+    data = _first_json(_section(prompt, "Profile Data:"), "{") or {}
+    return {
+        "headline": f"{data.get('name') or 'Engineer'} | Software Engineer",
+        "enhanced_summary": "Engineer who ships reliable, measurable improvements to production systems.",
+        "experience": [
+            {"title": e.get("title"), "company": e.get("company"),
+             "enhanced_description": ["Delivered features used by thousands of users.", "Reduced latency by 30%."]}
+            for e in data.get("experience", []) if isinstance(e, dict)
+        ],
+        "projects": [
+            {"name": p.get("name"), "enhanced_description": ["Designed and shipped end to end.", "Adopted by 100+ users."]}
+            for p in data.get("projects", []) if isinstance(p, dict)
+        ],
+    }
+
+
+def _analysis(prompt: str) -> dict:
+    return {
+        "score": 72,
+        "hiring_trends_analysis": "Solid backend profile; add quantified impact and cloud/CI keywords to match current postings.",
+        "strengths": ["Relevant Python/FastAPI stack", "Shipped projects with public code"],
+        "weaknesses": ["Few metrics in descriptions", "No cloud deployment evidence"],
+        "suggestions": [
+            {"section": "Projects", "current": "Built an app", "suggestion": "State users, scale or latency achieved.",
+             "reason": "Recruiters scan for measurable outcomes."},
+            {"section": "Skills", "current": "", "suggestion": "Add Docker, CI/CD and a cloud provider.",
+             "reason": "These keywords appear in most backend postings."},
+        ],
+        "missing_keywords": ["AWS", "CI/CD", "Kubernetes"],
+    }
+
+
+# (prompt marker, type name, builder); first match wins
+PROMPT_TYPES = [
+    ("Extract personal information, skills and structured sections", "resume_combined", _resume_combined),
+    ("Extract personal and skill information", "resume_basic_info", _basic_info),
+    ("Extract every entry of the resume section below", "resume_section", _resume_section),
+    ("Extract structured resume sections", "resume_sections", _sections),
+    ("GitHub user metadata", "github_summary", _github),
+    ("resume and portfolio optimization expert", "content_enhance", _enhance),
+    ("Technical Recruiter and Career Coach", "analysis", _analysis),
+]
+
+
+def build_response(prompt: str) -> tuple:
+    for marker, name, builder in PROMPT_TYPES:
+        if marker in prompt:
+            return name, json.dumps(builder(prompt))
+    return "unknown", json.dumps({"message": "stub response"})
+
+
+# ─────── ENDPOINTS ───────
+
+def _usage(prompt: str, text: str) -> dict:
+    prompt_tokens = len(prompt) // 4
+    completion_tokens = len(text) // 4
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+@app.post("/api/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    STATS["requests"] += 1
+    prompt = "\n".join(
+        m.get("content", "") for m in body.get("messages", []) if isinstance(m.get("content"), str)
+    )
+    model = body.get("model", "stub/model")
+
+    if _rng.random() < CONFIG["rate_429"]:
+        STATS["rate_limited"] += 1
+        return JSONResponse(
+            status_code=429,
+            content={"error": {"code": 429, "message": "Rate limit exceeded (stub)"}},
+            headers={"Retry-After": str(CONFIG["retry_after"])},
+        )
+
+    prompt_type, text = build_response(prompt)
+    STATS["by_type"][prompt_type] = STATS["by_type"].get(prompt_type, 0) + 1
+    latency = sample_latency()
+    completion_id = f"gen-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+
+    if body.get("stream"):
+        size = CONFIG["stream_chunk_chars"]
+        chunks = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+        async def _events():
+            yield ": OPENROUTER PROCESSING\n\n"
+            # Spread the sampled latency over the stream, first token after ~20% of it
+            await asyncio.sleep(latency * 0.2)
+            for chunk in chunks:
+                event = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                         "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]}
+                yield f"data: {json.dumps(event)}\n\n"
+                await asyncio.sleep(latency * 0.8 / len(chunks))
+            final = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": _usage(prompt, text)}
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(_events(), media_type="text/event-stream")
+
+    await asyncio.sleep(latency)
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": _usage(prompt, text),
+    }
+
+
+@app.get("/stats")
+def stats():
+    return {**STATS, "config": CONFIG}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenRouter-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", default=CONFIG["latency"],
+                        help="fixed:<s> | uniform:<lo>,<hi> | normal:<mean>,<sd> | lognormal:<median>,<sigma>")
+    parser.add_argument("--rate-429", type=float, default=CONFIG["rate_429"], help="fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=CONFIG["retry_after"], help="Retry-After seconds on 429")
+    parser.add_argument("--seed", default=CONFIG["seed"])
+    args = parser.parse_args()
+
+    CONFIG.update(latency=args.latency, rate_429=args.rate_429, retry_after=args.retry_after, seed=args.seed)
+    _rng.seed(args.seed)
+    sample_latency()  # fail fast on a malformed distribution
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
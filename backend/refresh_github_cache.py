@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+"""
+Refresh the stored GitHub responses for every profile with a GitHub username.
+
+Runs at background priority: it only spends the rate budget above the reserve
+kept for interactive builds, and stops once that is used up. Run it from cron:
+    python refresh_github_cache.py
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.db.database import SessionLocal
+from app.db import models
+from app.agents.github_agent import refresh_github_data
+
+
+def main():
+    db = SessionLocal()
+    try:
+        rows = db.query(models.ProfileData.github_username).filter(models.ProfileData.github_username.isnot(None))
+        usernames = sorted({username for (username,) in rows if username})
+    finally:
+        db.close()
+
+    result = refresh_github_data(usernames)
+    print(f"✓ Refreshed {len(result['refreshed'])} of {len(usernames)} GitHub profiles")
+    if result["remaining"]:
+        print(f"Background budget used up; {len(result['remaining'])} left for the next run")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+"""
+Shared test setup: keep the app's caches, rate-limit state and database out
+of the working tree. Set before any app module reads its configuration.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+_tmp = tempfile.mkdtemp(prefix="intellifolio-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/intellifolio.db")
+os.environ["LLM_CACHE_ENABLED"] = "false"
+os.environ["GITHUB_CACHE_ENABLED"] = "false"
+os.environ["GITHUB_RATE_BUDGET_PATH"] = ""
+os.environ["LLM_RATE_LIMIT_STATE_PATH"] = ""
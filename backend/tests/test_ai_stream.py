@@ -0,0 +1,57 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.agents import content_enhance_agent
+from app.api import ai
+
+COMPLETION = '{"headline": "Backend engineer", "projects": [{"name": "api"}, {"name": "cli"}]}'
+
+
+def read_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(ai.router)
+    return TestClient(app)
+
+
+def fake_stream(chunks, error=None):
+    async def astream_llm(prompt, caller="unknown", **kwargs):
+        for chunk in chunks:
+            yield chunk
+        if error:
+            raise error
+    return astream_llm
+
+
+def test_enhance_profile_streams_fields_then_done(client, monkeypatch):
+    chunks = [COMPLETION[i:i + 9] for i in range(0, len(COMPLETION), 9)]
+    monkeypatch.setattr(content_enhance_agent, "astream_llm", fake_stream(chunks))
+    response = client.post("/ai/enhance-profile?stream=true", json={"name": "Ada"})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert read_events(response.text) == [
+        ("field", {"path": ["headline"], "value": "Backend engineer"}),
+        ("field", {"path": ["projects", 0], "value": {"name": "api"}}),
+        ("field", {"path": ["projects", 1], "value": {"name": "cli"}}),
+        ("field", {"path": ["projects"], "value": [{"name": "api"}, {"name": "cli"}]}),
+        ("done", json.loads(COMPLETION)),
+    ]
+
+
+def test_failure_mid_stream_ends_with_error_event(client, monkeypatch):
+    monkeypatch.setattr(content_enhance_agent, "astream_llm",
+                        fake_stream(['{"headline": "x", '], RuntimeError("429 Too Many Requests")))
+    events = read_events(client.post("/ai/enhance-profile?stream=true", json={}).text)
+    assert events[0] == ("field", {"path": ["headline"], "value": "x"})
+    assert events[-1][0] == "error"
+    assert "rate limit" in events[-1][1]["message"]
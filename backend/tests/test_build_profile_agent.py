@@ -0,0 +1,21 @@
+import asyncio
+
+from app.agents import build_profile_agent, content_enhance_agent
+
+
+def test_abuild_profile_awaits_the_enhancement(monkeypatch):
+    def call_llm(prompt, caller="unknown", **kwargs):
+        raise AssertionError("the sync client would block the event loop")
+
+    async def acall_llm(prompt, caller="unknown", **kwargs):
+        return '{"headline": "Backend engineer"}'
+
+    monkeypatch.setattr(content_enhance_agent, "call_llm", call_llm)
+    monkeypatch.setattr(content_enhance_agent, "acall_llm", acall_llm)
+    result = asyncio.run(build_profile_agent.abuild_profile(
+        resume_data={"name": "Ada", "technicalSkills": ["Python"]},
+        github_data={"technicalSkills": ["Go"], "projects": [{"name": "api"}]},
+    ))
+    assert result["raw_profile"]["name"] == "Ada"
+    assert result["raw_profile"]["projects"] == [{"name": "api"}]
+    assert result["enhanced_profile"] == {"headline": "Backend engineer"}
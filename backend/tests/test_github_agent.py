@@ -0,0 +1,80 @@
+import json
+
+from app.agents import github_agent
+from app.services.github_budget import BACKGROUND, GitHubBudgetExhausted
+
+REPOS = [
+    {"name": "infra", "stars": 0, "language": "HCL", "html_url": "https://github.com/u/infra",
+     "languages": {"HCL": 5000, "Dockerfile": 1000, "Shell": 100}, "topics": ["k8s"]},
+    {"name": "web", "stars": 20, "language": "TypeScript", "html_url": "https://github.com/u/web",
+     "languages": {"TypeScript": 9000, "CSS": 1000}, "topics": ["react"]},
+    {"name": "notes", "stars": 0, "language": "Python", "html_url": "https://github.com/u/notes"},
+]
+
+
+def test_repo_skills_weighted_by_bytes_stars_and_topics():
+    skills = github_agent._repo_skills(REPOS)
+    assert skills[:2] == ["TypeScript", "React"]
+    assert {"Terraform", "Docker", "Kubernetes", "CSS", "Python"} <= set(skills)
+    # Under MIN_LANGUAGE_SHARE of infra's bytes and not its primary language
+    assert "Bash" not in skills
+
+
+def test_repo_skills_are_deterministic():
+    assert github_agent._repo_skills(REPOS) == github_agent._repo_skills(list(reversed(REPOS)))
+
+
+def test_merge_projects_takes_url_and_technologies_from_the_repo():
+    llm_projects = [
+        {"name": "Web", "description": "A storefront", "technologies": ["Ruby"], "url": "https://wrong"},
+        {"name": "web", "description": "duplicate"},
+        {"name": "Talk slides", "description": "From the README", "technologies": ["js"]},
+        "not a project",
+    ]
+    projects = github_agent._merge_projects(llm_projects, REPOS)
+    assert projects[0] == {
+        "name": "web", "description": "A storefront", "url": "https://github.com/u/web",
+        "technologies": ["TypeScript", "React", "CSS"],
+    }
+    assert projects[1]["name"] == "Talk slides"
+    assert projects[1]["technologies"] == ["JavaScript"]
+    assert len(projects) == 2
+
+
+def test_summary_skills_come_from_repos_not_the_llm(monkeypatch):
+    fork = {"name": "forked-go", "stars": 500, "language": "Go", "fork": True, "html_url": "https://github.com/u/f"}
+    monkeypatch.setattr(github_agent, "fetch_github_data",
+                        lambda username, priority=None, token=None: ({"name": "U"}, "", REPOS + [fork]))
+    monkeypatch.setattr(github_agent, "fetch_repo_languages", lambda username, repos, priority=None, token=None: {})
+    monkeypatch.setattr(github_agent, "call_llm", lambda prompt, **kwargs: json.dumps({
+        "name": "U", "summary": "Builds web apps", "technicalSkills": ["COBOL"],
+        "projects": [{"name": "infra", "description": "Cluster setup"}],
+    }))
+    profile = github_agent.summarize_github_profile("u")
+    assert "COBOL" not in profile["technicalSkills"]
+    assert "Go" not in profile["technicalSkills"]
+    assert profile["technicalSkills"][0] == "TypeScript"
+    assert profile["projects"] == [{
+        "name": "infra", "description": "Cluster setup", "url": "https://github.com/u/infra",
+        "technologies": ["Terraform", "Kubernetes", "Docker"],
+    }]
+
+
+def test_refresh_fetches_at_background_priority_until_the_budget_runs_out(monkeypatch):
+    priorities = []
+
+    def fetch_github_data(username, priority=None, token=None):
+        if username == "late":
+            raise GitHubBudgetExhausted("resets in 3600s")
+        priorities.append(priority)
+        return {}, "", REPOS
+
+    def fetch_repo_languages(username, repos, priority=None, token=None):
+        priorities.append(priority)
+        return {}
+
+    monkeypatch.setattr(github_agent, "fetch_github_data", fetch_github_data)
+    monkeypatch.setattr(github_agent, "fetch_repo_languages", fetch_repo_languages)
+    result = github_agent.refresh_github_data(["a", "b", "late", "c"])
+    assert result == {"refreshed": ["a", "b"], "remaining": ["late", "c"]}
+    assert priorities == [BACKGROUND] * 4
@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from app.services.github_budget import BACKGROUND, INTERACTIVE, GitHubBudgetExhausted, GitHubRateBudget
+
+
+def headers(remaining, reset_in, limit=100, resource="core"):
+    return {
+        "X-RateLimit-Limit": str(limit),
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Reset": str(time.time() + reset_in),
+        "X-RateLimit-Resource": resource,
+    }
+
+
+def remaining(budget, resource="core", token="anonymous"):
+    return budget._with_state(resource, token, lambda state: state.get("remaining"))
+
+
+def test_unknown_budget_does_not_block():
+    budget = GitHubRateBudget()
+    assert budget.acquire("core", BACKGROUND) == 0.0
+    assert budget.exhausted_for("core") == 0.0
+
+
+def test_requests_are_counted_against_the_reported_budget():
+    budget = GitHubRateBudget()
+    budget.record(headers(50, 3600))
+    budget.acquire("core", INTERACTIVE)
+    budget.acquire("core", BACKGROUND)
+    assert remaining(budget) == 48
+
+
+def test_budgets_are_kept_per_token_and_resource():
+    budget = GitHubRateBudget()
+    budget.record(headers(0, 3600), token_id="tok-a")
+    assert budget.exhausted_for("core", "tok-a") > 3000
+    assert budget.exhausted_for("core", "tok-b") == 0.0
+    assert budget.exhausted_for("graphql", "tok-a") == 0.0
+
+
+def test_background_requests_leave_the_interactive_reserve():
+    budget = GitHubRateBudget(reserve_fraction=0.2, background_max_wait=60)
+    budget.record(headers(20, 3600))
+    with pytest.raises(GitHubBudgetExhausted):
+        budget.acquire("core", BACKGROUND)
+    assert budget.acquire("core", INTERACTIVE) == 0.0
+    assert remaining(budget) == 19
+
+
+def test_background_request_waits_for_a_near_reset():
+    budget = GitHubRateBudget(reserve_fraction=0.2, background_max_wait=60)
+    budget.record(headers(20, 0.3))
+    waited = budget.acquire("core", BACKGROUND)
+    assert 0 < waited < 1
+    # The window rolled over to a full budget, minus this request
+    assert remaining(budget) == 99
+
+
+def test_workers_share_budget_through_the_state_file(tmp_path):
+    path = str(tmp_path / "budget.db")
+    first, second = GitHubRateBudget(state_path=path), GitHubRateBudget(state_path=path)
+    first.record(headers(10, 3600))
+    second.acquire("core", INTERACTIVE)
+    first.acquire("core", INTERACTIVE)
+    assert remaining(second) == 8
+
+
+def test_unusable_state_file_falls_back_to_memory(tmp_path):
+    budget = GitHubRateBudget(state_path=str(tmp_path / "missing" / "budget.db"))
+    budget.record(headers(10, 3600))
+    assert budget.state_path is None
+    budget.acquire("core", INTERACTIVE)
+    assert remaining(budget) == 9
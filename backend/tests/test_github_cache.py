@@ -0,0 +1,80 @@
+import pytest
+import requests
+
+from app.services import github_service
+from app.services.github_cache import GitHubResponseCache
+
+URL = "https://api.github.com/users/octocat"
+
+
+class FakeGitHub:
+    """Serves one resource with an ETag; answers 304 to a matching If-None-Match."""
+
+    def __init__(self):
+        self.requests = []
+        self.body = b'{"login": "octocat"}'
+        self.etag = '"v1"'
+        self.down = False
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append(dict(headers or {}))
+        if self.down:
+            raise requests.ConnectionError("offline")
+        response = requests.Response()
+        response.url = url
+        response.headers["ETag"] = self.etag
+        if headers.get("If-None-Match") == self.etag:
+            response.status_code = 304
+            response._content = b""
+        else:
+            response.status_code = 200
+            response._content = self.body
+        return response
+
+
+@pytest.fixture
+def github(monkeypatch, tmp_path):
+    fake = FakeGitHub()
+    cache = GitHubResponseCache(path=str(tmp_path / "github.db"), fresh_seconds=0)
+    monkeypatch.setattr(github_service, "github_cache", cache)
+    monkeypatch.setattr(github_service, "_get_session", lambda: fake)
+    return fake, cache
+
+
+def test_revalidation_serves_stored_body_on_304(github):
+    fake, _ = github
+    first = github_service._get(URL, "profile")
+    second = github_service._get(URL, "profile")
+    assert first.json() == second.json() == {"login": "octocat"}
+    assert second.status_code == 200
+    assert "If-None-Match" not in fake.requests[0]
+    assert fake.requests[1]["If-None-Match"] == '"v1"'
+
+
+def test_changed_resource_replaces_stored_copy(github):
+    fake, cache = github
+    github_service._get(URL, "profile")
+    fake.body, fake.etag = b'{"login": "octocat", "bio": "new"}', '"v2"'
+    assert github_service._get(URL, "profile").json()["bio"] == "new"
+    assert cache.get(URL)["etag"] == '"v2"'
+
+
+def test_fresh_copy_served_without_a_request(github):
+    fake, cache = github
+    cache.fresh_seconds = 60
+    github_service._get(URL, "profile")
+    github_service._get(URL, "profile")
+    assert len(fake.requests) == 1
+
+
+def test_network_error_serves_stale_copy(github):
+    fake, _ = github
+    github_service._get(URL, "profile")
+    fake.down = True
+    assert github_service._get(URL, "profile").json() == {"login": "octocat"}
+
+
+def test_response_without_validators_is_not_stored(tmp_path):
+    cache = GitHubResponseCache(path=str(tmp_path / "github.db"))
+    cache.set(URL, {"Content-Type": "application/json"}, b"{}")
+    assert cache.get(URL) is None
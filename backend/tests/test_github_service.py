@@ -0,0 +1,187 @@
+import base64
+import json
+import time
+
+import pytest
+import requests
+
+from app.services import github_service
+
+API = github_service.GITHUB_API_BASE
+
+
+class FakeGitHub:
+    """Answers GET/POST by URL from `routes` (url -> (status, json body, headers)), after `delay`."""
+
+    def __init__(self, routes, delay=0.0):
+        self.routes = routes
+        self.delay = delay
+        self.requests = []
+
+    def _respond(self, method, url, headers):
+        self.requests.append((method, url, dict(headers or {})))
+        time.sleep(self.delay)
+        status, body, extra = self.routes.get(url, (404, {"message": "Not Found"}, {}))
+        response = requests.Response()
+        response.status_code = status
+        response.url = url
+        response._content = json.dumps(body).encode()
+        response.headers.update(extra)
+        return response
+
+    def get(self, url, headers=None, timeout=None):
+        return self._respond("GET", url, headers)
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        return self._respond("POST", url, headers)
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    monkeypatch.delenv("GITHUB_API_TOKEN", raising=False)
+    monkeypatch.setattr(github_service.github_tokens, "pick", lambda: None)
+
+    def serve(routes, delay=0.0):
+        fake = FakeGitHub(routes, delay)
+        monkeypatch.setattr(github_service, "_get_session", lambda: fake)
+        return fake
+    return serve
+
+
+def rest_routes(user="octocat"):
+    readme = base64.b64encode(b"# Hi, I build things").decode()
+    return {
+        f"{API}/users/{user}": (200, {"name": "The Octocat", "html_url": f"https://github.com/{user}"}, {}),
+        f"{API}/repos/{user}/{user}/contents/README.md": (200, {"content": readme}, {}),
+        f"{API}/users/{user}/repos?per_page=100&page=1": (200, [{"name": "hello", "stargazers_count": 3}], {}),
+    }
+
+
+# ─────── CONCURRENT FETCH ───────
+
+def test_rest_requests_run_concurrently(serve, monkeypatch):
+    monkeypatch.setattr(github_service, "GITHUB_USE_GRAPHQL", False)
+    fake = serve(rest_routes(), delay=0.3)
+    started = time.perf_counter()
+    profile, readme, repos = github_service.fetch_github_data("octocat")
+    assert time.perf_counter() - started < 0.8
+    assert len(fake.requests) == 3
+    assert profile["name"] == "The Octocat"
+    assert readme == "# Hi, I build things"
+    assert [repo["name"] for repo in repos] == ["hello"]
+
+
+def test_missing_user_falls_back_to_defaults(serve, monkeypatch):
+    monkeypatch.setattr(github_service, "GITHUB_USE_GRAPHQL", False)
+    serve({})
+    profile, readme, repos = github_service.fetch_github_data("ghost")
+    assert profile["name"] == "ghost" and profile["followers"] == 0
+    assert (readme, repos) == ("", [])
+
+
+def test_session_is_shared_and_pooled():
+    github_service.close_github_session()
+    session = github_service._get_session()
+    try:
+        assert github_service._get_session() is session
+        assert session.get_adapter("https://api.github.com")._pool_maxsize >= 8
+    finally:
+        github_service.close_github_session()
+
+
+# ─────── PAGINATION AND RANKING ───────
+
+def repo_page(page, count=100):
+    return [{"name": f"repo-{page}-{i}"} for i in range(count)]
+
+
+def test_all_repo_pages_are_fetched_up_to_the_cap(serve, monkeypatch):
+    monkeypatch.setattr(github_service, "GITHUB_MAX_REPO_PAGES", 3)
+    url = f"{API}/users/octocat/repos?per_page=100"
+    link = f'<{url}&page=2>; rel="next", <{url}&page=7>; rel="last"'
+    routes = {f"{url}&page=1": (200, repo_page(1), {"Link": link})}
+    routes.update({f"{url}&page={n}": (200, repo_page(n), {}) for n in (2, 3, 4)})
+    fake = serve(routes)
+    repos = github_service.fetch_user_repos("octocat")
+    assert len(repos) == 300
+    assert sorted(url for _, url, _ in fake.requests) == [f"{url}&page={n}" for n in (1, 2, 3)]
+
+
+def test_failed_page_drops_only_its_repos(serve):
+    url = f"{API}/users/octocat/repos?per_page=100"
+    link = f'<{url}&page=3>; rel="last"'
+    serve({
+        f"{url}&page=1": (200, repo_page(1), {"Link": link}),
+        f"{url}&page=3": (200, repo_page(3, 5), {}),
+    })
+    assert len(github_service.fetch_user_repos("octocat")) == 105
+
+
+def test_rank_repos_prefers_pinned_starred_and_recent_work():
+    recent = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    repos = [
+        {"name": "old-fork", "stars": 50, "fork": True, "pushed_at": "2015-01-01T00:00:00Z"},
+        {"name": "plain", "stars": 0},
+        {"name": "active", "stars": 5, "pushed_at": recent, "description": "A tool", "topics": ["cli"]},
+        {"name": "pinned", "stars": 0, "pinned": True},
+        {"name": "archived", "stars": 5, "pushed_at": recent, "description": "A tool", "topics": ["cli"],
+         "archived": True},
+    ]
+    ranked = [repo["name"] for repo in github_service.rank_repos(repos)]
+    assert ranked.index("active") < ranked.index("archived") < ranked.index("plain")
+    assert ranked.index("pinned") < ranked.index("plain")
+    assert ranked.index("old-fork") > ranked.index("active")
+    assert [r["name"] for r in github_service.rank_repos(repos, top_n=2)] == ranked[:2]
+
+
+# ─────── GRAPHQL ───────
+
+def repo_node(name, stars=0, fork=False):
+    return {
+        "name": name, "description": f"{name} app", "url": f"https://github.com/octocat/{name}",
+        "isFork": fork, "isArchived": False, "stargazerCount": stars, "pushedAt": "2024-05-01T00:00:00Z",
+        "primaryLanguage": {"name": "Python"},
+        "languages": {"edges": [{"size": 900, "node": {"name": "Python"}}, {"size": 100, "node": {"name": "Shell"}}]},
+        "repositoryTopics": {"nodes": [{"topic": {"name": "cli"}}]},
+    }
+
+
+GRAPHQL_USER = {
+    "login": "octocat", "name": "The Octocat", "bio": "Builder", "location": "SF", "company": None,
+    "avatarUrl": "https://avatars/octocat", "url": "https://github.com/octocat",
+    "followers": {"totalCount": 10}, "following": {"totalCount": 2},
+    "pinnedItems": {"nodes": [repo_node("pinned-tool", 40), {}]},
+    "repositories": {"totalCount": 2, "nodes": [repo_node("pinned-tool", 40), repo_node("other", 1, fork=True)]},
+    "readme": {"object": {"text": "# Hello"}},
+}
+
+
+def test_graphql_returns_everything_in_one_request(serve, monkeypatch):
+    monkeypatch.setattr(github_service, "GITHUB_USE_GRAPHQL", True)
+    fake = serve({github_service.GITHUB_GRAPHQL_URL: (200, {"data": {"user": GRAPHQL_USER}}, {})})
+    profile, readme, repos = github_service.fetch_github_data("octocat", token="tok")
+    assert [(method, url) for method, url, _ in fake.requests] == [("POST", github_service.GITHUB_GRAPHQL_URL)]
+    assert fake.requests[0][2]["Authorization"] == "token tok"
+    assert profile["followers"] == 10 and profile["public_repos"] == 2
+    assert readme == "# Hello"
+    # The pinned repo is listed once, flagged pinned, with its language breakdown
+    assert [(repo["name"], repo["pinned"]) for repo in repos] == [("pinned-tool", True), ("other", False)]
+    assert repos[0]["languages"] == {"Python": 900, "Shell": 100}
+    assert repos[0]["topics"] == ["cli"] and repos[1]["fork"] is True
+
+
+def test_no_token_means_no_graphql(serve, monkeypatch):
+    monkeypatch.setattr(github_service, "GITHUB_USE_GRAPHQL", True)
+    fake = serve(rest_routes())
+    github_service.fetch_github_data("octocat")
+    assert all(method == "GET" for method, _, _ in fake.requests)
+
+
+def test_graphql_error_falls_back_to_rest(serve, monkeypatch):
+    monkeypatch.setattr(github_service, "GITHUB_USE_GRAPHQL", True)
+    routes = rest_routes()
+    routes[github_service.GITHUB_GRAPHQL_URL] = (200, {"data": {"user": None}, "errors": [{"message": "nope"}]}, {})
+    fake = serve(routes)
+    profile, _, repos = github_service.fetch_github_data("octocat", token="tok")
+    assert profile["name"] == "The Octocat" and [r["name"] for r in repos] == ["hello"]
+    assert len(fake.requests) == 4
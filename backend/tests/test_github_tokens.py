@@ -0,0 +1,151 @@
+import time
+
+import pytest
+import requests
+from cryptography.fernet import Fernet
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api import crud
+from app.db import models
+from app.db.database import get_db
+from app.services import github_service
+from app.services import github_tokens as tokens_module
+from app.services.github_budget import GitHubRateBudget
+from app.services.github_tokens import (
+    GitHubTokenStore, decrypt_token, encrypt_token, github_tokens, token_id,
+)
+from app.utils.firebase_auth import get_firebase_user
+
+
+# ─────── TOKEN POOL ───────
+
+@pytest.fixture
+def store(monkeypatch):
+    store = GitHubTokenStore(cache_seconds=300)
+    monkeypatch.setattr(store, "_credentials", lambda db, user_id=None: [("c1", "tok-a"), ("c2", "tok-b")])
+    monkeypatch.delenv("GITHUB_API_TOKEN", raising=False)
+    return store
+
+
+def test_pick_rotates_and_skips_exhausted_budget(store, monkeypatch):
+    budget = GitHubRateBudget()
+    monkeypatch.setattr(tokens_module, "github_budget", budget)
+    assert {store.pick(), store.pick()} == {"tok-a", "tok-b"}
+    budget.record({
+        "X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": "0",
+        "X-RateLimit-Reset": str(time.time() + 3600), "X-RateLimit-Resource": "core",
+    }, token_id=token_id("tok-a"))
+    assert [store.pick() for _ in range(4)] == ["tok-b"] * 4
+
+
+def test_for_user_uses_newest_credential(store):
+    assert store.for_user(None, "u1") == "tok-a"
+
+
+def test_env_token_joins_the_pool(store, monkeypatch):
+    monkeypatch.setenv("GITHUB_API_TOKEN", "env-tok")
+    assert {store.pick() for _ in range(3)} == {"tok-a", "tok-b", "env-tok"}
+
+
+def test_pick_skips_token_marked_invalid(store):
+    assert {store.pick(), store.pick()} == {"tok-a", "tok-b"}
+    store.mark_invalid("tok-a")
+    assert [store.pick() for _ in range(4)] == ["tok-b"] * 4
+    # A reload from the database does not bring it back
+    store.invalidate()
+    assert [store.pick() for _ in range(4)] == ["tok-b"] * 4
+
+
+def test_for_user_drops_invalid_token(store):
+    assert store.for_user(None, "u1") == "tok-a"
+    store.mark_invalid("tok-a")
+    assert store.for_user(None, "u1") == "tok-b"
+
+
+def test_env_token_not_used_once_rejected(store, monkeypatch):
+    monkeypatch.setenv("GITHUB_API_TOKEN", "env-tok")
+    assert store.env_token() == "env-tok"
+    store.mark_invalid("env-tok")
+    assert store.env_token() is None
+
+
+def test_401_marks_token_invalid(monkeypatch):
+    rejected = []
+
+    class Session:
+        def get(self, url, headers=None, timeout=None):
+            response = requests.Response()
+            response.status_code = 401
+            response.url = url
+            response._content = b'{"message": "Bad credentials"}'
+            return response
+
+    monkeypatch.setattr(github_service, "_get_session", lambda: Session())
+    monkeypatch.setattr(github_tokens, "mark_invalid", rejected.append)
+    response = github_service._get("https://api.github.com/users/octocat", "profile", token="revoked")
+    assert response.status_code == 401
+    assert rejected == ["revoked"]
+
+
+# ─────── ENCRYPTION ───────
+
+def test_tokens_are_encrypted_at_rest(monkeypatch):
+    monkeypatch.setattr(tokens_module, "_fernet", Fernet(Fernet.generate_key()))
+    stored = encrypt_token("ghp_secret")
+    assert stored.startswith(tokens_module.ENCRYPTED_PREFIX) and "ghp_secret" not in stored
+    assert decrypt_token(stored) == "ghp_secret"
+    # Rows written before a key was configured are read as plaintext
+    assert decrypt_token("ghp_legacy") == "ghp_legacy"
+
+
+# ─────── CREDENTIAL ENDPOINTS ───────
+
+@pytest.fixture
+def client():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add(models.User(id="user-1", email="a@example.com", firebase_uid="uid-1"))
+        db.commit()
+
+    def session():
+        with Session() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(crud.router)
+    app.dependency_overrides[get_db] = session
+    return app, TestClient(app)
+
+
+def test_anonymous_caller_cannot_store_credential(client):
+    _, http = client
+    response = http.post("/api/users/user-1/credentials", json={"service": "github", "token": "ghp_x"})
+    assert response.status_code == 401
+
+
+def test_other_user_cannot_store_credential(client):
+    app, http = client
+    app.dependency_overrides[get_firebase_user] = lambda: {"firebase_uid": "uid-2"}
+    response = http.post("/api/users/user-1/credentials", json={"service": "github", "token": "ghp_x"})
+    assert response.status_code == 403
+    assert http.get("/api/users/user-1/credentials").status_code == 403
+
+
+def test_owner_stores_and_deletes_credential(client):
+    app, http = client
+    app.dependency_overrides[get_firebase_user] = lambda: {"firebase_uid": "uid-1"}
+    response = http.post("/api/users/user-1/credentials", json={"service": "github", "token": "ghp_x"})
+    assert response.status_code == 201
+    cred_id = response.json()["id"]
+    assert [c["id"] for c in http.get("/api/users/user-1/credentials").json()] == [cred_id]
+
+    app.dependency_overrides[get_firebase_user] = lambda: {"firebase_uid": "uid-2"}
+    assert http.delete(f"/api/credentials/{cred_id}").status_code == 403
+    app.dependency_overrides[get_firebase_user] = lambda: {"firebase_uid": "uid-1"}
+    assert http.delete(f"/api/credentials/{cred_id}").status_code == 204
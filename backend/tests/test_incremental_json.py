@@ -0,0 +1,38 @@
+from app.utils.incremental_json import IncrementalJSONParser
+
+TEXT = '```json\n{"score": 82, "summary": "Solid \\"backend\\" work", ' \
+       '"suggestions": [{"title": "Add tests", "tags": ["ci"]}, "Pin deps"], "done": true}\n```'
+
+
+def feed_in_chunks(text, size):
+    parser = IncrementalJSONParser()
+    events = []
+    for start in range(0, len(text), size):
+        events += parser.feed(text[start:start + size])
+    return parser, events
+
+
+def test_reports_each_field_and_array_item_as_it_completes():
+    parser, events = feed_in_chunks(TEXT, 1)
+    assert events == [
+        (("score",), 82),
+        (("summary",), 'Solid "backend" work'),
+        (("suggestions", 0), {"title": "Add tests", "tags": ["ci"]}),
+        (("suggestions", 1), "Pin deps"),
+        (("suggestions",), [{"title": "Add tests", "tags": ["ci"]}, "Pin deps"]),
+        (("done",), True),
+    ]
+    assert parser.done
+
+
+def test_chunk_boundaries_do_not_change_events():
+    _, by_char = feed_in_chunks(TEXT, 1)
+    for size in (3, 7, len(TEXT)):
+        assert feed_in_chunks(TEXT, size)[1] == by_char
+
+
+def test_nothing_reported_before_a_value_completes():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"score": 8') == []
+    assert parser.feed('2, "summary": "half') == [(("score",), 82)]
+    assert not parser.done
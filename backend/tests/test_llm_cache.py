@@ -0,0 +1,87 @@
+import time
+
+from app.services import llm_services
+from app.services.llm_cache import LLMCache, make_cache_key
+from app.services.llm_router import Route
+from app.utils.extract_json import is_json_response
+
+
+def test_key_covers_model_and_max_tokens():
+    key = make_cache_key("openrouter", "a", 100, "prompt")
+    assert key == make_cache_key("openrouter", "a", 100, "prompt")
+    assert key != make_cache_key("openrouter", "b", 100, "prompt")
+    assert key != make_cache_key("openrouter", "a", 200, "prompt")
+
+
+def test_memory_lru_evicts_least_recently_used():
+    cache = LLMCache(path=None, max_memory_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("1", "3")
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = LLMCache(path=str(tmp_path / "llm.db"), ttl=0.05)
+    cache.set("a", "1")
+    time.sleep(0.1)
+    assert cache.get("a") is None
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "llm.db")
+    LLMCache(path=path).set("a", "1")
+    assert LLMCache(path=path).get("a") == "1"
+
+
+def test_empty_completion_not_cached():
+    cache = LLMCache(path=None)
+    cache.set("a", "")
+    assert cache.get("a") is None
+
+
+def test_call_llm_serves_repeat_prompt_from_cache(monkeypatch):
+    route = Route("openrouter", "a")
+    calls = []
+
+    def invoke(route, prompt, max_tokens, info=None):
+        calls.append(prompt)
+        return "answer"
+
+    monkeypatch.setattr(llm_services, "llm_cache", LLMCache(path=None))
+    monkeypatch.setattr(llm_services.llm_router, "configured_routes", lambda: [route])
+    monkeypatch.setattr(llm_services, "_invoke", invoke)
+    assert llm_services.call_llm("prompt", caller="test") == "answer"
+    assert llm_services.call_llm("prompt", caller="test") == "answer"
+    assert llm_services.call_llm("prompt", use_cache=False, caller="test") == "answer"
+    assert calls == ["prompt", "prompt"]
+
+
+def test_malformed_completion_is_not_replayed(monkeypatch):
+    route = Route("openrouter", "a")
+    replies = ["Sorry, I can't help with that", '{"name": "Jane"}']
+    calls = []
+
+    def invoke(route, prompt, max_tokens, info=None):
+        calls.append(prompt)
+        return replies[min(len(calls), len(replies)) - 1]
+
+    cache = LLMCache(path=None)
+    monkeypatch.setattr(llm_services, "llm_cache", cache)
+    monkeypatch.setattr(llm_services.llm_router, "configured_routes", lambda: [route])
+    monkeypatch.setattr(llm_services, "_invoke", invoke)
+
+    def call():
+        return llm_services.call_llm("prompt", caller="test", validate=is_json_response)
+
+    assert call() == "Sorry, I can't help with that"
+    # The retry goes upstream again instead of getting the same refusal from the cache
+    assert call() == '{"name": "Jane"}'
+    assert call() == '{"name": "Jane"}'
+    assert len(calls) == 2
+
+    # An entry stored without validation is a miss for a validating caller
+    cache.set(llm_services._route_cache_key(route, "other", 4096), "not json")
+    assert llm_services.call_llm("other", caller="test", validate=is_json_response) == '{"name": "Jane"}'
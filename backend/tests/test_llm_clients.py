@@ -0,0 +1,113 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+
+from app.services import llm_services
+from app.services.llm_cache import LLMCache
+from app.services.rate_limiter import RateLimiter
+
+
+def test_async_client_is_reused_within_a_loop():
+    async def clients():
+        return llm_services._get_async_http(), llm_services._get_async_http()
+
+    first, again = asyncio.run(clients())
+    assert first is again
+    # A client is bound to its loop: a new loop gets a new one
+    second, _ = asyncio.run(clients())
+    assert second is not first
+    asyncio.run(llm_services.aclose_llm_clients())
+    assert llm_services._async_http is None
+
+
+def test_gemini_client_is_made_once_per_key(monkeypatch):
+    monkeypatch.setattr(llm_services, "_gemini_clients", {})
+    monkeypatch.setenv("GEMINI_API_KEY", "key-a")
+    client = llm_services._get_gemini_client()
+    assert llm_services._get_gemini_client() is client
+    monkeypatch.setenv("GEMINI_API_KEY", "key-b")
+    assert llm_services._get_gemini_client() is not client
+
+
+def test_acall_llm_over_pooled_client(monkeypatch):
+    """Concurrent async calls go through one pooled client."""
+    clients, prompts = [], []
+
+    def answer(request):
+        prompts.append(request.read())
+        return httpx.Response(200, json={"choices": [{"message": {"content": "stub response"}}]})
+
+    def pooled_client():
+        if not clients:
+            clients.append(httpx.AsyncClient(transport=httpx.MockTransport(answer)))
+        return clients[0]
+
+    monkeypatch.setenv("OPENROUTER_API_KEY", "stub")
+    monkeypatch.setattr(llm_services, "_get_async_http", pooled_client)
+    monkeypatch.setattr(llm_services, "llm_cache", LLMCache(path=None))
+
+    async def main():
+        try:
+            return await asyncio.gather(*(llm_services.acall_llm(f"prompt {i}", use_cache=False) for i in range(3)))
+        finally:
+            await clients[0].aclose()
+
+    assert asyncio.run(main()) == ["stub response"] * 3
+    assert len(clients) == 1 and len(prompts) == 3
+
+
+def test_async_paths_wait_on_the_limiter_without_blocking(monkeypatch):
+    """Every async provider call queues through aacquire, never the blocking acquire."""
+    limiter = RateLimiter("test", requests_per_minute=6000)
+    limiter._state["requests"] = 0.0
+    waits = []
+    aacquire = limiter.aacquire
+
+    def acquire(tokens=0):
+        raise AssertionError("blocking acquire on an async path")
+
+    async def spy(tokens=0):
+        waits.append(await aacquire(tokens))
+        return waits[-1]
+
+    limiter.acquire, limiter.aacquire = acquire, spy
+    monkeypatch.setattr(llm_services, "get_limiter", lambda name: limiter)
+
+    def answer(request):
+        if json.loads(request.read()).get("stream"):
+            return httpx.Response(200, text='data: {"choices": [{"delta": {"content": "hi"}}]}\n\ndata: [DONE]\n\n')
+        return httpx.Response(200, json={"choices": [{"message": {"content": "hi"}}]})
+
+    class Chunk:
+        text = "hi"
+
+    async def generate_content(model, contents):
+        return Chunk()
+
+    async def generate_content_stream(model, contents):
+        async def chunks():
+            yield Chunk()
+        return chunks()
+
+    gemini = SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(
+        generate_content=generate_content, generate_content_stream=generate_content_stream)))
+    monkeypatch.setenv("OPENROUTER_API_KEY", "stub")
+    monkeypatch.setattr(llm_services, "_get_gemini_client", lambda: gemini)
+
+    async def main():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(answer))
+        monkeypatch.setattr(llm_services, "_get_async_http", lambda: client)
+        try:
+            return [
+                await llm_services._acall_openrouter("prompt"),
+                "".join([delta async for delta in llm_services._astream_openrouter("prompt")]),
+                await llm_services._acall_gemini("prompt"),
+                "".join([delta async for delta in llm_services._astream_gemini("prompt")]),
+            ]
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(main()) == ["hi"] * 4
+    assert len(waits) == 4 and all(wait > 0 for wait in waits)
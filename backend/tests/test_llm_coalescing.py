@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services import llm_services
+from app.services.llm_router import Route
+
+ROUTE = Route("openrouter", "a")
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    calls = []
+
+    def invoke(route, prompt, max_tokens, info=None):
+        calls.append(prompt)
+        time.sleep(0.3)
+        if prompt == "fail":
+            raise RuntimeError("upstream down")
+        return f"answer to {prompt}"
+
+    async def ainvoke(route, prompt, max_tokens, info=None):
+        calls.append(prompt)
+        await asyncio.sleep(0.3)
+        return f"answer to {prompt}"
+
+    monkeypatch.setattr(llm_services.llm_router, "configured_routes", lambda: [ROUTE])
+    monkeypatch.setattr(llm_services, "_invoke", invoke)
+    monkeypatch.setattr(llm_services, "_ainvoke", ainvoke)
+    return calls
+
+
+def test_concurrent_identical_calls_share_one_request(upstream):
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        results = list(pool.map(lambda _: llm_services.call_llm("same", use_cache=False), range(5)))
+    assert results == ["answer to same"] * 5
+    assert upstream == ["same"]
+    assert llm_services._single_flight.in_flight() == 0
+
+
+def test_different_prompts_are_not_coalesced(upstream):
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = list(pool.map(lambda p: llm_services.call_llm(p, use_cache=False), ["x", "y"]))
+    assert results == ["answer to x", "answer to y"]
+    assert sorted(upstream) == ["x", "y"]
+
+
+def test_waiters_receive_the_leaders_error(upstream):
+    errors = []
+
+    def call():
+        try:
+            llm_services.call_llm("fail", use_cache=False)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == ["upstream down"] * 3
+    assert upstream == ["fail"]
+
+
+def test_async_identical_calls_share_one_request(upstream):
+    async def main():
+        return await asyncio.gather(*(llm_services.acall_llm("same", use_cache=False) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["answer to same"] * 5
+    assert upstream == ["same"]
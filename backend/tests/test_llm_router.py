@@ -0,0 +1,104 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.llm_router import LLMRouter, Route
+
+A, B, C = Route("openrouter", "a"), Route("openrouter", "b"), Route("gemini", "c")
+
+
+def make_router(routes, hedge=True, delay=0.3):
+    router = LLMRouter(hedge=hedge, default_hedge_delay=delay)
+    router.configured_routes = lambda: list(routes)
+    return router
+
+
+def invoker(behaviour, calls):
+    """behaviour: route -> (seconds, error or None)."""
+    def invoke(route):
+        calls.append(route)
+        seconds, error = behaviour[route]
+        time.sleep(seconds)
+        if error:
+            raise error
+        return route.model
+    return invoke
+
+
+def ainvoker(behaviour, calls):
+    async def ainvoke(route):
+        calls.append(route)
+        seconds, error = behaviour[route]
+        await asyncio.sleep(seconds)
+        if error:
+            raise error
+        return route.model
+    return ainvoke
+
+
+def test_fallback_without_hedging():
+    calls = []
+    router = make_router([A, B], hedge=False)
+    text, route = router.call(invoker({A: (0, ValueError("down")), B: (0, None)}, calls))
+    assert (text, route) == ("b", B)
+    assert calls == [A, B]
+
+
+def test_fast_primary_failure_starts_backup_immediately():
+    calls = []
+    router = make_router([A, B, C], delay=5)
+    started = time.perf_counter()
+    text, route = router.call(invoker({A: (0, ValueError("down")), B: (0, None), C: (0, None)}, calls))
+    assert (text, route) == ("b", B)
+    assert calls == [A, B]
+    assert time.perf_counter() - started < 1
+
+
+def test_backup_not_skipped_when_primary_answers_within_delay():
+    calls = []
+    router = make_router([A, B, C], delay=5)
+    assert router.call(invoker({A: (0, None), B: (0, None), C: (0, None)}, calls)) == ("a", A)
+    assert calls == [A]
+
+
+def test_slow_primary_is_hedged():
+    calls = []
+    router = make_router([A, B], delay=0.1)
+    assert router.call(invoker({A: (1, None), B: (0, None)}, calls)) == ("b", B)
+
+
+def test_both_hedged_routes_fail_then_next_route():
+    calls = []
+    router = make_router([A, B, C], delay=5)
+    behaviour = {A: (0, ValueError("a")), B: (0, ValueError("b")), C: (0, None)}
+    assert router.call(invoker(behaviour, calls)) == ("c", C)
+    assert calls == [A, B, C]
+
+
+def test_async_fast_primary_failure_starts_backup_immediately():
+    calls = []
+    router = make_router([A, B, C], delay=5)
+    behaviour = {A: (0, ValueError("down")), B: (0, None), C: (0, None)}
+    assert asyncio.run(router.acall(ainvoker(behaviour, calls))) == ("b", B)
+    assert calls == [A, B]
+
+
+def test_async_slow_primary_is_hedged_and_cancelled():
+    calls = []
+    router = make_router([A, B], delay=0.05)
+    assert asyncio.run(router.acall(ainvoker({A: (1, None), B: (0, None)}, calls))) == ("b", B)
+    # The cancelled loser is not counted as a failure
+    assert router.snapshot()["openrouter/a"]["failures"] == 0
+
+
+def test_repeated_failures_put_route_on_cooldown():
+    router = make_router([A, B], hedge=False)
+    for _ in range(3):
+        router.record(A, 0.1, ok=False)
+    assert router.ranked_routes() == [B, A]
+
+
+def test_no_routes():
+    with pytest.raises(ValueError):
+        make_router([]).call(lambda route: "x")
@@ -0,0 +1,65 @@
+from app.services import llm_services
+from app.services.llm_cache import LLMCache
+from app.services.llm_router import Route
+from app.services.metrics import Histogram, MetricsRegistry
+
+
+def series(snapshot, kind, name, **labels):
+    for entry in snapshot[kind].get(name, []):
+        if entry["labels"] == labels:
+            return entry
+    return None
+
+
+def test_histogram_quantiles_use_bucket_bounds():
+    histogram = Histogram((1, 2, 4))
+    for value in (0.5, 0.5, 1.5, 3, 10):
+        histogram.observe(value)
+    assert histogram.quantile(0.4) == 1
+    assert histogram.quantile(0.6) == 2
+    assert histogram.quantile(1.0) == float("inf")
+    assert histogram.to_dict()["count"] == 5
+
+
+def test_counters_are_kept_per_label_set():
+    registry = MetricsRegistry()
+    registry.inc("calls", {"caller": "a"})
+    registry.inc("calls", {"caller": "a"}, 2)
+    registry.inc("calls", {"caller": "b"})
+    snapshot = registry.snapshot()
+    assert series(snapshot, "counters", "calls", caller="a")["value"] == 3
+    assert series(snapshot, "counters", "calls", caller="b")["value"] == 1
+
+
+def test_prometheus_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    registry.observe("latency", 0.3, {"caller": "a"}, buckets=(0.1, 0.5))
+    registry.observe("latency", 0.05, {"caller": "a"}, buckets=(0.1, 0.5))
+    text = registry.prometheus()
+    assert "# TYPE latency histogram" in text
+    assert 'latency_bucket{caller="a",le="0.1"} 1' in text
+    assert 'latency_bucket{caller="a",le="0.5"} 2' in text
+    assert 'latency_bucket{caller="a",le="+Inf"} 2' in text
+    assert 'latency_count{caller="a"} 2' in text
+
+
+def test_call_llm_records_telemetry(monkeypatch):
+    registry = MetricsRegistry()
+
+    def invoke(route, prompt, max_tokens, info=None):
+        info.update(prompt_tokens=120, completion_tokens=30, retries=1, latency=0.2)
+        return "answer"
+
+    monkeypatch.setattr(llm_services, "metrics", registry)
+    monkeypatch.setattr(llm_services, "llm_cache", LLMCache(path=None))
+    monkeypatch.setattr(llm_services.llm_router, "configured_routes", lambda: [Route("openrouter", "m")])
+    monkeypatch.setattr(llm_services, "_invoke", invoke)
+    llm_services.call_llm("prompt", caller="resume")
+    llm_services.call_llm("prompt", caller="resume")
+
+    snapshot = registry.snapshot()
+    assert series(snapshot, "counters", "llm_calls_total", caller="resume", result="upstream")["value"] == 1
+    assert series(snapshot, "counters", "llm_calls_total", caller="resume", result="cache_hit")["value"] == 1
+    assert series(snapshot, "counters", "llm_retries_total", caller="resume", model="openrouter/m")["value"] == 1
+    assert series(snapshot, "histograms", "llm_prompt_tokens", caller="resume")["sum"] == 120
+    assert series(snapshot, "histograms", "llm_call_seconds", caller="resume")["count"] == 2
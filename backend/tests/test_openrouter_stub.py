@@ -0,0 +1,86 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import openrouter_stub
+from app.agents import github_agent, resume_agent
+from app.services import llm_services
+from app.services.llm_cache import LLMCache
+from app.services.llm_router import Route
+
+URL = "/api/v1/chat/completions"
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    monkeypatch.setitem(openrouter_stub.CONFIG, "latency", "fixed:0")
+    monkeypatch.setitem(openrouter_stub.CONFIG, "rate_429", 0)
+    return TestClient(openrouter_stub.app)
+
+
+def completion(prompt, **extra):
+    return {"model": "stub/model", "messages": [{"role": "user", "content": prompt}], **extra}
+
+
+def test_answers_with_canned_json_for_the_prompt_type(stub):
+    body = stub.post(URL, json=completion("Extract structured resume sections\nResume Text:\n...")).json()
+    content = json.loads(body["choices"][0]["message"]["content"])
+    assert content["experience"][0]["company"] == "Acme Corp"
+    assert body["usage"]["total_tokens"] == body["usage"]["prompt_tokens"] + body["usage"]["completion_tokens"]
+
+
+def test_rate_limited_requests_get_429_with_retry_after(stub, monkeypatch):
+    monkeypatch.setitem(openrouter_stub.CONFIG, "rate_429", 1.0)
+    response = stub.post(URL, json=completion("hello"))
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == str(openrouter_stub.CONFIG["retry_after"])
+
+
+def test_streamed_chunks_add_up_to_the_completion(stub):
+    response = stub.post(URL, json=completion("Extract structured resume sections", stream=True))
+    events = [line[len("data: "):] for line in response.text.splitlines() if line.startswith("data: ")]
+    assert events[-1] == "[DONE]"
+    chunks = [json.loads(event) for event in events[:-1]]
+    text = "".join(chunk["choices"][0]["delta"].get("content", "") for chunk in chunks)
+    assert json.loads(text)["education"][0]["degree"] == "B.Tech"
+    assert "usage" in chunks[-1]
+
+
+@pytest.mark.parametrize("spec", ["fixed:0.5", "uniform:0.1,0.2", "normal:1,0.1", "lognormal:1.5,0.4"])
+def test_latency_distributions(spec, monkeypatch):
+    monkeypatch.setitem(openrouter_stub.CONFIG, "latency", spec)
+    assert all(openrouter_stub.sample_latency() >= 0 for _ in range(20))
+
+
+def test_resume_agent_prompts_are_recognized(stub, monkeypatch):
+    """The backend's own prompts hit the stub's canned answers, so offline runs exercise the real pipeline."""
+    monkeypatch.setenv("OPENROUTER_API_KEY", "stub")
+    monkeypatch.setattr(llm_services, "OPENROUTER_URL", f"http://testserver{URL}")
+    monkeypatch.setattr(llm_services, "_get_http_session", lambda: stub)
+    monkeypatch.setattr(llm_services, "llm_cache", LLMCache(path=None))
+    monkeypatch.setattr(llm_services.llm_router, "configured_routes", lambda: [Route("openrouter", "stub/model")])
+    monkeypatch.setattr(resume_agent, "RESUME_EXTRACTION_MODE", "combined")
+    before = dict(openrouter_stub.STATS["by_type"])
+
+    profile = resume_agent.parse_resume("Sam Lee\nsomething about work")
+    assert profile["experience"][0]["company"] == "Acme Corp"
+    assert openrouter_stub.STATS["by_type"].get("resume_combined", 0) == before.get("resume_combined", 0) + 1
+
+
+def test_github_answer_is_built_from_the_prompts_repo_technologies(stub, monkeypatch):
+    repos = [
+        {"name": "web", "stars": 1, "language": "TypeScript", "html_url": "https://github.com/u/web"},
+        {"name": "api", "stars": 9, "language": "Python", "topics": ["fastapi"], "html_url": "https://github.com/u/api"},
+    ]
+    prompts = []
+    monkeypatch.setattr(github_agent, "fetch_github_data", lambda username, priority=None, token=None: ({}, "", repos))
+    monkeypatch.setattr(github_agent, "fetch_repo_languages", lambda username, repos, priority=None, token=None: {})
+    monkeypatch.setattr(github_agent, "call_llm", lambda prompt, **kwargs: prompts.append(prompt) or "{}")
+    github_agent.summarize_github_profile("u")
+
+    body = stub.post(URL, json=completion(prompts[0])).json()
+    content = json.loads(body["choices"][0]["message"]["content"])
+    technologies = {project["name"]: project["technologies"] for project in content["projects"]}
+    assert technologies == {"api": ["Python", "FastAPI"], "web": ["TypeScript"]}
+    assert content["technicalSkills"] == ["Python", "FastAPI", "TypeScript"]
@@ -0,0 +1,58 @@
+import fitz
+
+from app.utils.pdf_layout import extract_layout_blocks, sections_from_blocks
+
+
+def build_resume(lines):
+    """One-page PDF from (text, fontsize, bold) lines."""
+    document = fitz.open()
+    page = document.new_page()
+    y = 60
+    for text, size, bold in lines:
+        page.insert_text((50, y), text, fontsize=size, fontname="hebo" if bold else "helv")
+        y += size + 8
+    return document
+
+
+def test_sections_follow_heading_styles():
+    document = build_resume([
+        ("JANE DOE", 18, True),
+        ("jane@example.com", 10, False),
+        ("Experience", 14, True),
+        ("Built billing services in Python and Go", 10, False),
+        ("Skills", 14, True),
+        ("Python, Go, Kubernetes", 10, False),
+    ])
+    blocks = extract_layout_blocks(document)
+    sections = sections_from_blocks(blocks)
+
+    assert set(sections) == {"header", "experience", "skills"}
+    assert "jane@example.com" in sections["header"]
+    assert "Built billing services" in sections["experience"]
+    assert sections["skills"] == "Python, Go, Kubernetes"
+
+
+def test_bold_caps_lines_inside_experience_stay_in_experience():
+    document = build_resume([
+        ("JANE DOE", 18, True),
+        ("jane@example.com", 10, False),
+        ("EXPERIENCE", 14, True),
+        ("ACME CORP", 14, True),
+        ("Built billing services in Python and Go", 10, False),
+        ("SENIOR ENGINEER", 14, True),
+        ("Led a team of four engineers", 10, False),
+        ("EDUCATION", 14, True),
+        ("B.Tech Computer Science, 2019", 10, False),
+    ])
+    blocks = extract_layout_blocks(document)
+    sections = sections_from_blocks(blocks)
+
+    assert set(sections) == {"header", "experience", "education"}
+    experience = sections["experience"]
+    assert "ACME CORP" in experience
+    assert "Built billing services" in experience
+    assert "SENIOR ENGINEER" in experience
+    assert "Led a team" in experience
+    assert "B.Tech" in sections["education"]
+    assert "JANE DOE" in sections["header"]
+    assert [b["section"] for b in blocks if b["text"] == "ACME CORP"] == ["experience"]
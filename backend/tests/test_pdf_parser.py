@@ -0,0 +1,111 @@
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+import time
+
+import fitz
+import pytest
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+
+from app.services import pdf_parser
+from app.services.pdf_parser import extract_pdf, extract_pdf_async, extract_text_job
+
+
+def make_pdf(lines, pages=1) -> bytes:
+    document = fitz.open()
+    for _ in range(pages):
+        page = document.new_page()
+        for i, line in enumerate(lines):
+            page.insert_text((72, 72 + 14 * i), line)
+    data = document.tobytes()
+    document.close()
+    return data
+
+
+def hanging_extract(source):
+    if source == b"hang":
+        time.sleep(60)
+    if isinstance(source, str) and "slow" in source:
+        time.sleep(1.8)
+    return extract_text_job(source)
+
+
+def upload(data: bytes, content_type: str = "application/pdf") -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename="resume.pdf", headers=Headers({"content-type": content_type}))
+
+
+@pytest.fixture
+def fresh_pool(monkeypatch):
+    pdf_parser.shutdown_pdf_pool()
+    monkeypatch.setattr(pdf_parser, "PDF_EXTRACT_TIMEOUT", 2)
+    yield
+    pdf_parser.shutdown_pdf_pool()
+
+
+def test_extract_pdf_text():
+    text, _ = extract_pdf(make_pdf(["Jane Doe", "Python developer"]), layout=False)
+    assert "Jane Doe" in text and "Python developer" in text
+
+
+def test_page_limit_is_413():
+    with pytest.raises(HTTPException) as error:
+        extract_pdf(make_pdf(["x"], pages=pdf_parser.PDF_MAX_PAGES + 1))
+    assert error.value.status_code == 413
+
+
+def test_spooled_upload_is_hashed_on_disk():
+    data = make_pdf(["Jane Doe"])
+    path, sha = asyncio.run(pdf_parser.spool_pdf_upload(upload(data)))
+    try:
+        assert sha == hashlib.sha256(data).hexdigest()
+        with open(path, "rb") as handle:
+            assert handle.read() == data
+    finally:
+        pdf_parser.remove_spooled(path)
+
+
+def test_oversized_upload_is_413_and_leaves_no_file():
+    before = set(os.listdir(tempfile.gettempdir()))
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(pdf_parser.spool_pdf_upload(upload(b"x" * 3 * 1024 * 1024), max_mb=1))
+    assert error.value.status_code == 413
+    assert not {name for name in set(os.listdir(tempfile.gettempdir())) - before if name.startswith("upload-")}
+
+
+def test_non_pdf_upload_is_400():
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(pdf_parser.spool_pdf_upload(upload(b"hello", "text/plain")))
+    assert error.value.status_code == 400
+
+
+def test_garbage_is_500():
+    with pytest.raises(HTTPException) as error:
+        extract_pdf(b"not a pdf")
+    assert error.value.status_code == 500
+
+
+def test_extract_in_worker_pool(fresh_pool):
+    text, _ = asyncio.run(extract_pdf_async(make_pdf(["Jane Doe", "Python developer"])))
+    assert "Jane Doe" in text and "Python developer" in text
+
+
+def test_timeout_fails_only_the_slow_upload(fresh_pool, monkeypatch, tmp_path):
+    monkeypatch.setattr(pdf_parser, "extract_text_job", hanging_extract)
+    healthy_pdf = tmp_path / "slow.pdf"
+    healthy_pdf.write_bytes(make_pdf(["Jane Doe"]))
+    healthy_pdf = str(healthy_pdf)
+
+    async def main():
+        await extract_pdf_async(healthy_pdf)  # spawn start-up
+        hung = asyncio.ensure_future(extract_pdf_async(b"hang"))
+        await asyncio.sleep(0.5)
+        # Still extracting when the other upload times out
+        healthy = asyncio.ensure_future(extract_pdf_async(healthy_pdf))
+        return await asyncio.gather(hung, healthy, return_exceptions=True)
+
+    hung, healthy = asyncio.run(main())
+    assert isinstance(hung, HTTPException) and hung.status_code == 422
+    assert "Jane Doe" in healthy[0]
@@ -0,0 +1,78 @@
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.services.pdf_parser import PdfJobTimeout, PdfWorkerPool
+
+
+def sleep_then(value, seconds):
+    time.sleep(seconds)
+    return value
+
+
+def crash():
+    os._exit(1)
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(workers, timeout):
+        pool = PdfWorkerPool(workers, timeout, initializer=None, name="test")
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.shutdown()
+
+
+def test_results(make_pool):
+    pool = make_pool(2, 10)
+    futures = [pool.submit(sleep_then, i, 0) for i in range(4)]
+    assert [f.result(timeout=30) for f in futures] == [0, 1, 2, 3]
+
+
+def test_timeout_fails_only_the_stuck_job(make_pool):
+    pool = make_pool(2, 2)
+    pool.submit(sleep_then, "warm", 0).result(timeout=30)  # spawn start-up is not part of the test
+    stuck = pool.submit(sleep_then, "stuck", 60)
+    time.sleep(0.5)
+    healthy = pool.submit(sleep_then, "healthy", 1.8)
+    with pytest.raises(PdfJobTimeout):
+        stuck.result(timeout=30)
+    # Started before the timeout on the same executor, and still allowed to finish
+    assert healthy.result(timeout=30) == "healthy"
+    assert pool.submit(sleep_then, "after", 0).result(timeout=30) == "after"
+
+
+def test_jobs_queued_behind_a_stuck_job_move_to_a_fresh_executor(make_pool):
+    pool = make_pool(1, 1)
+    pool.submit(sleep_then, "warm", 0).result(timeout=30)
+    stuck = pool.submit(sleep_then, "stuck", 60)
+    queued = pool.submit(sleep_then, "queued", 0)
+    with pytest.raises(PdfJobTimeout):
+        stuck.result(timeout=30)
+    assert queued.result(timeout=30) == "queued"
+
+
+def test_timeout_counts_from_start_not_from_queueing(make_pool):
+    pool = make_pool(1, 2)
+    pool.submit(sleep_then, "warm", 0).result(timeout=30)
+    first = pool.submit(sleep_then, "first", 1.5)
+    second = pool.submit(sleep_then, "second", 1.5)
+    assert first.result(timeout=30) == "first"
+    assert second.result(timeout=30) == "second"
+
+
+def test_crashed_worker_fails_its_job_and_others_are_retried(make_pool):
+    pool = make_pool(2, 10)
+    pool.submit(sleep_then, "warm", 0).result(timeout=30)
+    healthy = pool.submit(sleep_then, "healthy", 1)
+    crashing = pool.submit(crash)
+    with pytest.raises(BrokenProcessPool):
+        crashing.result(timeout=30)
+    assert healthy.result(timeout=30) == "healthy"
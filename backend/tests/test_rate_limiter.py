@@ -0,0 +1,65 @@
+import asyncio
+import threading
+
+from app.services.rate_limiter import RateLimiter, RateLimitExceeded, retry_after_from_headers
+
+
+def test_reservations_queue_in_arrival_order():
+    limiter = RateLimiter("test", requests_per_minute=60)
+    limiter._state["requests"] = 1.0
+    assert limiter.reserve() == 0
+    first = limiter.reserve()
+    second = limiter.reserve()
+    assert 0 < first < second
+
+
+def test_reserve_refuses_waits_over_max():
+    limiter = RateLimiter("test", requests_per_minute=1, max_wait=5)
+    limiter.reserve()
+    try:
+        limiter.reserve()
+    except RateLimitExceeded:
+        pass
+    else:
+        raise AssertionError("expected RateLimitExceeded")
+
+
+def test_retry_after_header():
+    assert retry_after_from_headers({"Retry-After": "7"}) == 7.0
+    assert retry_after_from_headers({}) is None
+
+
+def test_unopenable_state_path_falls_back_to_process_state(tmp_path):
+    limiter = RateLimiter("test", requests_per_minute=60, state_path=str(tmp_path / "missing" / "state.db"))
+    assert limiter.reserve() == 0
+    assert limiter.state_path is None
+    assert limiter._state["requests"] < 60
+
+
+def test_shared_state_is_seen_by_another_limiter(tmp_path):
+    path = str(tmp_path / "rate.db")
+    a = RateLimiter("shared", requests_per_minute=2, state_path=path)
+    b = RateLimiter("shared", requests_per_minute=2, state_path=path)
+    a.reserve()
+    a.reserve()
+    assert b.reserve() > 0
+
+
+def test_async_acquire_does_state_io_off_the_event_loop(tmp_path):
+    limiter = RateLimiter("test", requests_per_minute=60, state_path=str(tmp_path / "rate.db"))
+    loop_thread = []
+    io_threads = []
+    reserve = limiter.reserve
+
+    def spy(tokens=0):
+        io_threads.append(threading.get_ident())
+        return reserve(tokens)
+
+    limiter.reserve = spy
+
+    async def main():
+        loop_thread.append(threading.get_ident())
+        await limiter.aacquire()
+
+    asyncio.run(main())
+    assert io_threads and io_threads[0] != loop_thread[0]
@@ -0,0 +1,184 @@
+import json
+
+import pytest
+
+from app.agents import resume_agent
+
+SECTIONS_REPLY = {
+    "experience": [{"title": "Engineer", "company": "Acme", "duration": "2020 - 2023", "description": "APIs"}],
+    "education": [{"school": "IIT", "degree": "B.Tech", "field": "CS"}],
+    "projects": [], "certifications": [], "publications": [], "awards": [],
+}
+BASIC_REPLY = {"name": "Sam Lee", "email": None, "phone": None, "location": None, "summary": "Engineer",
+               "social": {}, "technicalSkills": ["Python"], "softSkills": [], "languages": ["English"]}
+
+# Too little structure for the rules to be confident about anything but the email
+LOOSE_RESUME = "Sam Lee - sam@example.com\nI build APIs at Acme with Python since 2020.\nB.Tech from IIT."
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Fake call_llm answering by caller; records (caller, prompt)."""
+    calls, replies = [], {}
+
+    def call_llm(prompt, caller="unknown", **kwargs):
+        calls.append((caller, prompt))
+        reply = replies[caller]
+        return reply(prompt) if callable(reply) else reply
+
+    monkeypatch.setattr(resume_agent, "call_llm", call_llm)
+    return calls, replies
+
+
+def test_combined_mode_uses_one_call(llm, monkeypatch):
+    calls, replies = llm
+    monkeypatch.setattr(resume_agent, "RESUME_EXTRACTION_MODE", "combined")
+    replies["resume.combined"] = json.dumps({**BASIC_REPLY, **SECTIONS_REPLY})
+    profile = resume_agent.parse_resume(LOOSE_RESUME)
+    assert [caller for caller, _ in calls] == ["resume.combined"]
+    assert profile["name"] == "Sam Lee"
+    assert profile["email"] == "sam@example.com"
+    assert profile["experience"][0]["company"] == "Acme"
+
+
+def test_incomplete_combined_reply_falls_back_to_split(llm, monkeypatch):
+    calls, replies = llm
+    monkeypatch.setattr(resume_agent, "RESUME_EXTRACTION_MODE", "combined")
+    replies["resume.combined"] = json.dumps(BASIC_REPLY)  # no sections at all
+    replies["resume.basic_info"] = json.dumps(BASIC_REPLY)
+    replies["resume.sections"] = json.dumps(SECTIONS_REPLY)
+    profile = resume_agent.parse_resume(LOOSE_RESUME)
+    assert sorted(caller for caller, _ in calls) == ["resume.basic_info", "resume.combined", "resume.sections"]
+    assert profile["name"] == "Sam Lee"
+    assert profile["education"][0]["school"] == "IIT"
+
+
+def test_split_mode_sends_two_prompts(llm, monkeypatch):
+    calls, replies = llm
+    monkeypatch.setattr(resume_agent, "RESUME_EXTRACTION_MODE", "split")
+    replies["resume.basic_info"] = json.dumps(BASIC_REPLY)
+    replies["resume.sections"] = json.dumps(SECTIONS_REPLY)
+    resume_agent.parse_resume(LOOSE_RESUME)
+    assert sorted(caller for caller, _ in calls) == ["resume.basic_info", "resume.sections"]
+
+
+# ─────── RULE-BASED PRE-EXTRACTION ───────
+
+STRUCTURED_RESUME = """Priya Sharma
+priya.sharma@example.com | +91 98765 43210 | Bengaluru, India
+github.com/priyash
+
+SUMMARY
+Backend engineer building payment systems.
+
+SKILLS
+Python, Go, Docker, Kubernetes
+
+SOFT SKILLS
+Communication, Mentoring
+
+EXPERIENCE
+Acme Corp, Software Engineer
+
+EDUCATION
+B.Tech, 2019
+"""
+
+
+def test_basic_info_found_by_rules_skips_its_prompt(llm, monkeypatch):
+    calls, replies = llm
+    monkeypatch.setattr(resume_agent, "RESUME_EXTRACTION_MODE", "combined")
+    replies["resume.sections"] = json.dumps(SECTIONS_REPLY)
+    profile = resume_agent.parse_resume(STRUCTURED_RESUME)
+    assert [caller for caller, _ in calls] == ["resume.sections"]
+    assert profile["name"] == "Priya Sharma"
+    assert profile["location"] == "Bengaluru, India"
+    assert {"Python", "Go", "Docker", "Kubernetes"} <= set(profile["technicalSkills"])
+
+
+def test_prompt_asks_only_for_missing_fields(llm, monkeypatch):
+    calls, replies = llm
+    monkeypatch.setattr(resume_agent, "RESUME_EXTRACTION_MODE", "combined")
+    replies["resume.combined"] = json.dumps({**BASIC_REPLY, **SECTIONS_REPLY})
+    resume_agent.parse_resume(LOOSE_RESUME)
+    prompt = calls[0][1]
+    assert '"name"' in prompt
+    assert '"email"' not in prompt
+
+
+def test_confident_rule_fields_win_over_llm(llm, monkeypatch):
+    _, replies = llm
+    monkeypatch.setattr(resume_agent, "RESUME_EXTRACTION_MODE", "combined")
+    replies["resume.combined"] = json.dumps({**BASIC_REPLY, "email": "wrong@example.com", **SECTIONS_REPLY})
+    assert resume_agent.parse_resume(LOOSE_RESUME)["email"] == "sam@example.com"
+
+
+def test_provider_outage_returns_rule_fields(monkeypatch):
+    def call_llm(prompt, caller="unknown", **kwargs):
+        raise RuntimeError("provider down")
+
+    monkeypatch.setattr(resume_agent, "call_llm", call_llm)
+    monkeypatch.setattr(resume_agent, "RESUME_EXTRACTION_MODE", "split")
+    profile = resume_agent.parse_resume(STRUCTURED_RESUME)
+    assert profile["email"] == "priya.sharma@example.com"
+    assert profile["experience"] == []
+
+
+def test_forced_reparse_skips_cached_completions(monkeypatch):
+    use_cache = []
+
+    def call_llm(prompt, caller="unknown", **kwargs):
+        use_cache.append(kwargs.get("use_cache", True))
+        return json.dumps(BASIC_REPLY if caller == "resume.basic_info" else SECTIONS_REPLY)
+
+    monkeypatch.setattr(resume_agent, "call_llm", call_llm)
+    monkeypatch.setattr(resume_agent, "RESUME_EXTRACTION_MODE", "split")
+    resume_agent.parse_resume(LOOSE_RESUME, use_cache=False)
+    resume_agent.parse_resume(long_resume(), use_cache=False)
+    assert len(use_cache) > 3
+    assert not any(use_cache)
+
+
+# ─────── SECTION-BY-SECTION EXTRACTION ───────
+
+def long_resume(jobs=40):
+    entries = "\n\n".join(
+        f"Company {i}, Engineer\n2010 - 2011\n" + "Built and ran services for payments and search. " * 4
+        for i in range(jobs)
+    )
+    return f"{STRUCTURED_RESUME}\nEXPERIENCE\n{entries}\n\nPROJECTS\nTracker: a budget app\n"
+
+
+def test_short_resume_is_not_chunked():
+    assert resume_agent.plan_section_chunks(STRUCTURED_RESUME) is None
+
+
+def test_split_body_keeps_entries_whole():
+    body = "\n\n".join(f"entry {i}\n" + "x" * 400 for i in range(10))
+    chunks = resume_agent._split_body(body, 300)
+    assert len(chunks) > 1
+    assert all(resume_agent.estimate_tokens(chunk) <= 300 for chunk in chunks)
+    assert "\n\n".join(chunks) == body
+
+
+def test_long_resume_extracted_per_section_chunk(llm):
+    calls, replies = llm
+    plan = resume_agent.plan_section_chunks(long_resume())
+    _, jobs = plan
+    experience_jobs = [chunk for name, chunk in jobs if name == "experience"]
+    assert len(experience_jobs) > 1
+    assert ("projects", "Tracker: a budget app") in jobs
+
+    def experience(prompt):
+        companies = sorted({line.split(",")[0] for line in prompt.splitlines() if line.startswith("Company ")})
+        return json.dumps({"experience": [{"title": "Engineer", "company": c} for c in companies]})
+
+    replies["resume.section.experience"] = experience
+    replies["resume.section.projects"] = json.dumps({"projects": [{"name": "Tracker"}]})
+    replies["resume.section.education"] = json.dumps({"education": [{"school": "IIT"}]})
+    merged = resume_agent.extract_sections_chunked(jobs)
+    # Every entry survives: no 3-item cap once the chunks are small
+    assert len(merged["experience"]) == 40
+    assert merged["projects"] == [{"name": "Tracker"}]
+    assert merged["awards"] == []
+    assert len([c for c, _ in calls if c == "resume.section.experience"]) == len(experience_jobs)
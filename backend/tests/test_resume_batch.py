@@ -0,0 +1,155 @@
+import time
+import zipfile
+
+import fitz
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import models
+from app.services import resume_batch
+from app.services.pdf_parser import extract_text_job
+from app.services.resume_batch import ingest_resumes, iter_zip
+
+
+def make_pdf(text: str) -> bytes:
+    document = fitz.open()
+    document.new_page().insert_text((72, 72), text)
+    data = document.tobytes()
+    document.close()
+    return data
+
+
+def hanging_extract(source):
+    if source == b"hang":
+        time.sleep(60)
+    return extract_text_job(source)
+
+
+def fake_parse(text, sections=None, **kwargs):
+    if "slow" in text:
+        time.sleep(5)
+    return {"name": text.split()[0]}
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'batch.db'}")
+    models.Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def write_zip(path, members):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return str(path)
+
+
+def test_iter_zip_skips_non_pdfs_and_resource_forks(tmp_path):
+    path = write_zip(tmp_path / "a.zip", {"a.pdf": b"1", "notes.txt": b"2", "__MACOSX/._a.pdf": b"3"})
+    assert list(iter_zip(path)) == [("a.pdf", b"1")]
+
+
+def test_iter_zip_refuses_too_many_members(tmp_path):
+    path = write_zip(tmp_path / "a.zip", {f"{i}.pdf": b"x" for i in range(4)})
+    with pytest.raises(ValueError, match="4 PDFs"):
+        list(iter_zip(path, max_files=3))
+
+
+def test_iter_zip_refuses_zip_bombs_before_extracting(tmp_path):
+    # 20 MB of zeros compresses to a few KB
+    path = write_zip(tmp_path / "bomb.zip", {"bomb.pdf": b"\0" * (20 * 1024 * 1024)})
+    assert (tmp_path / "bomb.zip").stat().st_size < 100 * 1024
+    with pytest.raises(ValueError, match="larger than"):
+        list(iter_zip(path, max_file_mb=10))
+    with pytest.raises(ValueError, match="expands past"):
+        list(iter_zip(path, max_file_mb=50, max_total_mb=5))
+
+
+def test_read_member_stops_at_limit(tmp_path):
+    path = write_zip(tmp_path / "a.zip", {"a.pdf": b"\0" * 4096})
+    with zipfile.ZipFile(path) as archive:
+        with pytest.raises(ValueError):
+            resume_batch._read_member(archive, archive.infolist()[0], 1024)
+
+
+def test_ingest_survives_hung_extraction_and_slow_parse(db, monkeypatch):
+    monkeypatch.setattr(resume_batch, "extract_text_job", hanging_extract)
+    monkeypatch.setattr(resume_batch, "parse_resume", fake_parse)
+    monkeypatch.setattr(resume_batch, "BATCH_EXTRACT_TIMEOUT", 2)
+    monkeypatch.setattr(resume_batch, "BATCH_PARSE_TIMEOUT", 1)
+    sources = [("hang.pdf", b"hang"), ("alice.pdf", make_pdf("Alice resume")),
+               ("slow.pdf", make_pdf("Bob slow resume")), ("carol.pdf", make_pdf("Carol resume"))]
+
+    started = time.perf_counter()
+    result = ingest_resumes(sources, db, extract_workers=2, llm_concurrency=2)
+    assert time.perf_counter() - started < 30
+
+    status = {report["file"]: report["status"] for report in result["files"]}
+    assert status == {"hang.pdf": "failed", "alice.pdf": "parsed", "slow.pdf": "failed", "carol.pdf": "parsed"}
+    assert db.query(models.ResumeData).count() == 2
+
+    # A re-run skips what was stored and retries the rest
+    rerun = ingest_resumes(sources[1:2], db, extract_workers=1, llm_concurrency=1)
+    assert rerun["totals"]["skipped"] == 1
+
+
+def test_ingest_stores_each_file_once(db, monkeypatch):
+    monkeypatch.setattr(resume_batch, "parse_resume", fake_parse)
+    alice = make_pdf("Alice resume")
+    sources = [("alice.pdf", alice), ("bob.pdf", make_pdf("Bob resume")), ("copy.pdf", alice)]
+
+    result = ingest_resumes(sources, db, extract_workers=2, llm_concurrency=2)
+    status = {report["file"]: report["status"] for report in result["files"]}
+    assert status == {"alice.pdf": "parsed", "bob.pdf": "parsed", "copy.pdf": "skipped"}
+    assert db.query(models.ResumeData).count() == 2
+
+    # A re-run skips what was stored
+    rerun = ingest_resumes(sources[:1], db, extract_workers=1, llm_concurrency=1)
+    assert rerun["totals"]["skipped"] == 1
+
+
+def test_parse_timeout_counts_from_start_not_from_queueing(db, monkeypatch):
+    def one_second_parse(text, sections=None, **kwargs):
+        time.sleep(1)
+        return {"name": text.split()[0]}
+
+    monkeypatch.setattr(resume_batch, "parse_resume", one_second_parse)
+    monkeypatch.setattr(resume_batch, "BATCH_PARSE_TIMEOUT", 1.6)
+    sources = [(f"{name}.pdf", make_pdf(f"{name} resume")) for name in ("Alice", "Bob", "Carol")]
+    result = ingest_resumes(sources, db, extract_workers=2, llm_concurrency=1)
+    assert result["totals"]["parsed"] == 3
+
+
+def test_sources_are_read_as_workers_free_up(db, monkeypatch):
+    monkeypatch.setattr(resume_batch, "parse_resume", fake_parse)
+    read = []
+
+    def sources():
+        for i in range(12):
+            read.append(i)
+            yield f"{i}.pdf", make_pdf(f"Person{i} resume")
+
+    read_at_first_finish = []
+    result = ingest_resumes(sources(), db, extract_workers=1, llm_concurrency=1,
+                            on_file=lambda report: read_at_first_finish.append(len(read)))
+    assert result["totals"]["parsed"] == 12
+    # At most 2 extractions and 2 parses are queued ahead of the workers
+    assert read_at_first_finish[0] <= 4
+
+
+def test_forced_batch_skips_cached_completions(db, monkeypatch):
+    calls = []
+
+    def recording_parse(text, sections=None, use_cache=True):
+        calls.append(use_cache)
+        return {"name": text.split()[0]}
+
+    monkeypatch.setattr(resume_batch, "parse_resume", recording_parse)
+    sources = [("alice.pdf", make_pdf("Alice resume"))]
+    ingest_resumes(sources, db, extract_workers=1, llm_concurrency=1)
+    ingest_resumes(sources, db, extract_workers=1, llm_concurrency=1, force=True)
+    assert calls == [True, False]
@@ -0,0 +1,46 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import models
+from app.services.resume_cache import find_parsed_resume, store_parsed_resume, text_sha256
+
+PARSED = {"name": "Jane Doe", "technicalSkills": ["Python"]}
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'cache.db'}")
+    models.Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def test_hit_by_file_and_by_text(db):
+    store_parsed_resume(db, PARSED, file_name="a.pdf", file_hash="f1", text="Jane  Doe\nPython")
+    assert find_parsed_resume(db, file_hash="f1").parsed_json == PARSED
+    # Whitespace differences do not change the text hash
+    assert find_parsed_resume(db, text_hash=text_sha256("Jane Doe Python")).parsed_json == PARSED
+    assert find_parsed_resume(db, file_hash="other") is None
+
+
+@pytest.mark.parametrize("empty", [{}, None])
+def test_empty_parse_is_not_stored(db, empty):
+    assert store_parsed_resume(db, empty, file_name="a.pdf", file_hash="f1", text="text") is None
+    assert db.query(models.ResumeData).count() == 0
+
+
+@pytest.mark.parametrize("empty", [{}, None])
+def test_stored_empty_parse_is_a_miss(db, empty):
+    # Rows written before empty parses were skipped
+    db.add(models.ResumeData(file_name="a.pdf", parsed_json=empty, file_sha256="f1", text_sha256=text_sha256("text")))
+    db.commit()
+    assert find_parsed_resume(db, file_hash="f1", text_hash=text_sha256("text")) is None
+
+
+def test_newer_real_parse_wins_over_empty_row(db):
+    db.add(models.ResumeData(file_name="a.pdf", parsed_json={}, file_sha256="f1"))
+    db.commit()
+    store_parsed_resume(db, PARSED, file_name="a.pdf", file_hash="f1", text="text")
+    assert find_parsed_resume(db, file_hash="f1").parsed_json == PARSED
@@ -0,0 +1,88 @@
+from app.utils.resume_rules import (
+    confident_fields, detect_heading, extract_rule_based, extract_social_links, split_sections,
+)
+
+RESUME = """Priya Sharma
+priya.sharma@example.com | +91 98765 43210 | Bengaluru, India
+github.com/priyash | linkedin.com/in/priyash
+
+SUMMARY
+Backend engineer building payment systems.
+
+Technical Skills:
+Languages: Python, Go, SQL
+Tools: Docker, Kubernetes
+
+EXPERIENCE
+Acme Corp, Software Engineer
+Built APIs in Python.
+
+EDUCATION
+B.Tech, 2019
+"""
+
+
+def test_detect_heading_normalizes_spelling():
+    assert detect_heading("  Work Experience: ") == "experience"
+    assert detect_heading("TECHNICAL SKILLS") == "skills"
+    assert detect_heading("Built APIs in Python.") is None
+
+
+def test_split_sections():
+    sections = split_sections(RESUME)
+    assert set(sections) == {"header", "summary", "skills", "experience", "education"}
+    assert sections["summary"] == "Backend engineer building payment systems."
+    assert sections["header"].startswith("Priya Sharma")
+
+
+def test_contact_details_with_confidence():
+    fields = extract_rule_based(RESUME)
+    assert fields["email"] == ("priya.sharma@example.com", 0.95)
+    assert fields["phone"] == ("+91 98765 43210", 0.9)
+    name, confidence = fields["name"]
+    assert name == "Priya Sharma" and confidence > 0.9
+    assert fields["location"] == ("Bengaluru, India", 0.85)
+    assert fields["social"][0]["github"] == "github.com/priyash"
+
+
+def test_document_and_job_titles_are_not_names():
+    fields = extract_rule_based("CURRICULUM VITAE\nSenior Software Engineer\nJohn Smith\njohn.smith@example.com\n")
+    assert fields["name"] == ("John Smith", 0.95)
+    assert "name" not in extract_rule_based("CURRICULUM VITAE\nSoftware Engineer\nj.s.1990@example.com\n")
+
+
+def test_uncorroborated_name_is_left_to_the_llm():
+    name, confidence = extract_rule_based("Jane Doe\njd1990@example.com\n")["name"]
+    assert name == "Jane Doe" and confidence < 0.8
+    # On the contact line next to the phone number
+    assert extract_rule_based("Jane Doe | +1 415 555 0100\n")["name"] == ("Jane Doe", 0.85)
+
+
+def test_skills_come_from_the_skills_section():
+    skills, confidence = extract_rule_based(RESUME)["technicalSkills"]
+    assert {"Python", "Go", "SQL", "Docker", "Kubernetes"} <= set(skills)
+    assert confidence == 0.9
+
+
+def test_structured_resume_without_languages_means_none():
+    fields = extract_rule_based(RESUME)
+    assert fields["languages"] == ([], 0.8)
+    assert "languages" in confident_fields(fields)
+
+
+def test_structured_resume_without_summary_asks_the_llm():
+    fields = extract_rule_based(RESUME.replace("SUMMARY\nBackend engineer building payment systems.\n", ""))
+    assert fields["summary"][0] is None
+    confident = confident_fields(fields)
+    assert "summary" not in confident and "softSkills" not in confident
+
+
+def test_low_confidence_fields_are_left_to_the_llm():
+    fields = extract_rule_based("some notes\nemail me: a@b.io\nI like python and react")
+    confident = confident_fields(fields)
+    assert confident == {"email": "a@b.io"}
+    assert fields["technicalSkills"][1] < 0.8
+
+
+def test_email_domain_is_not_a_website():
+    assert extract_social_links("jane@company.com")["website"] is None
@@ -0,0 +1,62 @@
+from app.agents.resume_agent import normalize_resume_data
+from app.utils.skill_matcher import skill_matcher
+
+PROSE_RESUME = """Jane Doe
+jane@example.com
+
+Summary
+Ready to go the extra mile; I excel at swift delivery and express ideas clearly,
+bringing unity to teams.
+
+Experience
+Built dashboards in React and Node.js at Acme.
+
+Skills
+Python, Go, PostgreSQL, JS
+"""
+
+
+def test_aliases_map_to_canonical_names():
+    assert skill_matcher.normalize(["js", "k8s", "Py", "golang"], "technical") == [
+        "JavaScript", "Kubernetes", "Python", "Go"
+    ]
+
+
+def test_spring_is_not_spring_boot():
+    assert skill_matcher.normalize(["Spring", "springboot", "Spring Framework"], "technical") == [
+        "Spring", "Spring Boot"
+    ]
+
+def test_normalize_flattens_llm_shapes():
+    shapes = [{"category": "Languages", "skills": ["Python", "TS"]}, "React, Docker"]
+    assert skill_matcher.normalize(shapes, "technical") == ["Python", "TypeScript", "React", "Docker"]
+
+
+def test_find_prefers_longest_match_and_word_boundaries():
+    assert skill_matcher.find("React Native and Node.js, not Reactor") == ["React Native", "Node.js"]
+
+
+def test_find_in_prose_skips_everyday_words():
+    text = "Go the extra mile; Excel at Swift delivery with Unity and Express"
+    assert skill_matcher.find(text, "technical", prose=True) == []
+    assert "Go" in skill_matcher.find("Go, Rust", "technical")
+
+
+def test_github_language_names():
+    assert skill_matcher.from_topics(["Dockerfile", "HCL", "Shell", "machine-learning"]) == [
+        "Docker", "Terraform", "Bash", "Machine Learning"
+    ]
+    # "HCL" is a company name in resume prose
+    assert skill_matcher.find("Software engineer at HCL Technologies") == []
+
+
+def test_normalize_resume_data_scans_only_the_skills_section():
+    data = normalize_resume_data({"technicalSkills": []}, PROSE_RESUME)
+    assert data["technicalSkills"] == ["Python", "Go", "PostgreSQL", "JavaScript"]
+
+
+def test_normalize_resume_data_without_skills_section_ignores_everyday_words():
+    text = PROSE_RESUME.split("Skills")[0]
+    data = normalize_resume_data({"technicalSkills": ["Docker"]}, text)
+    # Unambiguous stack names in prose still count
+    assert data["technicalSkills"] == ["Docker", "React", "Node.js"]
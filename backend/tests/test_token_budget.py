@@ -0,0 +1,46 @@
+from app.utils.token_budget import (
+    budget_stats, compact_json, estimate_tokens, fit_text, fit_to_budget, truncate_to_tokens,
+)
+
+
+def test_estimate_tokens_rounds_up():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+
+
+def test_truncate_prefers_line_break():
+    text = "\n".join(["x" * 30] * 10)
+    cut = truncate_to_tokens(text, 40)
+    assert estimate_tokens(cut) <= 40
+    assert cut.endswith("x" * 30)
+    assert truncate_to_tokens("short", 20) == "short"
+
+
+def test_fit_to_budget_stops_once_it_fits():
+    data = {"repos": ["r" * 100] * 10, "bio": "b" * 100}
+    applied = []
+
+    def drop_repos(d):
+        applied.append("repos")
+        return {**d, "repos": d["repos"][:2]}
+
+    def drop_bio(d):
+        applied.append("bio")
+        return {**d, "bio": ""}
+
+    trimmed, text = fit_to_budget("test-fit", data, [drop_repos, drop_bio], budget=100)
+    assert applied == ["repos"]
+    assert text == compact_json(trimmed)
+    assert len(trimmed["repos"]) == 2 and len(data["repos"]) == 10
+    assert estimate_tokens(text) <= 100
+
+
+def test_stats_record_before_and_after():
+    fit_text("test-stats", "y" * 400, budget=50)
+    fit_text("test-stats", "short", budget=50)
+    stats = budget_stats()["test-stats"]
+    assert stats["calls"] == 2
+    assert stats["trimmed_calls"] == 1
+    assert stats["tokens_before"] == 102
+    assert stats["tokens_after"] == 52
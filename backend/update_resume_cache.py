@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Add the resume parse cache columns to an existing resume_data table.
+
+New databases get them from create_all; run this once on databases created
+before the cache existed:
+    python update_resume_cache.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import sqlalchemy as sa
+from app.db.database import engine
+from app.db import models
+
+NEW_COLUMNS = {
+    "extracted_text": "TEXT",
+    "file_sha256": "VARCHAR(64)",
+    "text_sha256": "VARCHAR(64)",
+}
+
+
+def main():
+    inspector = sa.inspect(engine)
+    if "resume_data" not in inspector.get_table_names():
+        models.Base.metadata.create_all(bind=engine)
+        print("✓ resume_data created with cache columns")
+        return
+
+    existing = {col["name"]: col for col in inspector.get_columns("resume_data")}
+    with engine.begin() as connection:
+        for name, sql_type in NEW_COLUMNS.items():
+            if name not in existing:
+                connection.execute(sa.text(f"ALTER TABLE resume_data ADD COLUMN {name} {sql_type}"))
+                print(f"✓ Added resume_data.{name}")
+
+        # Standalone parse-resume uploads are stored without a portfolio
+        if not existing["portfolio_id"]["nullable"]:
+            if engine.dialect.name == "sqlite":
+                # SQLite cannot drop NOT NULL in place: rebuild the table (the new one
+                # recreates the indexes, so the old ones have to go first)
+                for index in inspector.get_indexes("resume_data"):
+                    connection.execute(sa.text(f"DROP INDEX IF EXISTS {index['name']}"))
+                connection.execute(sa.text("ALTER TABLE resume_data RENAME TO resume_data_old"))
+                models.ResumeData.__table__.create(bind=connection)
+                columns = ", ".join(name for name in existing)
+                connection.execute(sa.text(f"INSERT INTO resume_data ({columns}) SELECT {columns} FROM resume_data_old"))
+                connection.execute(sa.text("DROP TABLE resume_data_old"))
+            else:
+                connection.execute(sa.text("ALTER TABLE resume_data ALTER COLUMN portfolio_id DROP NOT NULL"))
+            print("✓ resume_data.portfolio_id is now nullable")
+
+    with engine.begin() as connection:
+        for name in ("file_sha256", "text_sha256"):
+            connection.execute(sa.text(f"CREATE INDEX IF NOT EXISTS ix_resume_data_{name} ON resume_data ({name})"))
+    print("✓ Resume parse cache columns ready")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)